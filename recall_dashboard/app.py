@@ -6,6 +6,7 @@ import os
 import altair as alt
 import plotly.express as px
 import io
+import sys
 st.set_page_config(
     page_title="Drug Recall Surveillance Dashboard",
     layout="wide",
@@ -16,67 +17,74 @@ st.title("Drug Recall Surveillance Dashboard")
 # Load data
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_PATH = os.path.join(BASE_DIR, 'data', 'csv', 'recalls_combined.csv')
- 
-def load_data():
-    df = pd.read_csv(DATA_PATH)
+STORE_ROOT = os.path.join(BASE_DIR, 'data', 'parquet')
+sys.path.append(os.path.join(BASE_DIR, 'src'))
 
-    #normalize column 
-    df['manufacturer'] = df['manufacturer'].str.lower().str.strip()
-    df['reason'] = df['reason'].str.lower().str.strip() 
-    df['inn_name'] = df['inn_name'].astype(str).str.lower().str.strip()
-    df['product_name'] = df['product_name'].astype(str).str.replace(r'\s+',' ', regex=True).str.strip().str.lower()
+from dashboard_backend import DEFAULT_PAGE_SIZE, get_backend
 
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df['year'] = df['date'].dt.year
-    df['month'] = df['date'].dt.month
-    return df
+# DASHBOARD_BACKEND=parquet (local store, default) or sql (PostgreSQL summary tables).
+# Filters run on the backend; the app only receives aggregates and one page of rows.
+CACHE_TTL = 300
 
-df = load_data()
+@st.cache_resource
+def load_backend():
+    return get_backend(root=STORE_ROOT)
+
+backend = load_backend()
+
+# Cached per filter combination (filters are passed as sorted tuples).
+@st.cache_data(ttl=CACHE_TTL)
+def load_options(backend_name):
+    return backend.options()
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_summary(backend_name, years, manufacturers, reasons):
+    return backend.summary(years, manufacturers, reasons)
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_rows(backend_name, years, manufacturers, reasons, page, page_size):
+    return backend.rows(years, manufacturers, reasons, page=page, page_size=page_size)
+
+options = load_options(backend.name)
 
 st.sidebar.header("Filter Recalls")
 
 years = st.sidebar.multiselect(
     "Select Year(s)",
-    options=df['year'].dropna().unique(),
-    default=df['year'].dropna().unique()
+    options=options['year'],
+    default=[],
+    help="Leave empty for all years"
 )
 
 manufacturers = st.sidebar.multiselect(
     "Select Manufacturer(s)",
-    options=df['manufacturer'].dropna().unique(),
-    default=df['manufacturer'].dropna().unique()
+    options=options['manufacturer'],
+    default=[],
+    help="Leave empty for all manufacturers"
 )
 
 reasons = st.sidebar.multiselect(
     "Select Reason(s)",
-    options=df['reason'].dropna().unique(),
-    default=df['reason'].dropna().unique()
+    options=options['reason'],
+    default=[],
+    help="Leave empty for all reasons"
 )
 
-
-# Filter DataFrame based on selections
-filtered_df = df[(df['year'].isin(years)) &
-                 (df['manufacturer'].isin(manufacturers)) &
-                 (df['reason'].isin(reasons))]
+filters = (backend.name, tuple(sorted(years)), tuple(sorted(manufacturers)), tuple(sorted(reasons)))
+summary = load_summary(*filters)
 
 #Metrics
 st.sidebar.subheader("Key Summary")
 col1, col2, col3 = st.columns(3)
 
-col1.metric("Total Recalls", len(filtered_df))
-col2.metric("Unique Manufacturers", filtered_df['manufacturer'].nunique())
-col3.metric("Unique Reasons", filtered_df['reason'].nunique())
+col1.metric("Total Recalls", summary['total'])
+col2.metric("Unique Manufacturers", summary['unique_manufacturers'])
+col3.metric("Unique Reasons", summary['unique_reasons'])
 
 #Time Series Analysis
 st.subheader("Monthly Recall Trends")
 
-monthly_counts = (
-    filtered_df.groupby(['year', 'month'])
-    .size()
-    .reset_index(name='Recall Count')
-    .sort_values(by=['year', 'month'])
-)
+monthly_counts = summary['monthly'].rename(columns={'recall_count': 'Recall Count'})
 
 monthly_counts["dtEpoch"] = pd.to_datetime(monthly_counts[['year', 'month']].assign(day=1))
 monthly_counts.set_index("dtEpoch", inplace=True)
@@ -96,7 +104,7 @@ st.pyplot(fig)
 
 #Bar Chart: Top Recall Reasons
 st.subheader("Top Recall Reasons")
-top_reasons = (filtered_df['reason'].value_counts().nlargest(10)
+top_reasons = (summary['reasons'].set_index('reason')['recall_count'].nlargest(10)
                .sort_values(ascending=True))
 fig2, ax = plt.subplots(figsize=(10, 6))
 top_reasons.plot(kind='barh', ax=ax, color='skyblue')
@@ -108,12 +116,12 @@ st.pyplot(fig2)
 # Altair Bar Chart: Recalls Per Year
 st.subheader("Recalls Per Year (Altair Interactive View)")
 alt_chart = (
-    alt.Chart(filtered_df)
+    alt.Chart(summary['per_year'])
     .mark_bar()
     .encode(
         x=alt.X('year:O', title='Year'),
-        y=alt.Y('count():Q', title='Number of Recalls'),
-        tooltip=['year', 'count()']
+        y=alt.Y('recall_count:Q', title='Number of Recalls'),
+        tooltip=['year', 'recall_count']
     )
     .properties(width=700, height=400)
     .interactive()
@@ -122,8 +130,7 @@ st.altair_chart(alt_chart, use_container_width=True)
 
 # Plotly Pie Chart: Recall Reasons Distribution
 st.subheader("Recall Reasons Distribution (Plotly Pie Chart)")
-reason_counts = filtered_df['reason'].value_counts().reset_index()
-reason_counts.columns = ['reason', 'count']
+reason_counts = summary['reasons'].rename(columns={'recall_count': 'count'})
 fig_pie = px.pie(
     reason_counts,
     values='count',
@@ -136,24 +143,34 @@ st.plotly_chart(fig_pie, use_container_width=True)
 
 
 st.subheader("Filtered Recalls Data")
-st.dataframe(filtered_df, use_container_width=True)
+page_count = max(1, -(-summary['total'] // DEFAULT_PAGE_SIZE))
+page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1) - 1
+page_df, total_rows = load_rows(*filters, page, DEFAULT_PAGE_SIZE)
+st.caption(f"Rows {page * DEFAULT_PAGE_SIZE + 1 if total_rows else 0}-{page * DEFAULT_PAGE_SIZE + len(page_df)} of {total_rows}")
+st.dataframe(page_df, use_container_width=True)
 
 #Export to excel
-@st.cache_data
-def convert_df_to_excel(df):
+# Built only when asked for, once per filter combination: it holds every filtered row, not just the page on screen.
+@st.cache_data(ttl=CACHE_TTL)
+def export_excel(backend_name, years, manufacturers, reasons):
+    export_df, _ = backend.rows(years, manufacturers, reasons, page=0, page_size=None)
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Filtered Recalls')
-        
+        export_df.to_excel(writer, index=False, sheet_name='Filtered Recalls')
+
     return output.getvalue()
 
-st.download_button(
-    label="Download Filtered Data as Excel",
-    data=convert_df_to_excel(filtered_df),
-    file_name='filtered_recalls_data.xlsx',
-    mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-    key='download_excel'        
-)
+if st.button("Prepare Excel Export", key='prepare_excel'):
+    st.session_state['excel_export'] = (filters, export_excel(*filters))
+prepared = st.session_state.get('excel_export')
+if prepared is not None and prepared[0] == filters:
+    st.download_button(
+        label="Download Filtered Data as Excel",
+        data=prepared[1],
+        file_name='filtered_recalls_data.xlsx',
+        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        key='download_excel'
+    )
 
 
 
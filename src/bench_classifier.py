@@ -0,0 +1,119 @@
+import argparse
+import json
+import random
+import time
+
+import pandas as pd
+
+from category_reasons import clean_reasons
+from reason_classifier import RULES_PATH, ReasonClassifier, normalize_keyword
+from recall_store import read_recalls
+
+FILLER = ["batch", "tablets", "observed", "during", "stability", "studies", "results", "test", "assay",
+          "product", "syrup", "injection", "the", "of", "in", "at", "12m", "30c75", "pack", "noted"]
+
+
+# Verbatim copy of the chained any() classifier that reason_classifier replaced,
+# kept here as the benchmark baseline.
+def legacy_categorize_reasons(reason: str) -> str:
+
+    if any(k in reason for k in ["color change", "colour change","change in colour", "discoloration", "discolouration", "change of color", "pink to brown", "dark stains"]):
+        return "color change"
+    if any(k in reason for k in ["particles", "particulate", "precipitate", "black spots","Crystallization", "visible particles", "crystals", "brown crystals"]):
+        return "particulate contamination"
+    if any(k in reason for k in ["out of specification","Out-of-specification", "oos", "failure to comply", "failed assay", "not within specification"]):
+        return "out of specification"
+    if any(k in reason for k in ["market complaint", "complaint", "customer complaint", "reported"]):
+        return "market complaints"
+    if any(k in reason for k in ["leakage", "leaking", "bottle leak", "Sachets bloated", "can leak", "pinholes"]):
+        return "leakage"
+    if any(k in reason for k in ["mix up", "wrong label","Mislabeling", "wrong blister", "wrong packaging", "donystatin"]):
+        return "mix-up"
+    if any(k in reason for k in ["cracking", "lamination", "capping", "score line", "powdering", "crumbling"]):
+        return "cracking / lamination"
+    if any(k in reason for k in ["visual", "appearance", "white discoloration", "black spots", "dark brown"]):
+        return "visual defect"
+    if any(k in reason for k in ["mold", "mould", "microbial", "contamination"]):
+        return "microbial contamination"
+    if any(k in reason for k in ["corrosion", "corroded", "rust"]):
+        return "corrosion"
+    if any(k in reason for k in ["safety concern", "toxicity", "unacceptable level", "diethylene glycol"]):
+        return "safety concern"
+    if any(k in reason for k in ["packaging", "ampoule", "monocarton", "damaged box", "unit box", "blister damage"]):
+        return "packaging defect"
+    if any(k in reason for k in ["bitter taste", "strange taste"]):
+        return "taste issue"
+    if any(k in reason for k in ["market authorization", "registration", "unregistered"]):
+        return "registration issue"
+    
+    return "Other"
+
+
+
+def reference_categorize(reason, rules, default='Other'):
+    """The chained any() semantics with keywords cleaned like the reasons (what the compiled matcher must equal)."""
+    for rule in rules:
+        if any(keyword in reason for keyword in rule):
+            return rule.category
+    return default
+
+
+class CleanedRule(list):
+    def __init__(self, category, keywords):
+        super().__init__(keywords)
+        self.category = category
+
+
+def synthetic_corpus(rows, seed=0):
+    """
+    Builds a reason column of the requested size from the real cleaned reasons,
+    mixed with generated phrases that embed random rule keywords in filler text.
+    """
+    rng = random.Random(seed)
+    real = read_recalls(columns=['reason'])['reason'].dropna().map(clean_reasons).tolist()
+    classifier = ReasonClassifier.from_file(RULES_PATH)
+    keywords = list(classifier.priority)
+    corpus = []
+    for _ in range(rows):
+        if rng.random() < 0.5:
+            corpus.append(rng.choice(real))
+        else:
+            words = rng.choices(FILLER, k=rng.randint(4, 16))
+            for _ in range(rng.randint(0, 2)):
+                words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+            corpus.append(' '.join(words))
+    return pd.Series(corpus)
+
+
+def timed(label, func, rows=None):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    throughput = f"{rows / elapsed:14,.0f} rows/s" if rows else ''
+    print(f"{label:<40} {elapsed:8.3f} s {throughput}")
+    return result, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the compiled reason classifier against the chained any() scans.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Size of the synthetic reason corpus')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus RNG seed')
+    args = parser.parse_args()
+
+    with open(RULES_PATH, 'r', encoding='utf-8') as f:
+        table = json.load(f)
+    rules = [CleanedRule(r['category'], [normalize_keyword(k) for k in r['keywords']]) for r in table['rules']]
+
+    reasons = synthetic_corpus(args.rows, args.seed)
+    print(f"Synthetic corpus: {len(reasons):,} rows, {reasons.nunique():,} unique reasons\n")
+
+    legacy, legacy_s = timed("legacy Series.apply(any() chain)", lambda: reasons.apply(legacy_categorize_reasons), len(reasons))
+    classifier, _ = timed("compile ReasonClassifier", lambda: ReasonClassifier.from_file(RULES_PATH))
+    compiled, compiled_s = timed("ReasonClassifier.classify_series", lambda: classifier.classify_series(reasons), len(reasons))
+    print(f"\nspeed-up: {legacy_s / compiled_s:.1f}x")
+
+    sample = reasons.sample(min(len(reasons), 100_000), random_state=args.seed)
+    reference = sample.apply(reference_categorize, rules=rules)
+    print(f"agreement with cleaned-keyword reference: {(compiled[sample.index] == reference).mean():.4%}")
+    changed = (compiled != legacy)
+    print(f"rows changed vs legacy (mixed-case keywords that could never match): {changed.mean():.4%}")
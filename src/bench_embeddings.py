@@ -0,0 +1,95 @@
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+from embedding_backends import BACKENDS, DEFAULT_BACKEND, ONNX_BACKENDS, SentenceTransformerEmbeddings
+from ingest_pdfs import EMBEDDING_MODEL, load_and_split_pdf
+from recall_store import read_recalls
+
+DEFAULT_FOLDERS = ["data/recalls_pdf", "data/rapid_alerts_pdfs"]
+
+
+def load_chunks(folders, max_files=None):
+    paths = [os.path.join(folder, f) for folder in folders if os.path.exists(folder)
+             for f in sorted(os.listdir(folder)) if f.endswith('.pdf')]
+    texts = []
+    for path in paths[:max_files]:
+        try:
+            texts += [chunk.page_content for chunk in load_and_split_pdf(path)]
+        except Exception as e:
+            print(f"skipping {path}: {e}")
+    return texts
+
+
+def recall_queries(count, seed=0):
+    """Questions of the kind rag_query gets, built from the recall store."""
+    df = read_recalls(columns=['product_name', 'reason']).dropna()
+    queries = {f"Why was {p.strip()} recalled?" for p in df['product_name']}
+    queries |= {f"Which products were recalled for {r.strip().rstrip('.').lower()}?" for r in df['reason']}
+    queries = sorted(queries)
+    random.Random(seed).shuffle(queries)
+    return queries[:count]
+
+
+def top_k(doc_vectors, query_vectors, k):
+    docs = doc_vectors / np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    queries = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    scores = queries @ docs.T
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def run_backend(model_name, backend, chunks, queries, k):
+    embeddings = SentenceTransformerEmbeddings(model_name, backend)
+    start = time.perf_counter()
+    embeddings.embed_query("warm-up")
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    chunks_per_s = len(chunks) / (time.perf_counter() - start)
+
+    latencies, query_vectors = [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(embeddings.embed_query(query))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        'load_s': load_s,
+        'chunks_per_s': chunks_per_s,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'top_k': top_k(doc_vectors, np.asarray(query_vectors, dtype=np.float32), k),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on the PPB PDF corpus.")
+    parser.add_argument('--folder', action='append', help='PDF folder (repeatable; default: recall and rapid alert PDFs)')
+    parser.add_argument('--model', type=str, default=EMBEDDING_MODEL, help='sentence-transformers model')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS,
+                        default=[b for b in BACKENDS if b not in ONNX_BACKENDS],
+                        help="Backends to compare (the ONNX ones need optimum[onnxruntime], so they are opt-in)")
+    parser.add_argument('--max-files', type=int, default=None, help='Only chunk this many PDFs')
+    parser.add_argument('--queries', type=int, default=200, help='Number of benchmark queries')
+    parser.add_argument('--k', type=int, default=5, help='Retrieval depth for recall@k')
+    parser.add_argument('--seed', type=int, default=0, help='Query sampling seed')
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.folder or DEFAULT_FOLDERS, args.max_files)
+    queries = recall_queries(args.queries, args.seed)
+    k = min(args.k, len(chunks))
+    print(f"{args.model}: {len(chunks):,} chunks, {len(queries)} queries, recall@{k} against '{DEFAULT_BACKEND}'\n")
+
+    # The full-precision run is always made: it is the recall reference.
+    backends = [DEFAULT_BACKEND] + [b for b in args.backends if b != DEFAULT_BACKEND]
+    results = {backend: run_backend(args.model, backend, chunks, queries, k) for backend in backends}
+    baseline = results[DEFAULT_BACKEND]['top_k']
+
+    print(f"{'backend':<12} {'load s':>8} {'chunks/s':>10} {'query p50 ms':>13} {'query p99 ms':>13} {f'recall@{k}':>10}")
+    for backend, result in results.items():
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(result['top_k'], baseline)])
+        print(f"{backend:<12} {result['load_s']:8.2f} {result['chunks_per_s']:10,.1f} {result['p50_ms']:13.2f} "
+              f"{result['p99_ms']:13.2f} {recall:10.3f}")
@@ -0,0 +1,164 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+from urllib.parse import urljoin
+
+import download
+import products_pdfs
+import recalls_2016_2021
+import recalls_2022_2025
+import scrape_data
+from replay_corpus import DEFAULT_CORPUS_DIR, LIVE_PREFIX, RAPID_ALERT_YEARS, RECALL_YEARS_2016_2021, url_path
+from replay_server import ReplayServer
+
+
+def listing_pages(urls_by_year):
+    return [(url_path(url), year) for year, url in urls_by_year]
+
+
+def build_scrapers(server, fetcher_kwargs, workdir):
+    """
+    Benchmark cases: how to run each scraper end to end against the replay
+    server, and which corpus pages its parser handles (for parse timing).
+    """
+    base = server.base_url
+    rapid_pages = listing_pages((y, scrape_data.rapid_alerts_url(LIVE_PREFIX, y)) for y in RAPID_ALERT_YEARS)
+    old_pages = listing_pages((y, f"{LIVE_PREFIX}products-recalled-in-{y}/") for y in RECALL_YEARS_2016_2021)
+    new_pages = listing_pages((y, recalls_2022_2025.recall_page_url(y)) for y in recalls_2022_2025.RECALL_PAGE_PATHS)
+
+    product_items = []
+    for year, url in product_page_urls(server):
+        product_items.append({'year': year, 'url': urljoin(base, url.lstrip('/'))})
+
+    return [
+        {
+            'name': 'scrape_data.scrape_rapid_alerts',
+            'run': lambda: scrape_data.scrape_rapid_alerts(base, min(RAPID_ALERT_YEARS), max(RAPID_ALERT_YEARS),
+                                                           **fetcher_kwargs),
+            'parse': lambda body, year: scrape_data.parse_rapid_alerts(body, year),
+            'pages': rapid_pages,
+        },
+        {
+            'name': 'download.extract_pdf_links_and_titles',
+            'run': lambda: download.extract_pdf_links_and_titles(base, min(RAPID_ALERT_YEARS), max(RAPID_ALERT_YEARS),
+                                                                 **fetcher_kwargs),
+            'parse': lambda body, year: download.parse_pdf_links(body),
+            'pages': rapid_pages,
+        },
+        {
+            'name': 'recalls_2016_2021.scrape_recalled',
+            'run': lambda: recalls_2016_2021.scrape_recalled(base, min(RECALL_YEARS_2016_2021),
+                                                             max(RECALL_YEARS_2016_2021), **fetcher_kwargs),
+            'parse': lambda body, year: recalls_2016_2021.parse_recalled(body, year),
+            'pages': old_pages,
+        },
+        {
+            'name': 'recalls_2022_2025.extract_recalls_and_products',
+            'run': lambda: recalls_2022_2025.extract_recalls_and_products(2022, 2025, base, **fetcher_kwargs),
+            'parse': lambda body, year: recalls_2022_2025.parse_recall_page(body, year),
+            'pages': new_pages,
+        },
+        {
+            'name': 'products_pdfs.download_pdfs',
+            'run': lambda: products_pdfs.download_pdfs(product_items, os.path.join(workdir, 'product_pdfs'),
+                                                       **fetcher_kwargs),
+            'parse': lambda body, year: products_pdfs.parse_pdf_links(body, base),
+            'pages': [(url_path(item['url']), item['year']) for item in product_items],
+        },
+    ]
+
+
+def product_page_urls(server):
+    """Product page URLs linked from the 2022-2025 listings in the corpus."""
+    pages = []
+    for year in recalls_2022_2025.RECALL_PAGE_PATHS:
+        body, _, _ = server.body_for(url_path(recalls_2022_2025.recall_page_url(year)))
+        _, products = recalls_2022_2025.parse_recall_page(body, year)
+        for product in products or []:
+            if product['url']:
+                pages.append((year, url_path(product['url'])))
+    return list(dict.fromkeys(pages))
+
+
+def time_parser(server, parse, pages, repeat):
+    bodies = [(server.body_for(path)[0], year) for path, year in pages if path in server.entries]
+    if not bodies:
+        return None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body, year in bodies:
+            parse(body, year)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(bodies))
+
+
+def run_benchmarks(corpus_dir=DEFAULT_CORPUS_DIR, latency=0.0, error_rate=0.0, repeat=20, seed=0,
+                   only=None, **fetcher_kwargs):
+    """
+    Runs every scraper against a local replay server and measures it.
+
+    Returns:
+        list: One dict per scraper with pages/sec, parse ms/page and bytes fetched.
+    """
+    results = []
+    with ReplayServer(corpus_dir, latency=latency, error_rate=error_rate, seed=seed) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        for case in build_scrapers(server, fetcher_kwargs, workdir):
+            if only and not any(o in case['name'] for o in only):
+                continue
+            server.stats.reset()
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):  # scrapers print progress per URL
+                case['run']()
+            elapsed = time.perf_counter() - start
+            stats = server.stats.snapshot()
+
+            # Parse timing runs with error injection off so every page is measured.
+            saved_rate, server.error_rate = server.error_rate, 0.0
+            parse_ms = time_parser(server, case['parse'], case['pages'], repeat)
+            server.error_rate = saved_rate
+
+            results.append({
+                'scraper': case['name'],
+                'requests': stats['requests'],
+                'seconds': round(elapsed, 4),
+                'pages_per_sec': round(stats['requests'] / elapsed, 2) if elapsed else None,
+                'parse_ms_per_page': round(parse_ms, 3) if parse_ms is not None else None,
+                'bytes_fetched': stats['bytes_sent'],
+                'injected_errors': stats['injected_errors'],
+            })
+    return results
+
+
+def print_results(results):
+    header = f"{'scraper':<48} {'reqs':>5} {'pages/s':>9} {'parse ms/pg':>12} {'bytes':>11} {'errors':>7}"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        parse_ms = f"{r['parse_ms_per_page']:.3f}" if r['parse_ms_per_page'] is not None else '-'
+        print(f"{r['scraper']:<48} {r['requests']:>5} {r['pages_per_sec']:>9.1f} {parse_ms:>12} "
+              f"{r['bytes_fetched']:>11,} {r['injected_errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the PPB scrapers against the offline replay corpus.")
+    parser.add_argument('--corpus-dir', type=str, default=DEFAULT_CORPUS_DIR, help='Replay corpus directory')
+    parser.add_argument('--latency', type=float, default=0.05, help='Injected seconds of latency per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with a 503')
+    parser.add_argument('--rate', type=float, default=0.0, help='Per-host requests/sec limit (0 = unlimited)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Maximum requests in flight')
+    parser.add_argument('--repeat', type=int, default=20, help='Parse repetitions per page')
+    parser.add_argument('--only', action='append', help='Only run scrapers whose name contains this (repeatable)')
+    parser.add_argument('--json', type=str, default=None, help='Also write the results to this JSON file')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.corpus_dir, latency=args.latency, error_rate=args.error_rate,
+                             repeat=args.repeat, only=args.only, rate_per_host=args.rate,
+                             concurrency=args.concurrency, backoff=0.05)
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
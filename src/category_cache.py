@@ -0,0 +1,81 @@
+import json
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from http_cache import atomic_write
+from reason_classifier import ReasonClassifier
+
+DEFAULT_CACHE_PATH = "data/cache/reason_categories.json"
+
+
+class CategoryCache:
+    """
+    Persistent (rule-set version, cleaned reason) -> category cache.
+
+    The file records the rule-set version it was built with. Loading it
+    with a classifier whose rule table has changed starts from an empty
+    cache, so stale categories are never served.
+
+    Args:
+        rules_version (str): ReasonClassifier.version of the active rule table.
+        path (str, optional): JSON file backing the cache.
+    """
+
+    def __init__(self, rules_version: str, path: str = DEFAULT_CACHE_PATH):
+        self.rules_version = rules_version
+        self.path = path
+        self.categories: Dict[str, str] = {}
+        self.dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('rules_version') == rules_version:
+                self.categories = stored['categories']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+    def __len__(self):
+        return len(self.categories)
+
+    def update(self, categories: Dict[str, str]) -> None:
+        if categories:
+            self.categories.update(categories)
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        payload = {'rules_version': self.rules_version, 'categories': self.categories}
+        atomic_write(self.path, json.dumps(payload, sort_keys=True).encode('utf-8'))
+        self.dirty = False
+
+
+def classify_unique(clean_reasons: pd.Series, classifier: ReasonClassifier,
+                    cache: CategoryCache = None) -> pd.Series:
+    """
+    Classifies each distinct cleaned reason once and broadcasts the category to every row.
+
+    Reasons already in the cache are not reclassified; new ones are
+    classified in one vectorized batch and added to the cache.
+
+    Args:
+        clean_reasons (pd.Series): Cleaned reason text, one row per recall.
+        classifier (ReasonClassifier): Compiled rule table.
+        cache (CategoryCache, optional): Persistent cache for this rule-set version.
+
+    Returns:
+        pd.Series: Category per row, aligned with clean_reasons.
+    """
+    codes, uniques = pd.factorize(clean_reasons.fillna(''))
+    known = cache.categories if cache is not None else {}
+    pending = [u for u in uniques if u not in known]
+    fresh = dict(zip(pending, classifier.classify_series(pd.Series(pending, dtype=object)))) if pending else {}
+    if cache is not None:
+        cache.update(fresh)
+        cache.save()
+    labels = np.array([known.get(u) or fresh[u] for u in uniques], dtype=object)
+    return pd.Series(labels[codes], index=clean_reasons.index)
@@ -1,75 +1,57 @@
+import argparse
 import pandas as pd
 import re
-import os
 
-input_path = 'data/csv/recalls_2022_2025.csv'
+from category_cache import DEFAULT_CACHE_PATH, CategoryCache, classify_unique
+from reason_classifier import RULES_PATH, ReasonClassifier
+from recall_store import read_recalls
+
+years = range(2022, 2026)
 output_path = 'data/csv/reasons_with_year.csv' 
 
-def load_data(path):
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"The file {path} does not exist.")
-    return pd.read_csv(path)
+def load_data(years=None):
+    # clean_reasons is computed once at ingest by text_normalize.clean_reason.
+    return read_recalls(columns=["year", "date", "product_name", "manufacturer", "reason", "clean_reasons"], years=years)
 
 def clean_reasons(text):
+    # Scalar reference for text_normalize.clean_reason; the pipeline reads the stored column.
     if pd.isna(text):
         return ''
     text = text.lower()
     text = re.sub(r"[^a-z0-9\s]", '', text)  # Remove non-alphanumeric characters
     return text.strip()
 
-import re
+classifier = ReasonClassifier.from_file(RULES_PATH)
 
 def categorize_reasons(reason: str) -> str:
-
-    if any(k in reason for k in ["color change", "colour change","change in colour", "discoloration", "discolouration", "change of color", "pink to brown", "dark stains"]):
-        return "color change"
-    if any(k in reason for k in ["particles", "particulate", "precipitate", "black spots","Crystallization", "visible particles", "crystals", "brown crystals"]):
-        return "particulate contamination"
-    if any(k in reason for k in ["out of specification","Out-of-specification", "oos", "failure to comply", "failed assay", "not within specification"]):
-        return "out of specification"
-    if any(k in reason for k in ["market complaint", "complaint", "customer complaint", "reported"]):
-        return "market complaints"
-    if any(k in reason for k in ["leakage", "leaking", "bottle leak", "Sachets bloated", "can leak", "pinholes"]):
-        return "leakage"
-    if any(k in reason for k in ["mix up", "wrong label","Mislabeling", "wrong blister", "wrong packaging", "donystatin"]):
-        return "mix-up"
-    if any(k in reason for k in ["cracking", "lamination", "capping", "score line", "powdering", "crumbling"]):
-        return "cracking / lamination"
-    if any(k in reason for k in ["visual", "appearance", "white discoloration", "black spots", "dark brown"]):
-        return "visual defect"
-    if any(k in reason for k in ["mold", "mould", "microbial", "contamination"]):
-        return "microbial contamination"
-    if any(k in reason for k in ["corrosion", "corroded", "rust"]):
-        return "corrosion"
-    if any(k in reason for k in ["safety concern", "toxicity", "unacceptable level", "diethylene glycol"]):
-        return "safety concern"
-    if any(k in reason for k in ["packaging", "ampoule", "monocarton", "damaged box", "unit box", "blister damage"]):
-        return "packaging defect"
-    if any(k in reason for k in ["bitter taste", "strange taste"]):
-        return "taste issue"
-    if any(k in reason for k in ["market authorization", "registration", "unregistered"]):
-        return "registration issue"
-    
-    return "Other"
+    # Rules live in reason_rules.json, compiled once by reason_classifier.
+    return classifier.classify(reason)
 
     
-def process_recalls(input_path, output_path, summary_path):
-        print(f"Loading data from {input_path}")
-        df = load_data(input_path)
+def process_recalls(years, output_path, summary_path, cache_path=DEFAULT_CACHE_PATH, embed_other=False,
+                    embedding_threshold=None):
+        print(f"Loading recalls for {min(years)}-{max(years)} from the Parquet store")
+        df = load_data(years)
 
-        df["clean_reasons"] = df["reason"].apply(clean_reasons)
+        # Reasons repeat across batches and years: classify each distinct one once.
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
         df['year'] = df['date'].dt.year
-        df["recall_category"] = df["clean_reasons"].apply(categorize_reasons)
+        cache = CategoryCache(classifier.version, cache_path)
+        cached = len(cache)
+        df["recall_category"] = classify_unique(df["clean_reasons"], classifier, cache)
+        distinct, new = df["clean_reasons"].nunique(), len(cache) - cached
+        print(f"Classified {distinct} distinct reasons for {len(df)} rows ({distinct - new} cached, {new} new)")
+
+        output_columns = ["year", "date", "product_name", "manufacturer", "recall_category", "clean_reasons"]
+        if embed_other:
+            # Imported here so the rule-only run does not need sentence-transformers.
+            from embedding_classifier import DEFAULT_THRESHOLD, EmbeddingReasonClassifier, reclassify_other
+            threshold = DEFAULT_THRESHOLD if embedding_threshold is None else embedding_threshold
+            df = reclassify_other(df, EmbeddingReasonClassifier(classifier, threshold=threshold))
+            print(f"Embedding fallback assigned {(df['category_source'] == 'embedding').sum()} 'Other' rows")
+            output_columns += ["category_source", "category_score"]
 
-        df_out = df[[
-             "year",
-             "date",
-             "product_name",
-             "manufacturer", 
-             "recall_category",
-             "clean_reasons"
-        ]] 
+        df_out = df[output_columns]
 
         df_out.to_csv(output_path, index=False)
         print(f"Data processed and saved to {output_path}")
@@ -90,7 +72,14 @@ def process_recalls(input_path, output_path, summary_path):
         df[df["recall_category"] == "Other"][["reason"]].to_csv('data/csv/other_reasons.csv', index=False)
 
 if __name__ == "__main__":
-    input_path = 'data/csv/recalls_2022_2025.csv'
+    years = range(2022, 2026)
     output_path = 'data/csv/reasons_with_year.csv'
     summary_path = 'data/csv/category_summary_2022_2025.csv'
-    process_recalls(input_path, output_path, summary_path)
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Categorize recall reasons.")
+    parser.add_argument('--embed-other', action='store_true',
+                        help="Reclassify 'Other' reasons by nearest category embedding")
+    parser.add_argument('--threshold', type=float, default=None, help='Minimum cosine similarity for the fallback')
+    args = parser.parse_args()
+    process_recalls(years, output_path, summary_path, embed_other=args.embed_other,
+                    embedding_threshold=args.threshold)
\ No newline at end of file
@@ -0,0 +1,199 @@
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from recall_store import DEFAULT_STORE_ROOT, PARTITIONING, dataset_path
+
+DEFAULT_PAGE_SIZE = 100
+# Columns shown in the dashboard's row table, in display order.
+ROW_COLUMNS = ['year', 'date', 'recall_ref', 'product_name', 'inn_name', 'batch_no', 'manufacturer', 'reason']
+# Newest first; the tie-breakers keep pages stable across reruns.
+ROW_ORDER = [('date', 'descending'), ('recall_ref', 'ascending'), ('product_name', 'ascending'),
+             ('batch_no', 'ascending')]
+
+
+def report_year():
+    """Year of the recall date, or of the page it was listed on when the date is missing (as recall_summary)."""
+    return pc.coalesce(pc.year(pc.field('date')), pc.field('year').cast('int64'))
+
+
+def selected(values: Optional[Iterable]) -> Optional[list]:
+    """Dashboard filter semantics: None or an empty selection means "all"."""
+    values = list(values or [])
+    return values or None
+
+
+class ParquetBackend:
+    """
+    Dashboard queries against the local Parquet store.
+
+    Filters are pushed down to the dataset scan and only the columns a query
+    needs are read, so the Streamlit process never holds the whole store.
+    Years are those of the recall date, as in the SQL summary tables.
+
+    Args:
+        root (str, optional): Root of the Parquet store.
+    """
+
+    name = 'parquet'
+
+    def __init__(self, root: str = DEFAULT_STORE_ROOT):
+        self.dataset = ds.dataset(dataset_path('recalls', root), format='parquet', partitioning=PARTITIONING)
+
+    def _filter(self, years=None, manufacturers=None, reasons=None):
+        expression = None
+        for column, values in (('year', selected(years)), ('manufacturer_canonical', selected(manufacturers)),
+                               ('reason_norm', selected(reasons))):
+            if values is None:
+                continue
+            if column == 'year':
+                predicate = report_year().isin([int(v) for v in values])
+            else:
+                predicate = pc.field(column).isin(values)
+            expression = predicate if expression is None else expression & predicate
+        return expression
+
+    def options(self) -> Dict[str, list]:
+        table = self.dataset.to_table(columns={'year': report_year(),
+                                               'manufacturer_canonical': pc.field('manufacturer_canonical'),
+                                               'reason_norm': pc.field('reason_norm')})
+        return {
+            'year': sorted(pc.unique(table.column('year')).drop_null().to_pylist()),
+            'manufacturer': sorted(pc.unique(table.column('manufacturer_canonical')).drop_null().to_pylist()),
+            'reason': sorted(pc.unique(table.column('reason_norm')).drop_null().to_pylist()),
+        }
+
+    def summary(self, years=None, manufacturers=None, reasons=None) -> Dict:
+        table = self.dataset.to_table(columns={'year': report_year(), 'date': pc.field('date'),
+                                               'manufacturer_canonical': pc.field('manufacturer_canonical'),
+                                               'reason_norm': pc.field('reason_norm')},
+                                      filter=self._filter(years, manufacturers, reasons))
+        month = pc.month(table.column('date'))
+        table = table.append_column('month', month)
+
+        monthly = table.group_by(['year', 'month']).aggregate([('year', 'count')]).to_pandas()
+        monthly = monthly.rename(columns={'year_count': 'recall_count'}).dropna(subset=['month'])
+        per_year = table.group_by('year').aggregate([('year', 'count')]).to_pandas()
+        per_year = per_year.rename(columns={'year_count': 'recall_count'})
+        reasons_df = table.group_by('reason_norm').aggregate([('year', 'count')]).to_pandas()
+        reasons_df = reasons_df.rename(columns={'reason_norm': 'reason', 'year_count': 'recall_count'}).dropna()
+
+        return {
+            'total': table.num_rows,
+            'unique_manufacturers': pc.count_distinct(table.column('manufacturer_canonical')).as_py(),
+            'unique_reasons': pc.count_distinct(table.column('reason_norm')).as_py(),
+            'monthly': monthly.sort_values(['year', 'month'], ignore_index=True),
+            'per_year': per_year.sort_values('year', ignore_index=True),
+            'reasons': reasons_df.sort_values('recall_count', ascending=False, ignore_index=True),
+        }
+
+    def rows(self, years=None, manufacturers=None, reasons=None, page: int = 0,
+             page_size: Optional[int] = DEFAULT_PAGE_SIZE) -> Tuple[pd.DataFrame, int]:
+        """One page of matching rows (newest first) and the total number of matches."""
+        columns = {'year': report_year(), 'date': 'date', 'recall_ref': 'recall_ref', 'product_name': 'product_name_norm',
+                   'inn_name': 'inn_name_norm', 'batch_no': 'batch_no', 'manufacturer': 'manufacturer_canonical',
+                   'reason': 'reason_norm'}
+        columns = {name: pc.field(c) if isinstance(c, str) else c for name, c in columns.items()}
+        table = self.dataset.to_table(columns=columns, filter=self._filter(years, manufacturers, reasons))
+        total = table.num_rows
+        if page_size is None:
+            table = table.sort_by(ROW_ORDER)
+        else:
+            # Only the rows up to the end of the page are ordered (top-k), not every match.
+            k = min((page + 1) * page_size, total)
+            indices = pc.select_k_unstable(table, k=k, sort_keys=ROW_ORDER) if k else pa.array([], pa.uint64())
+            table = table.take(indices.slice(page * page_size))
+        df = table.to_pandas(date_as_object=False)
+        return df[ROW_COLUMNS], total
+
+    def count(self, years=None, manufacturers=None, reasons=None) -> int:
+        return self.dataset.count_rows(filter=self._filter(years, manufacturers, reasons))
+
+
+class SqlBackend:
+    """
+    Dashboard queries against PostgreSQL: aggregates come from the summary
+    tables kept by recall_summary, rows from the recalls_flat view. Every
+    filter is a bound parameter.
+    """
+
+    name = 'sql'
+
+    # Reasons are matched on reason_norm, as stored in recall_reason_summary and the Parquet store.
+    def _where(self, years=None, manufacturers=None, reasons=None, alias='s', reason_expr=None,
+               year_expr=None) -> Tuple[str, dict]:
+        clauses, params = [], {}
+        if selected(years):
+            clauses.append(f"{year_expr or alias + '.year'} = ANY(:years)")
+            params['years'] = [int(y) for y in years]
+        if selected(manufacturers):
+            clauses.append(f"{alias}.manufacturer_id IN (SELECT id FROM manufacturers WHERE name = ANY(:manufacturers))")
+            params['manufacturers'] = list(manufacturers)
+        if selected(reasons):
+            clauses.append(f"{reason_expr or alias + '.reason'} = ANY(:reasons)")
+            params['reasons'] = list(reasons)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def _query(self, sql: str, params: dict) -> pd.DataFrame:
+        # Imported here so the Parquet mode needs no database packages.
+        from sqlalchemy import text
+        from db import get_engine
+        with get_engine().connect() as connection:
+            return pd.read_sql(text(sql), connection, params=params)
+
+    def options(self) -> Dict[str, list]:
+        from recall_summary import filter_options
+        options = filter_options()
+        reasons = self._query("SELECT DISTINCT reason FROM recall_reason_summary WHERE reason <> ''", {})
+        return {'year': options['year'], 'manufacturer': options['manufacturer'],
+                'reason': sorted(reasons['reason'].tolist())}
+
+    def summary(self, years=None, manufacturers=None, reasons=None) -> Dict:
+        where, params = self._where(years, manufacturers, reasons)
+        cells = self._query(f"""
+            SELECT s.year, s.month, s.manufacturer_id, s.reason, sum(s.recall_count)::int AS recall_count
+            FROM recall_reason_summary s{where}
+            GROUP BY s.year, s.month, s.manufacturer_id, s.reason
+        """, params)
+        monthly = cells[cells['month'] > 0].groupby(['year', 'month'], as_index=False)['recall_count'].sum()
+        per_year = cells.groupby('year', as_index=False)['recall_count'].sum()
+        reasons_df = cells[cells['reason'] != ''].groupby('reason', as_index=False)['recall_count'].sum()
+        return {
+            'total': int(cells['recall_count'].sum()),
+            'unique_manufacturers': cells.loc[cells['manufacturer_id'] != 0, 'manufacturer_id'].nunique(),
+            'unique_reasons': reasons_df['reason'].nunique(),
+            'monthly': monthly,
+            'per_year': per_year,
+            'reasons': reasons_df.sort_values('recall_count', ascending=False, ignore_index=True),
+        }
+
+    def rows(self, years=None, manufacturers=None, reasons=None, page: int = 0,
+             page_size: Optional[int] = DEFAULT_PAGE_SIZE) -> Tuple[pd.DataFrame, int]:
+        from recall_summary import report_year as sql_report_year
+        # Rows carry the same (date) year as the summary tables.
+        year = sql_report_year('f')
+        where, params = self._where(years, manufacturers, reasons, alias='f', reason_expr='f.reason_norm',
+                                    year_expr=year)
+        params.update({'limit': page_size, 'offset': page * (page_size or 0)})
+        df = self._query(f"""
+            SELECT {year} AS year, {', '.join('f.' + c for c in ROW_COLUMNS[1:])}, count(*) OVER () AS total_rows
+            FROM recalls_flat f{where}
+            ORDER BY f.date DESC NULLS LAST, f.id
+            LIMIT :limit OFFSET :offset
+        """, params)
+        total = int(df['total_rows'].iloc[0]) if not df.empty else 0
+        return df.drop(columns='total_rows'), total
+
+
+def get_backend(name: Optional[str] = None, root: str = DEFAULT_STORE_ROOT):
+    """Backend named by `name` or DASHBOARD_BACKEND ('parquet' by default, or 'sql')."""
+    name = (name or os.getenv('DASHBOARD_BACKEND', 'parquet')).lower()
+    if name == 'sql':
+        return SqlBackend()
+    if name == 'parquet':
+        return ParquetBackend(root)
+    raise ValueError(f"Unknown dashboard backend: {name}")
@@ -0,0 +1,101 @@
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool settings, overridable from the environment (.env).
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_RECYCLE = 1800
+DEFAULT_POOL_TIMEOUT = 30
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_url(driver: str = 'psycopg2') -> str:
+    """
+    SQLAlchemy URL for the recalls database.
+
+    DATABASE_URL wins if set; otherwise it is built from DB_USER,
+    DB_PASSWORD, DB_HOST, DB_PORT and DB_NAME.
+    """
+    url = os.getenv('DATABASE_URL')
+    if url:
+        return url
+    missing = [var for var in ('DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT', 'DB_NAME') if not os.getenv(var)]
+    if missing:
+        raise EnvironmentError(f"Missing required environment variables: {', '.join(missing)}")
+    return (f"postgresql+{driver}://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+            f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}")
+
+
+def pool_options() -> Dict:
+    """create_engine() keyword arguments for the connection pool, from DB_POOL_* / DB_ECHO."""
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', DEFAULT_POOL_SIZE)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', DEFAULT_MAX_OVERFLOW)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', DEFAULT_POOL_RECYCLE)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', DEFAULT_POOL_TIMEOUT)),
+        'pool_pre_ping': env_flag('DB_POOL_PRE_PING', True),
+        'echo': env_flag('DB_ECHO', False),
+    }
+
+
+def get_engine():
+    """
+    The process-wide pooled engine, created on first use.
+
+    Creating the engine does not connect; the first query does.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from sqlalchemy import create_engine
+                _engine = create_engine(database_url(), **pool_options())
+    return _engine
+
+
+@contextmanager
+def get_connection() -> Iterator:
+    """
+    A raw psycopg2 connection checked out of the shared pool, for COPY and
+    other driver-level work. It is returned to the pool on exit (rolled back
+    if the block did not commit).
+    """
+    connection = get_engine().raw_connection()
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+def dispose_engine() -> None:
+    """Closes pooled connections, e.g. in a worker process after fork()."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+def vector_store_args() -> Dict:
+    """
+    Connection keyword arguments for langchain PGVector: the shared engine,
+    so every vector store draws from the one process-wide pool instead of
+    creating its own.
+    """
+    # PGVector still requires a connection string, but ignores it when given a connection.
+    return {'connection_string': database_url(), 'connection': get_engine()}
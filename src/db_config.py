@@ -1,14 +1,11 @@
-import os 
-from sqlalchemy import create_engine
-from dotenv import load_dotenv 
+# Kept for scripts that import `engine` from here; new code should use db.get_engine().
+from db import database_url, get_engine
 
-load_dotenv()
 
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
-DB_NAME = os.getenv('DB_NAME')
-
-DATABASE_URL = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
-engine = create_engine(DATABASE_URL, echo=True)
\ No newline at end of file
+def __getattr__(name):
+    # Resolved lazily so importing this module neither reads the pool settings nor builds an engine.
+    if name == 'engine':
+        return get_engine()
+    if name == 'DATABASE_URL':
+        return database_url()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
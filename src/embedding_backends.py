@@ -0,0 +1,107 @@
+import os
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+# 'torch' is the full-precision baseline. 'onnx' runs the ONNX Runtime export
+# of the same model; 'onnx-int8' its dynamically quantized export;
+# 'torch-int8' quantizes the PyTorch Linear layers at load time.
+BACKENDS = ['torch', 'onnx', 'onnx-int8', 'torch-int8']
+# The ONNX backends need extra packages that are not part of the default install.
+ONNX_BACKENDS = ['onnx', 'onnx-int8']
+ONNX_REQUIREMENTS = 'optimum[onnxruntime] (pip install "optimum[onnxruntime]")'
+DEFAULT_BACKEND = 'torch'
+# Quantized export published in the sentence-transformers model repos; the
+# AVX2 build runs on any recent x86-64 CPU.
+DEFAULT_ONNX_INT8_FILE = "onnx/model_qint8_avx2.onnx"
+DEFAULT_BATCH_SIZE = 64
+
+
+def embedding_backend(backend: Optional[str] = None) -> str:
+    """Backend named by `backend` or EMBEDDING_BACKEND ('torch' by default)."""
+    backend = (backend or os.getenv('EMBEDDING_BACKEND', DEFAULT_BACKEND)).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    return backend
+
+
+def embedding_name(model_name: str, backend: Optional[str] = None) -> str:
+    """
+    Identity of the vectors a model/backend pair produces. Quantized vectors
+    differ slightly from the baseline, so caches and registries must not mix
+    them; the baseline keeps the plain model name.
+    """
+    backend = embedding_backend(backend)
+    return model_name if backend == DEFAULT_BACKEND else f"{model_name}@{backend}"
+
+
+def require_onnx_runtime(backend: str) -> None:
+    """Raise a clear ImportError when an ONNX backend is chosen without ONNX Runtime and optimum."""
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError as e:
+        raise ImportError(f"The '{backend}' embedding backend needs {ONNX_REQUIREMENTS}") from e
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    LangChain Embeddings over a sentence-transformers model on the chosen
+    backend. Vectors match HuggingFaceEmbeddings (no normalization) for the
+    'torch' backend.
+
+    sentence-transformers (and ONNX Runtime / optimum for the ONNX backends)
+    is imported on first use.
+
+    Args:
+        model_name (str): Hugging Face model ID.
+        backend (str, optional): One of BACKENDS; defaults to EMBEDDING_BACKEND.
+        batch_size (int, optional): Texts per encode() call.
+        onnx_file (str, optional): Quantized ONNX file for 'onnx-int8'; defaults to EMBEDDING_ONNX_INT8_FILE.
+    """
+
+    def __init__(self, model_name: str, backend: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 onnx_file: Optional[str] = None):
+        self.model_name = model_name
+        self.backend = embedding_backend(backend)
+        self.batch_size = batch_size
+        self.onnx_file = onnx_file or os.getenv('EMBEDDING_ONNX_INT8_FILE', DEFAULT_ONNX_INT8_FILE)
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            if self.backend in ONNX_BACKENDS:
+                require_onnx_runtime(self.backend)
+            from sentence_transformers import SentenceTransformer
+            if self.backend == 'onnx':
+                model = SentenceTransformer(self.model_name, backend='onnx')
+            elif self.backend == 'onnx-int8':
+                model = SentenceTransformer(self.model_name, backend='onnx', model_kwargs={'file_name': self.onnx_file})
+            else:
+                model = SentenceTransformer(self.model_name, device='cpu')
+                if self.backend == 'torch-int8':
+                    import torch
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self._model = model
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        texts = [text.replace('\n', ' ') for text in texts]
+        return self.model.encode(texts, batch_size=self.batch_size).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def load_embeddings(model_name: str, backend: Optional[str] = None) -> Embeddings:
+    """
+    Embeddings for model_name on the selected backend. The baseline stays
+    HuggingFaceEmbeddings, so existing vectors are unchanged unless
+    EMBEDDING_BACKEND is set.
+    """
+    backend = embedding_backend(backend)
+    if backend == DEFAULT_BACKEND:
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+    return SentenceTransformerEmbeddings(model_name, backend)
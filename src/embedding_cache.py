@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from http_cache import atomic_write
+
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process lock, so keep one writer per store.
+    fcntl = None
+
+DEFAULT_CACHE_DIR = "data/cache/embeddings"
+# 100k all-mpnet-base-v2 vectors are ~300 MB on disk.
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def normalize_for_key(text: str) -> str:
+    """Whitespace-insensitive form of a text; chunks differing only in spacing share a vector."""
+    return ' '.join(text.split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps any LangChain Embeddings with a persistent, size-bounded vector cache.
+
+    Vectors are keyed by sha256 of (model name, kind, normalized text), where
+    kind separates documents from queries for models that embed them
+    differently. Each model has its own directory of fixed-size memory-mapped
+    arrays: vectors (max_entries x dim float32), keys (32-byte digests) and
+    last-use ticks. A slot's tick is written last, so an interrupted write
+    leaves the slot empty rather than half filled. When the cache is full,
+    the least recently used slots are reused.
+
+    Several processes may share a store (ingest, rag_query, the recall
+    service). Writes hold an exclusive flock on the store's lock file, and a
+    hit is only trusted if the slot still holds the key looked up, since
+    another process may have evicted it.
+
+    Only texts not in the cache reach the wrapped model, in one call per
+    embed_documents().
+
+    Args:
+        embeddings (Embeddings): The model to wrap.
+        model_name (str): Name the vectors are stored under.
+        cache_dir (str, optional): Parent directory of the per-model stores.
+        max_entries (int, optional): Capacity; fixed when a model's store is created.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', model_name).strip('-')
+        self.directory = os.path.join(cache_dir, slug)
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self.lock = threading.Lock()
+        self.slots: Dict[bytes, int] = {}
+        self.vectors = self.keys = self.used = None
+        self.tick = 0
+
+        meta_path = os.path.join(self.directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self._open(meta['dim'], meta['capacity'], mode='r+')
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _open(self, dim: int, capacity: int, mode: str) -> None:
+        self.dim, self.capacity = dim, capacity
+        self.vectors = np.memmap(self._path('vectors.f32'), dtype=np.float32, mode=mode, shape=(capacity, dim))
+        self.keys = np.memmap(self._path('keys.bin'), dtype='S32', mode=mode, shape=(capacity,))
+        self.used = np.memmap(self._path('used.i64'), dtype=np.int64, mode=mode, shape=(capacity,))
+        # numpy's S32 strips trailing b'\0' from digests, hence ljust; filled
+        # slots are the ones with a non-zero tick.
+        filled = np.flatnonzero(self.used)
+        self.slots = {self._slot_key(i): int(i) for i in filled}
+        self.tick = int(self.used.max()) if capacity else 0
+
+    def _slot_key(self, slot: int) -> bytes:
+        return bytes(self.keys[slot]).ljust(32, b'\0')
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Exclusive lock on the store across processes."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path('lock'), 'a+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _create(self, dim: int) -> None:
+        # Another process may have created the store since we looked.
+        meta_path = self._path('meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self._open(meta['dim'], meta['capacity'], mode='r+')
+            return
+        self._open(dim, self.max_entries, mode='w+')
+        meta = {'model': self.model_name, 'dim': dim, 'capacity': self.max_entries}
+        atomic_write(self._path('meta.json'), json.dumps(meta, indent=2).encode('utf-8'))
+
+    def key(self, text: str, kind: str = 'document') -> bytes:
+        return hashlib.sha256(f"{self.model_name}\x1f{kind}\x1f{normalize_for_key(text)}".encode('utf-8')).digest()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _free_slots(self, count: int) -> np.ndarray:
+        """count slots to write into: empty ones first, then the least recently used."""
+        # The used array is shared, so this also sees other processes' slots.
+        empty = np.flatnonzero(self.used == 0)
+        if len(empty) >= count:
+            return empty[:count]
+        victims = np.argpartition(self.used, count - 1)[:count]
+        evicted = int(np.count_nonzero(self.used[victims]))
+        self.stats['evictions'] += evicted
+        for slot in victims:
+            if self.used[slot]:
+                self.slots.pop(self._slot_key(slot), None)
+        self.used[victims] = 0
+        return victims
+
+    def _store(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        if self.vectors is None:
+            self._create(vectors.shape[1])
+        # Never evict more than the cache holds; an oversized batch keeps its tail.
+        keys, vectors = keys[-self.capacity:], vectors[-self.capacity:]
+        slots = self._free_slots(len(keys))
+        self.vectors[slots] = vectors
+        self.keys[slots] = keys
+        self.tick = max(self.tick, int(self.used.max())) + 1
+        self.used[slots] = self.tick
+        for key, slot in zip(keys, slots):
+            self.slots[key] = int(slot)
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [self.key(text, kind) for text in texts]
+        with self.lock:
+            self.tick += 1
+            found = {}
+            for key in set(keys):
+                slot = self.slots.get(key)
+                if slot is None:
+                    continue
+                if not self.used[slot] or self._slot_key(slot) != key:
+                    # Evicted (and maybe reused) by another process.
+                    del self.slots[key]
+                    continue
+                found[key] = np.array(self.vectors[slot])
+                self.used[slot] = self.tick
+            missing = list(dict.fromkeys(k for k in keys if k not in found))
+            self.stats['hits'] += len(keys) - sum(k not in found for k in keys)
+            self.stats['misses'] += len(missing)
+
+        if missing:
+            first_text = {}
+            for key, text in zip(keys, texts):
+                first_text.setdefault(key, text)
+            missing_texts = [first_text[k] for k in missing]
+            if kind == 'query':
+                new = np.asarray([self.embeddings.embed_query(missing_texts[0])], dtype=np.float32)
+            else:
+                new = np.asarray(self.embeddings.embed_documents(missing_texts), dtype=np.float32)
+            with self.lock, self._file_lock():
+                self._store(missing, new)
+            found.update(zip(missing, new))
+        return [found[key].tolist() for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), 'document') if texts else []
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], 'query')[0]
+
+    def flush(self) -> None:
+        """Writes the memory-mapped arrays back to disk."""
+        with self.lock:
+            for array in (self.vectors, self.keys, self.used):
+                if array is not None:
+                    array.flush()
+
+    def hit_rate(self) -> Optional[float]:
+        total = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / total if total else None
+
+    def describe(self) -> str:
+        rate = self.hit_rate()
+        rate = f"{rate:.1%}" if rate is not None else "n/a"
+        return (f"Embedding cache {self.model_name}: {self.stats['hits']} hits, {self.stats['misses']} misses "
+                f"({rate} hit rate), {self.stats['evictions']} evictions, {len(self)} entries")
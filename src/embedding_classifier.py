@@ -0,0 +1,127 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from langchain_core.embeddings import Embeddings
+
+from embedding_backends import SentenceTransformerEmbeddings
+from embedding_cache import CachedEmbeddings
+from reason_classifier import ReasonClassifier
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_THRESHOLD = 0.45
+
+
+class EmbeddingReasonClassifier:
+    """
+    Nearest-centroid fallback for reasons the keyword rules leave in "Other".
+
+    Each category's centroid is the mean embedding of its rule keywords and
+    of the reasons the rules already assigned to it. A reason takes the
+    category of the most similar centroid if the cosine similarity reaches
+    the threshold; otherwise it stays in the default category.
+
+    Reason embeddings go through the shared embedding cache
+    (embedding_cache.CachedEmbeddings), so reruns only encode new reasons.
+    sentence-transformers is imported on first use, so importing this
+    module (and running the rule-only pipeline) does not need it.
+
+    Args:
+        rules (ReasonClassifier): Rule table providing categories, keywords and the default.
+        model_name (str, optional): sentence-transformers model to load.
+        threshold (float, optional): Minimum cosine similarity to accept a category.
+        batch_size (int, optional): Texts per encode() call.
+        embeddings (Embeddings, optional): Embeddings to use instead; defaults to model_name behind the cache.
+    """
+
+    def __init__(self, rules: ReasonClassifier, model_name: str = DEFAULT_MODEL,
+                 threshold: float = DEFAULT_THRESHOLD, batch_size: int = DEFAULT_BATCH_SIZE,
+                 embeddings: Optional[Embeddings] = None):
+        self.rules = rules
+        self.model_name = model_name
+        self.threshold = threshold
+        if embeddings is None:
+            embeddings = CachedEmbeddings(
+                SentenceTransformerEmbeddings(model_name, backend='torch', batch_size=batch_size), model_name)
+        self.embeddings = embeddings
+        self.centroids: Optional[np.ndarray] = None
+        self.centroid_labels: List[str] = []
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Unit-length embeddings for texts; only texts missing from the cache are encoded."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def fit(self, reasons: pd.Series, categories: pd.Series) -> 'EmbeddingReasonClassifier':
+        """
+        Builds the centroids from the rule keywords plus rule-labelled reasons.
+
+        Args:
+            reasons (pd.Series): Cleaned reasons.
+            categories (pd.Series): Their rule categories; default-category rows are ignored.
+        """
+        examples: Dict[str, List[str]] = {category: [] for category in self.rules.categories}
+        for keyword, index in self.rules.priority.items():
+            examples[self.rules.categories[index]].append(keyword)
+        labelled = pd.DataFrame({'reason': reasons, 'category': categories})
+        labelled = labelled[(labelled['category'] != self.rules.default) & (labelled['reason'] != '')]
+        for category, group in labelled.drop_duplicates().groupby('category'):
+            examples.setdefault(category, []).extend(group['reason'])
+
+        self.centroid_labels = [category for category, texts in examples.items() if texts]
+        texts = [text for category in self.centroid_labels for text in examples[category]]
+        owners = np.repeat(np.arange(len(self.centroid_labels)),
+                           [len(examples[category]) for category in self.centroid_labels])
+        vectors = self.embed(texts)
+        sums = np.zeros((len(self.centroid_labels), vectors.shape[1]), dtype=np.float32)
+        np.add.at(sums, owners, vectors)
+        self.centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+        return self
+
+    def classify(self, reasons: List[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Assigns each reason to the nearest centroid.
+
+        Returns:
+            tuple: (categories, cosine similarity to the chosen centroid).
+        """
+        if self.centroids is None:
+            raise RuntimeError("Call fit() before classify().")
+        if not reasons:
+            return [], np.empty(0, dtype=np.float32)
+        scores = self.embed(list(reasons)) @ self.centroids.T
+        best = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(reasons)), best]
+        labels = [self.centroid_labels[i] if score >= self.threshold else self.rules.default
+                  for i, score in zip(best, confidence)]
+        return labels, confidence
+
+
+def reclassify_other(df: pd.DataFrame, classifier: EmbeddingReasonClassifier,
+                     reason_column: str = 'clean_reasons', category_column: str = 'recall_category') -> pd.DataFrame:
+    """
+    Runs the embedding fallback over the rows the rules left in the default category.
+
+    Adds 'category_source' ('rule' or 'embedding') and 'category_score'
+    (cosine similarity, only for rows the fallback looked at).
+    """
+    default = classifier.rules.default
+    classifier.fit(df[reason_column], df[category_column])
+
+    df['category_source'] = 'rule'
+    df['category_score'] = np.nan
+    # Blank reasons carry nothing to embed; they stay in the default category as the rules left them.
+    blank = df[reason_column].fillna('').astype(str).str.strip() == ''
+    other = (df[category_column] == default) & ~blank
+    unique_reasons = df.loc[other, reason_column].drop_duplicates().tolist()
+    labels, scores = classifier.classify(unique_reasons)
+    label_map = dict(zip(unique_reasons, labels))
+    score_map = dict(zip(unique_reasons, scores))
+
+    df.loc[other, category_column] = df.loc[other, reason_column].map(label_map)
+    df.loc[other, 'category_score'] = df.loc[other, reason_column].map(score_map)
+    df.loc[other & (df[category_column] != default), 'category_source'] = 'embedding'
+    return df
@@ -0,0 +1,264 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from http_cache import HttpCache, OfflineCacheMiss
+
+# One request per second per host, which is what the old time.sleep(1) gave us.
+DEFAULT_RATE_PER_HOST = 1.0
+DEFAULT_BURST = 1
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_TIMEOUT = 30.0
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+USER_AGENT = "ppb-recalls-scraper/0.1 (+https://web.pharmacyboardkenya.org/)"
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for a single host.
+
+    Args:
+        rate (float): Tokens added per second (i.e. sustained requests per second).
+        burst (int): Maximum number of tokens the bucket can hold.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FetchResult:
+    """
+    Outcome of fetching a single URL.
+
+    Attributes:
+        url (str): The requested URL.
+        status_code (int | None): Final HTTP status, or None if the request never completed.
+        content (bytes | None): Response body for successful requests.
+        headers (dict): Response headers.
+        error (Exception | None): The last error if every attempt failed.
+        from_cache (bool): True if content was served from the HTTP cache (304 or offline).
+    """
+
+    def __init__(self, url, status_code=None, content=None, headers=None, error=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.error = error
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.content is not None
+
+    def __repr__(self):
+        return (f"FetchResult(url={self.url!r}, status_code={self.status_code}, "
+                f"ok={self.ok}, from_cache={self.from_cache})")
+
+
+class AsyncFetcher:
+    """
+    Shared async HTTP engine used by all PPB scrapers.
+
+    Wraps one pooled keep-alive httpx.AsyncClient with bounded concurrency,
+    a per-host token-bucket rate limit and retry with exponential backoff.
+
+    Args:
+        concurrency (int): Maximum number of requests in flight.
+        rate_per_host (float): Default sustained requests per second for each host.
+        burst (int): Token-bucket capacity for each host.
+        rate_limits (dict, optional): Per-host overrides, e.g. {"web.pharmacyboardkenya.org": 2.0}.
+        retries (int): Number of retries after the first attempt.
+        backoff (float): Base delay in seconds, doubled on every retry.
+        timeout (float): Per-request timeout in seconds.
+        headers (dict, optional): Extra headers sent with every request.
+        cache (HttpCache, optional): Response cache used for conditional GETs.
+        offline (bool): Serve only from cache and never touch the network.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, rate_per_host=DEFAULT_RATE_PER_HOST,
+                 burst=DEFAULT_BURST, rate_limits: Optional[Dict[str, float]] = None,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT,
+                 headers: Optional[Dict[str, str]] = None, cache: Optional[HttpCache] = None,
+                 offline: bool = False):
+        if offline and cache is None:
+            raise ValueError("offline mode needs a cache")
+        self.concurrency = concurrency
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.rate_limits = rate_limits or {}
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        self.cache = cache
+        self.offline = offline
+        self.client: Optional[httpx.AsyncClient] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    async def __aenter__(self):
+        limits = httpx.Limits(max_connections=self.concurrency,
+                              max_keepalive_connections=self.concurrency)
+        self.client = httpx.AsyncClient(headers=self.headers, timeout=self.timeout,
+                                        limits=limits, follow_redirects=True)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+        self.client = None
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            rate = self.rate_limits.get(host, self.rate_per_host)
+            self.buckets[host] = TokenBucket(rate, self.burst)
+        return self.buckets[host]
+
+    def retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    async def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """
+        Fetch one URL, going through the cache when one is configured.
+
+        Offline mode answers from the cache only. Otherwise cached validators
+        are sent as conditional headers and a 304 is answered from the cache.
+        """
+        if self.cache is None:
+            return await self._fetch(url, headers)
+
+        if self.offline:
+            body = self.cache.read(url)
+            if body is None:
+                return FetchResult(url, error=OfflineCacheMiss(f"{url} is not in the cache"))
+            meta = self.cache.get(url)
+            return FetchResult(url, 200, body, {"content-type": meta.get("content_type")}, from_cache=True)
+
+        conditional = self.cache.conditional_headers(url) if self.cache.has_body(url) else {}
+        result = await self._fetch(url, {**conditional, **(headers or {})})
+        if result.status_code == 304:
+            body = self.cache.read(url)
+            if body is not None:
+                self.cache.revalidated(url, result.headers)
+                return FetchResult(url, 304, body, result.headers, from_cache=True)
+            # The cached body vanished or went bad since the check: ask again without validators.
+            result = await self._fetch(url, headers)
+        if result.ok:
+            self.cache.store(url, result.content, result.headers)
+        return result
+
+    async def _fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> FetchResult:
+        """Fetch one URL over the network, retrying transport errors and retryable status codes."""
+        error = None
+        response = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.retry_delay(attempt - 1, response))
+            response = None
+            try:
+                async with self.semaphore:
+                    await self.bucket_for(url).acquire()
+                    response = await self.client.get(url, headers=headers)
+                if response.status_code in RETRY_STATUS_CODES:
+                    error = httpx.HTTPStatusError(f"Server returned {response.status_code} for {url}",
+                                                  request=response.request, response=response)
+                    continue
+                if response.status_code == 304:
+                    return FetchResult(url, 304, headers=dict(response.headers))
+                response.raise_for_status()
+                return FetchResult(url, response.status_code, response.content, dict(response.headers))
+            except httpx.HTTPStatusError as e:
+                return FetchResult(url, e.response.status_code, headers=dict(e.response.headers), error=e)
+            except httpx.TransportError as e:
+                error = e
+        status_code = response.status_code if response is not None else None
+        return FetchResult(url, status_code, error=error)
+
+    async def fetch_many(self, urls: Iterable[str]) -> List[FetchResult]:
+        """Fetch several URLs concurrently; results keep the input order."""
+        return await asyncio.gather(*(self.fetch(url) for url in urls))
+
+    @asynccontextmanager
+    async def stream(self, url: str, headers: Optional[Dict[str, str]] = None):
+        """
+        Open a streaming GET for large downloads.
+
+        The request holds a concurrency slot and is rate limited like fetch(),
+        but is not retried here since only the caller knows how to resume.
+        """
+        async with self.semaphore:
+            await self.bucket_for(url).acquire()
+            async with self.client.stream("GET", url, headers=headers) as response:
+                yield response
+
+
+def run_blocking(coroutine):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    asyncio.run() refuses to start inside a running event loop (Jupyter,
+    async frameworks), so in that case the coroutine runs on its own loop
+    in a worker thread and this call blocks until it finishes.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+async def fetch_all_async(urls: Iterable[str], **fetcher_kwargs) -> List[FetchResult]:
+    """fetch_all for callers that already run an event loop."""
+    async with AsyncFetcher(**fetcher_kwargs) as fetcher:
+        return await fetcher.fetch_many(list(urls))
+
+
+def fetch_all(urls: Iterable[str], **fetcher_kwargs) -> List[FetchResult]:
+    """
+    Fetch a list of URLs with a temporary AsyncFetcher.
+
+    Blocking convenience wrapper so the scrapers can stay plain functions;
+    it also works from inside a running event loop (e.g. a notebook).
+
+    Args:
+        urls (iterable): URLs to fetch.
+        **fetcher_kwargs: Passed through to AsyncFetcher.
+
+    Returns:
+        list: FetchResult objects in the same order as urls.
+    """
+    return run_blocking(fetch_all_async(urls, **fetcher_kwargs))
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+DEFAULT_CACHE_DIR = "data/http_cache"
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a URL has never been cached."""
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write bytes to path via a temp file in the same directory and an atomic rename."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class HttpCache:
+    """
+    Persistent on-disk HTTP response cache keyed by URL.
+
+    Each URL gets two files named after the sha256 of the URL: the raw body
+    and a JSON metadata record with the ETag, Last-Modified, body sha256 and
+    the time it was fetched. The validators are replayed as If-None-Match /
+    If-Modified-Since so unchanged pages come back as 304s.
+
+    Args:
+        cache_dir (str): Directory holding the cache, created if missing.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return f"{base}.json", f"{base}.body"
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Return the metadata record for url, or None if it is not cached."""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def has_body(self, url: str) -> bool:
+        """Cheap check that url has metadata and a body of the recorded size; read() still verifies the sha."""
+        meta = self.get(url)
+        if meta is None:
+            return False
+        _, body_path = self._paths(url)
+        try:
+            return os.path.getsize(body_path) == meta.get("size")
+        except OSError:
+            return False
+
+    def read(self, url: str) -> Optional[bytes]:
+        """Return the cached body for url, or None if missing or corrupt."""
+        meta = self.get(url)
+        if meta is None:
+            return None
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(body).hexdigest() != meta.get("sha256"):
+            return None
+        return body
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from the cached validators."""
+        meta = self.get(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, url: str, content: bytes, headers: Dict[str, str]) -> Dict:
+        """Save a fresh 200 response body and its validators."""
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        atomic_write(body_path, content)
+        meta = {
+            "url": url,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "content_type": headers.get("content-type"),
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "size": len(content),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }
+        atomic_write(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+        return meta
+
+    def revalidated(self, url: str, headers: Dict[str, str]) -> Dict:
+        """Record a 304: refresh the timestamp and any validators the server resent."""
+        meta = self.get(url)
+        if headers.get("etag"):
+            meta["etag"] = headers["etag"]
+        if headers.get("last-modified"):
+            meta["last_modified"] = headers["last-modified"]
+        meta["fetched_at"] = datetime.now(timezone.utc).isoformat()
+        meta_path, _ = self._paths(url)
+        atomic_write(meta_path, json.dumps(meta, indent=2).encode("utf-8"))
+        return meta
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+from datetime import date, datetime, timezone
+
+import pandas as pd
+
+from http_cache import DEFAULT_CACHE_DIR, HttpCache, atomic_write
+from recall_store import append_rows
+from recalls_2022_2025 import extract_recalls_and_products
+from scrape_data import scrape_rapid_alerts
+
+BASE_URL_PREFIX = "https://web.pharmacyboardkenya.org/"
+WATERMARKS_PATH = "data/state/watermarks.json"
+
+RECALL_FIELDS = ['year', 'date', 'recall_ref', 'product_name', 'inn_name', 'batch_no', 'manufacturer', 'reason']
+RAPID_ALERT_FIELDS = ['year', 'date', 'title', 'pdf_url', 'product_type', 'source', 'manufacturer']
+
+# Each source: how to scrape a year range, which columns identify a row, where
+# the combined dataset lives and the first year the live scraper covers. The
+# range runs from the watermark year to the current year; recall pages of years
+# without a known slug are looked up by recalls_2022_2025.candidate_page_urls.
+SOURCES = {
+    'recalls': {
+        'scrape': lambda start, end, base, **kw: extract_recalls_and_products(start, end, base, **kw)['recalls'],
+        'fields': RECALL_FIELDS,
+        'path': 'data/csv/recalls_combined.csv',
+        'first_year': 2022,
+    },
+    'rapid_alerts': {
+        'scrape': lambda start, end, base, **kw: scrape_rapid_alerts(base, start, end, **kw)['rapid_alerts'],
+        'fields': RAPID_ALERT_FIELDS,
+        'path': 'data/csv/rapid_alerts.csv',
+        'first_year': 2018,
+    },
+}
+
+
+def row_hash(record, fields):
+    """
+    Stable hash of a record over the given fields.
+
+    Values are compared as stripped strings so rows read back from CSV hash
+    the same as freshly scraped ones.
+    """
+    values = ['' if record.get(f) is None else str(record.get(f)).strip() for f in fields]
+    return hashlib.sha256('\x1f'.join(values).encode('utf-8')).hexdigest()
+
+
+def load_watermarks(path=WATERMARKS_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_watermarks(watermarks, path=WATERMARKS_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    atomic_write(path, json.dumps(watermarks, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def read_rows(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def ref_sort_key(record):
+    """Orders rows by year, then by the running number in refs like REC/2025/017."""
+    match = re.search(r'(\d+)\s*$', record.get('recall_ref') or '')
+    return int(record['year']), int(match.group(1)) if match else -1
+
+
+def build_watermark(records, fields):
+    """
+    Watermark for a source: the latest year seen plus the hashes of every row
+    from that year, since only that year's page (and later ones) can still change.
+    """
+    if not records:
+        return None
+    last_year = max(int(r['year']) for r in records)
+    open_rows = [r for r in records if int(r['year']) == last_year]
+    latest = max(open_rows, key=ref_sort_key)
+    return {
+        'year': last_year,
+        'recall_ref': latest.get('recall_ref'),
+        'date': latest.get('date'),
+        'row_hashes': sorted({row_hash(r, fields) for r in open_rows}),
+        'updated_at': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def append_records(records, path, fields):
+    """Append records to a CSV, writing the header only if the file is new."""
+    is_new = not os.path.exists(path)
+    if not is_new:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            fields = next(csv.reader(f), fields)
+    with open(path, 'a', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fields, extrasaction='ignore', restval='')
+        if is_new:
+            writer.writeheader()
+        writer.writerows(records)
+
+
+def scrape_incremental(source, end_year=None, base_url_prefix=BASE_URL_PREFIX,
+                       watermarks_path=WATERMARKS_PATH, **fetcher_kwargs):
+    """
+    Scrapes only the pages that can hold new rows and appends unseen records
+    to both the combined CSV and the Parquet store.
+
+    The first run bootstraps the watermark from the existing combined CSV, so
+    rows already there are not appended again.
+
+    Args:
+        source (str): 'recalls' or 'rapid_alerts'.
+        end_year (int, optional): Last year to scrape, defaults to the current year.
+        base_url_prefix (str, optional): Site root, overridable for replaying recorded pages.
+        watermarks_path (str, optional): JSON file holding the per-source watermarks.
+        **fetcher_kwargs: Cache, rate limit and retry settings for fetcher.AsyncFetcher.
+
+    Returns:
+        list: The newly appended records.
+    """
+    config = SOURCES[source]
+    fields = config['fields']
+    end_year = end_year or date.today().year
+
+    watermarks = load_watermarks(watermarks_path)
+    watermark = watermarks.get(source)
+    if watermark is None:
+        watermark = build_watermark(read_rows(config['path']), fields)
+        if watermark:
+            print(f"Bootstrapped {source} watermark from {config['path']} at year {watermark['year']}")
+
+    start_year = watermark['year'] if watermark else config['first_year']
+    seen = set(watermark['row_hashes']) if watermark else set()
+    print(f"Incremental {source} scrape for {start_year}-{end_year}")
+
+    scraped = config['scrape'](start_year, end_year, base_url_prefix, **fetcher_kwargs)
+    new_records = []
+    for record in scraped:
+        key = row_hash(record, fields)
+        if key not in seen:
+            seen.add(key)
+            new_records.append(record)
+
+    if new_records:
+        append_records(new_records, config['path'], fields)
+        append_rows(pd.DataFrame(new_records), source)
+    print(f"{source}: {len(scraped)} rows scraped, {len(new_records)} new rows appended to {config['path']}")
+
+    if scraped:
+        # Hashes from the old watermark year are still needed if no newer year appeared.
+        carried = [r for r in read_rows(config['path']) if int(r['year']) >= start_year]
+        watermarks[source] = build_watermark(carried, fields)
+        save_watermarks(watermarks, watermarks_path)
+    return new_records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append new PPB recalls and rapid alerts since the last run.")
+    parser.add_argument('--source', choices=sorted(SOURCES), action='append',
+                        help='Source to refresh (repeatable, default: all)')
+    parser.add_argument('--end-year', type=int, default=None, help='Last year to scrape (default: current year)')
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help='HTTP cache directory')
+    parser.add_argument('--offline', action='store_true', help='Serve pages only from the HTTP cache')
+    args = parser.parse_args()
+
+    cache = HttpCache(args.cache_dir)
+    for source in args.source or sorted(SOURCES):
+        scrape_incremental(source, end_year=args.end_year, cache=cache, offline=args.offline)
@@ -1,43 +1,55 @@
 import os
+import json
+import queue
 import logging
 import argparse
-from typing import List
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
 from tqdm import tqdm
-from dotenv import load_dotenv
 
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores.pgvector import PGVector
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores.pgvector import DistanceStrategy, PGVector
 from langchain_core.documents import Document
 
+from db import get_connection, vector_store_args
+from embedding_backends import embedding_name, load_embeddings
+from embedding_cache import CachedEmbeddings
+from http_cache import atomic_write
+from pdf_downloader import file_sha256
+from pdf_text import extractor_version, load_documents
+from vector_copy import ChunkRow, EmbeddingCopyWriter
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
-# Load environment variables
-load_dotenv()
+EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+COLLECTION_NAME = "recalls_pdf_chunks"
+# Recorded in the collection metadata; vector_index builds and queries its ANN index with the same operators.
+DISTANCE_STRATEGY = DistanceStrategy.COSINE
+REGISTRY_PATH = "data/state/ingest_registry.json"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
 
-# Validate 
-required_envs = ["DB_USER", "DB_PASSWORD", "DB_HOST", "DB_PORT", "DB_NAME"]
-missing = [var for var in required_envs if not os.getenv(var)]
-if missing:
-    raise EnvironmentError(f"Missing required environment variables: {', '.join(missing)}")
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+DEFAULT_BATCH_SIZE = 128
+# Batches waiting for the writer; bounds memory together with the batch size.
+DEFAULT_QUEUE_BATCHES = 4
 
-CONNECTION_STRING = (
-    f'postgresql+psycopg2://{os.getenv("DB_USER")}:{os.getenv("DB_PASSWORD")}'
-    f'@{os.getenv("DB_HOST")}:{os.getenv("DB_PORT")}/{os.getenv("DB_NAME")}'
-)
 
-# Initialize embeddings
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-mpnet-base-v2")
+@lru_cache(maxsize=1)
+def get_embeddings() -> CachedEmbeddings:
+    """Embedding model behind the persistent embedding cache, loaded on first use rather than at import."""
+    return CachedEmbeddings(load_embeddings(EMBEDDING_MODEL), embedding_name(EMBEDDING_MODEL))
 
-def load_and_split_pdf(file_path: str) -> List[Document]:
-    """Load a PDF file and split it into chunks."""
-    loader = PyPDFLoader(file_path)
-    docs = loader.load()
+def load_and_split_pdf(file_path: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[Document]:
+    """Load a PDF file (page text from the pdf_text cache) and split it into chunks."""
+    docs = load_documents(file_path)
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=100)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
     chunks = splitter.split_documents(docs)
 
     for chunk in chunks:
@@ -46,54 +58,253 @@ def load_and_split_pdf(file_path: str) -> List[Document]:
     return chunks
 
 
-def ingest_pdfs_to_pgvector(pdf_folder: str) -> None:
-    """Ingest PDF documents from a folder into PGVector."""
-    if not os.path.exists(pdf_folder):
-        raise FileNotFoundError(f"PDF folder not found: {pdf_folder}")
+def chunk_ids(doc_key: str, sha256: str, count: int) -> List[str]:
+    """Deterministic vector-store IDs of a document version's chunks, so they can be deleted later."""
+    return [f"{doc_key}#{sha256[:16]}:{i}" for i in range(count)]
+
 
-    pdf_files = [f for f in os.listdir(pdf_folder) if f.endswith('.pdf')]
-    if not pdf_files:
-        logging.warning(f"No PDF files found in {pdf_folder}")
-        return
+class DocumentRegistry:
+    """
+    What each collection holds, per document: file sha256, chunking
+    parameters, embedding model and chunk count.
 
-    all_chunks = []
-    logging.info(f"Found {len(pdf_files)} PDF files in {pdf_folder}")
+    A document is marked 'pending' before its first chunk is queued and
+    'done' once all of its chunks are committed, so chunks left by an
+    interrupted run are known and can be deleted.
+    """
 
-    for filename in tqdm(pdf_files, desc="Processing PDFs"):
+    def __init__(self, path: str = REGISTRY_PATH):
+        self.path = path
+        self.lock = threading.Lock()
         try:
-            chunks = load_and_split_pdf(os.path.join(pdf_folder, filename))
-            all_chunks.extend(chunks)
+            with open(path, 'r', encoding='utf-8') as f:
+                self.collections = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.collections = {}
+
+    def documents(self, collection: str) -> Dict[str, Dict]:
+        return self.collections.setdefault(collection, {})
+
+    def is_current(self, collection: str, doc_key: str, version: Dict) -> bool:
+        entry = self.documents(collection).get(doc_key)
+        return (entry is not None and entry.get('status') == 'done'
+                and all(entry.get(k) == v for k, v in version.items()))
+
+    def stored_ids(self, collection: str, doc_key: str) -> List[str]:
+        """IDs of the chunks the collection may hold for doc_key (none if it was never written)."""
+        entry = self.documents(collection).get(doc_key)
+        return chunk_ids(doc_key, entry['sha256'], entry['chunks']) if entry else []
+
+    def set(self, collection: str, doc_key: str, entry: Optional[Dict]) -> None:
+        with self.lock:
+            if entry is None:
+                self.documents(collection).pop(doc_key, None)
+            else:
+                self.documents(collection)[doc_key] = entry
+            atomic_write(self.path, json.dumps(self.collections, indent=2, sort_keys=True).encode('utf-8'))
+
+
+def get_vector_store(collection_name: str = COLLECTION_NAME) -> PGVector:
+    return PGVector(
+        embedding_function=get_embeddings(),
+        collection_name=collection_name,
+        distance_strategy=DISTANCE_STRATEGY,
+        collection_metadata={'distance_strategy': DISTANCE_STRATEGY.value},
+        **vector_store_args(),
+    )
+
+
+def ingest_pdfs_to_pgvector(pdf_folders: Union[str, Iterable[str]], collection_name: str = COLLECTION_NAME,
+                            workers: int = DEFAULT_WORKERS, batch_size: int = DEFAULT_BATCH_SIZE,
+                            queue_batches: int = DEFAULT_QUEUE_BATCHES, registry_path: str = REGISTRY_PATH,
+                            chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Dict[str, int]:
+    """
+    Incrementally sync the PDFs in one or more folders into a PGVector collection.
+
+    Documents are compared with the registry by content hash, chunking
+    parameters and embedding model. Unchanged documents are skipped, changed
+    ones have their old chunks deleted and are re-embedded, and documents
+    removed from a folder have their chunks purged.
+
+    New and changed documents go through a streaming pipeline: worker
+    processes parse and split PDFs, the main process cuts their chunks into
+    fixed-size batches on a bounded queue, and a writer thread embeds one
+    batch at a time. Once all of a file's chunks are embedded, they are
+    written with binary COPY and committed in one transaction, so a file is
+    either fully in the collection or not at all. At most `queue_batches`
+    batches plus the files being parsed and embedded are in memory at once.
+
+    Returns:
+        dict: Counts of 'files', 'skipped', 'failed', 'purged', 'chunks' and 'batches'.
+    """
+    folders = [pdf_folders] if isinstance(pdf_folders, str) else list(pdf_folders)
+    paths = []
+    for folder in folders:
+        if not os.path.exists(folder):
+            raise FileNotFoundError(f"PDF folder not found: {folder}")
+        paths += [os.path.realpath(os.path.join(folder, f)) for f in sorted(os.listdir(folder)) if f.endswith('.pdf')]
+
+    # Documents are keyed by resolved path, however the folder was spelled on the command line.
+    # Entries under any other spelling of a scanned folder are purged and re-ingested once.
+    registry = DocumentRegistry(registry_path)
+    documents = registry.documents(collection_name)
+    scanned = {os.path.realpath(folder) for folder in folders}
+    present = set(paths)
+    removed = [key for key in documents if os.path.dirname(os.path.realpath(key)) in scanned and key not in present]
+
+    versions = {path: {'sha256': file_sha256(path), 'chunk_size': chunk_size, 'chunk_overlap': chunk_overlap,
+                       'model': embedding_name(EMBEDDING_MODEL), 'extractor': extractor_version()}
+                for path in paths}
+    todo = [path for path in paths if not registry.is_current(collection_name, path, versions[path])]
+    stats = {'files': len(paths), 'skipped': len(paths) - len(todo), 'failed': 0, 'purged': len(removed),
+             'chunks': 0, 'batches': 0}
+    logging.info(f"Found {len(paths)} PDF files in {', '.join(folders)}: {len(todo)} new or changed, "
+                 f"{stats['skipped']} unchanged, {len(removed)} removed")
+    if not todo and not removed:
+        return stats
+
+    store = get_vector_store(collection_name)
+    # Old chunks of changed, interrupted and removed documents go first.
+    for key in removed + todo:
+        stale = registry.stored_ids(collection_name, key)
+        if stale:
+            store.delete(ids=stale, collection_only=True)
+            registry.set(collection_name, key, None)
+    if not todo:
+        return stats
+
+    batches: queue.Queue = queue.Queue(maxsize=queue_batches)
+    # Chunks of each parsed file still waiting to be committed.
+    pending: Dict[str, int] = {}
+    entries: Dict[str, Dict] = {}
+    failed: Set[str] = set()
+    completed: Set[str] = set()
+    lock = threading.Lock()
+
+    def file_written(path: str) -> None:
+        if path in failed:
+            return
+        try:
+            registry.set(collection_name, path, dict(entries[path], status='done'))
+            completed.add(path)
+        except OSError as e:
+            logging.error(f"Could not record {path} in the registry: {e}")
+
+    def write_file(copy_writer: EmbeddingCopyWriter, path: str, rows: List[ChunkRow]) -> None:
+        if path in failed:
+            return
+        try:
+            copy_writer.write(rows)
         except Exception as e:
-            logging.error(f"Failed to process {filename}: {e}")
-
-    if not all_chunks:
-        logging.warning("No chunks to ingest.")
-        return
-
-    logging.info(f"Ingesting {len(all_chunks)} chunks into the vector store...")
-    try:
-        PGVector.from_documents(
-            documents=all_chunks,
-            embedding=embeddings,
-            connection_string=CONNECTION_STRING,
-            collection_name="recalls_pdf_chunks",
-            collection_config={"distance_strategy": "COSINE"}
-        )
-        logging.info("Ingestion complete.")
-    except Exception as e:
-        logging.error(f"Error during ingestion to PGVector: {e}")
+            logging.error(f"Failed to write the {len(rows)} chunks of {path}: {e}")
+            failed.add(path)
+            return
+        file_written(path)
+
+    def consume(copy_writer: EmbeddingCopyWriter) -> None:
+        # Embedded rows of files that still have chunks in the queue.
+        rows: Dict[str, List[ChunkRow]] = defaultdict(list)
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            paths_in_batch = Counter(path for path, _, _ in batch)
+            try:
+                vectors = store.embedding_function.embed_documents([chunk.page_content for _, _, chunk in batch])
+                stats['batches'] += 1
+            except Exception as e:
+                logging.error(f"Failed to embed a batch of {len(batch)} chunks: {e}")
+                failed.update(paths_in_batch)
+                vectors = []
+            for (path, chunk_id, chunk), vector in zip(batch, vectors):
+                rows[path].append((chunk_id, chunk.page_content, chunk.metadata, vector))
+            with lock:
+                finished = []
+                for path, count in paths_in_batch.items():
+                    pending[path] -= count
+                    if pending[path] == 0:
+                        finished.append(path)
+            for path in finished:
+                write_file(copy_writer, path, rows.pop(path, []))
+
+    def writer() -> None:
+        try:
+            with get_connection() as connection:
+                consume(EmbeddingCopyWriter(connection, collection_name))
+        except Exception as e:
+            logging.error(f"Writer stopped: {e}")
+            # Keep draining so the parsing side never blocks on a full queue.
+            while batches.get() is not None:
+                pass
+
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+
+    buffer: List[Tuple[str, str, Document]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool, tqdm(total=len(todo), desc="Processing PDFs") as progress:
+        files = iter(todo)
+        in_flight = {}
+
+        def submit_next() -> None:
+            path = next(files, None)
+            if path is not None:
+                in_flight[pool.submit(load_and_split_pdf, path, chunk_size, chunk_overlap)] = path
+
+        # Keep only a few files parsed ahead of the writer.
+        for _ in range(workers * 2):
+            submit_next()
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = in_flight.pop(future)
+                submit_next()
+                progress.update(1)
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    logging.error(f"Failed to process {path}: {e}")
+                    continue
+
+                entries[path] = dict(versions[path], chunks=len(chunks))
+                stats['chunks'] += len(chunks)
+                if not chunks:
+                    file_written(path)
+                    continue
+                registry.set(collection_name, path, dict(entries[path], status='pending'))
+                with lock:
+                    pending[path] = len(chunks)
+                ids = chunk_ids(path, versions[path]['sha256'], len(chunks))
+                buffer.extend((path, chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks))
+                while len(buffer) >= batch_size:
+                    batches.put(buffer[:batch_size])  # blocks while the writer is behind
+                    buffer = buffer[batch_size:]
+
+    if buffer:
+        batches.put(buffer)
+    batches.put(None)
+    writer_thread.join()
+
+    stats['failed'] = len(todo) - len(completed)
+    get_embeddings().flush()
+    logging.info(get_embeddings().describe())
+    logging.info(f"Ingested {stats['chunks']} chunks in {stats['batches']} batches from {len(todo)} files "
+                 f"({stats['skipped']} unchanged, {stats['purged']} purged, {stats['failed']} failed).")
+    return stats
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest PDF documents into PGVector.")
     parser.add_argument(
         "--folder",
         type=str,
+        action="append",
         required=True,
-        help="Path to the folder containing PDF files"
+        help="Path to a folder containing PDF files (repeatable)"
     )
+    parser.add_argument("--collection", type=str, default=COLLECTION_NAME, help="PGVector collection name")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="PDF parsing processes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Chunks per embedding/commit batch")
+    parser.add_argument("--registry", type=str, default=REGISTRY_PATH, help="Document registry file")
     args = parser.parse_args()
 
-    ingest_pdfs_to_pgvector(pdf_folder=args.folder) 
-
-    
-
+    ingest_pdfs_to_pgvector(pdf_folders=args.folder, collection_name=args.collection, workers=args.workers,
+                            batch_size=args.batch_size, registry_path=args.registry)
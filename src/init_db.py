@@ -1,6 +1,68 @@
-from db_config import engine
-from models import Base
+import logging
 
-Base.metadata.create_all(engine)
-print("Database initialized and tables created.")
+import pandas as pd
+from sqlalchemy import inspect, text
 
+from db import get_engine
+from models import EXTENSIONS, RECALLS_FLAT_VIEW, Base
+
+# The original flat table, before products and manufacturers were split out.
+LEGACY_TABLE = 'recalls_legacy'
+LEGACY_COLUMNS = {'year', 'product_name', 'inn_name', 'manufacturer', 'reason'}
+
+
+def is_legacy_recalls(engine) -> bool:
+    """True when `recalls` still has the flat (year, product_name, ..., manufacturer) shape."""
+    inspector = inspect(engine)
+    if not inspector.has_table('recalls'):
+        return False
+    columns = {c['name'] for c in inspector.get_columns('recalls')}
+    return 'product_id' not in columns and LEGACY_COLUMNS <= columns
+
+
+def rename_legacy_recalls(engine) -> None:
+    """Moves the flat table (with its key and sequence) out of the way of the normalized schema."""
+    if inspect(engine).has_table(LEGACY_TABLE):
+        raise RuntimeError(f"Both a flat `recalls` table and {LEGACY_TABLE} exist; "
+                           f"drop or rename {LEGACY_TABLE} and rerun init_db")
+    with engine.begin() as connection:
+        connection.execute(text(f"ALTER TABLE recalls RENAME TO {LEGACY_TABLE}"))
+        connection.execute(text(f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT recalls_pkey TO {LEGACY_TABLE}_pkey"))
+        connection.execute(text(f"ALTER SEQUENCE IF EXISTS recalls_id_seq RENAME TO {LEGACY_TABLE}_id_seq"))
+    logging.info(f"Renamed the flat recalls table to {LEGACY_TABLE}")
+
+
+def copy_legacy_recalls(engine) -> None:
+    """Loads the flat table's rows into the normalized tables through the regular loader."""
+    # Imported here: the loader pulls in the classifier and manufacturer index.
+    from load_data import normalize_frame, upsert_recalls
+
+    df = pd.read_sql_table(LEGACY_TABLE, engine, columns=sorted(LEGACY_COLUMNS))
+    if df.empty:
+        return
+    # The flat table had no publication date.
+    df['date'] = None
+    counts = upsert_recalls(normalize_frame(df))
+    logging.info(f"Copied {counts['staged']} rows from {LEGACY_TABLE} ({counts['inserted']} new recalls)")
+
+
+def init_db():
+    engine = get_engine()
+    with engine.begin() as connection:
+        for extension in EXTENSIONS:
+            connection.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+    # create_all skips tables that exist, so a flat `recalls` table has to be migrated first.
+    legacy = is_legacy_recalls(engine)
+    if legacy:
+        rename_legacy_recalls(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(RECALLS_FLAT_VIEW))
+    if legacy:
+        copy_legacy_recalls(engine)
+    print("Database initialized and tables created.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    init_db()
@@ -1,10 +1,18 @@
-import os
+import io
+import time
 import logging
 import argparse
 import pandas as pd
-from typing import Optional
+import psycopg2
+from typing import Dict, List, Optional
 from sqlalchemy.exc import SQLAlchemyError
-from db_config import engine
+from db import get_connection
+from recall_store import read_recalls
+import text_normalize
+from manufacturer_index import resolve_frame
+from category_cache import CategoryCache, classify_unique
+from reason_classifier import RULES_PATH, ReasonClassifier
+import recall_summary
 
 # --- Logging setup ---
 logging.basicConfig(
@@ -14,28 +22,61 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Columns staged for the loader, and the natural key that identifies a recall row.
+# product_name + inn_name identify the product; recalls are unique per (recall_ref, batch_no, product, year).
+# The page year keeps apart the 2016-2021 recalls, which have no recall_ref: the same
+# product and batch recalled in two years is two recalls.
+STAGING_COLUMNS = ['year', 'date', 'recall_ref', 'product_name', 'inn_name', 'batch_no', 'manufacturer_id',
+                   'manufacturer', 'reason', 'reason_norm', 'recall_category']
+NATURAL_KEY = ['recall_ref', 'batch_no', 'product_name', 'inn_name', 'year']
+TEXT_KEY = [c for c in NATURAL_KEY if c != 'year']
+
+# Separators inside a published batch list ("11A, 2A & 6A", "B1/B2", "X and Y").
+BATCH_SEPARATORS = r'\s*(?:[,;/&]|\sand\s)\s*'
+
+classifier = ReasonClassifier.from_file(RULES_PATH)
+
 # --- Data normalization ---
-def load_and_normalize_csv(csv_path: str) -> Optional[pd.DataFrame]:
-    try:
-        logger.info(f"Loading CSV: {csv_path}")
-        df = pd.read_csv(csv_path)
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Store reads already carry the *_norm and canonical manufacturer columns; CSV imports compute them here.
+    if 'manufacturer_canonical' not in df.columns:
+        df = resolve_frame(text_normalize.normalize_frame(df))
+
+    df['manufacturer'] = df['manufacturer_canonical']
+    df['date'] = pd.to_datetime(df['date'], dayfirst=True, format='mixed', errors='coerce')
+    df['recall_category'] = classify_unique(df['clean_reasons'], classifier, CategoryCache(classifier.version))
+    df['inn_name'] = df['inn_name'].astype('string').str.strip()
+    df['reason'] = df['reason'].astype('string').str.strip()
+    # Natural key columns are never NULL (NULLs would defeat the unique constraint).
+    for column in TEXT_KEY:
+        if column not in df.columns:
+            df[column] = ''
+        df[column] = df[column].fillna('').astype(str).str.strip()
+    year = pd.to_numeric(df['year'], errors='coerce') if 'year' in df.columns else pd.Series(pd.NA, index=df.index)
+    df['year'] = year.fillna(df['date'].dt.year).fillna(0).astype('int16')
+    # reason_norm is kept: it is the reason key of the summaries and the dashboard.
+    derived = [c for c in text_normalize.NORMALIZED_COLUMNS if c != 'reason_norm'] + ['manufacturer_canonical']
+    df = df.drop(columns=[c for c in derived if c in df.columns])
 
-        # Normalize text fields
-        manufacturer_map = {
-            "dawa life sciences": "dawa ltd",
-            "dawa limited": "dawa ltd",
-            "dawa ltd": "dawa ltd",
-            "dawa pharmaceuticals": "dawa ltd",
-            "dawa pharmaceuticals ltd": "dawa ltd",
-        }
+    logger.info("Data normalization complete.")
+    return df
 
-        df['manufacturer'] = df['manufacturer'].astype(str).str.strip().str.lower().replace(manufacturer_map)
-        df['product_name'] = df['product_name'].astype(str).str.strip()
-        df['inn_name'] = df['inn_name'].astype(str).str.strip()
-        df['reason'] = df['reason'].astype(str).str.strip()
+def load_and_normalize(years: Optional[List[int]] = None) -> Optional[pd.DataFrame]:
+    try:
+        logger.info("Loading recalls from the Parquet store")
+        return normalize_frame(read_recalls(years=years))
+
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        return None
+    except Exception as e:
+        logger.error(f"Failed to load/normalize data: {e}", exc_info=True)
+        return None
 
-        logger.info("Data normalization complete.")
-        return df
+def load_and_normalize_csv(csv_path: str) -> Optional[pd.DataFrame]:
+    try:
+        logger.info(f"Loading CSV: {csv_path}")
+        return normalize_frame(pd.read_csv(csv_path))
 
     except FileNotFoundError:
         logger.error(f"File not found: {csv_path}")
@@ -44,26 +85,150 @@ def load_and_normalize_csv(csv_path: str) -> Optional[pd.DataFrame]:
         logger.error(f"Failed to load/normalize data: {e}", exc_info=True)
         return None
 
-# --- Insert Our DB ---
-def insert_to_db(df: Optional[pd.DataFrame], table_name: str = 'recalls') -> None:
+# --- Bulk upsert ---
+def upsert_recalls(df: Optional[pd.DataFrame]) -> Dict[str, int]:
+    """
+    Streams rows into a temporary staging table with COPY FROM STDIN, then
+    upserts manufacturers, products, recalls and the exploded recall_batches
+    in one transaction, then refreshes the summary cells the load touched
+    (recall_summary). Recalls are matched on the natural key
+    (recall_ref, batch_no, product, year); rows whose values did not change are
+    skipped, so rerunning the loader is idempotent.
+
+    Returns:
+        dict: Rows 'staged', 'inserted', 'updated' and 'skipped', plus new 'batches' and refreshed 'summary_cells'.
+    """
+    counts = {'staged': 0, 'inserted': 0, 'updated': 0, 'skipped': 0, 'batches': 0, 'summary_cells': 0}
     if df is None or df.empty:
         logger.warning("No data to insert.")
-        return
+        return counts
 
-    try:
-        df.to_sql(table_name, con=engine, if_exists='append', index=False, method='multi')
-        logger.info(f"Inserted {len(df)} rows into '{table_name}' table.")
-    except SQLAlchemyError as e:
-        logger.error(f"Database insert failed: {e}", exc_info=True)
+    start = time.perf_counter()
+    rows = df.reindex(columns=STAGING_COLUMNS)
+    rows['manufacturer_id'] = rows['manufacturer_id'].astype('Int64')
+    unresolved = rows.loc[rows['manufacturer_id'].isna() & rows['manufacturer'].notna(), 'manufacturer'].nunique()
+    if unresolved:
+        logger.warning(f"{unresolved} manufacturers have no ID yet; run `python src/recall_store.py resolve` "
+                       f"and reload to link them")
+    buffer = io.StringIO()
+    rows.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d')
+    buffer.seek(0)
+    counts['staged'] = len(rows)
+
+    columns = ', '.join(STAGING_COLUMNS)
+    text_key = ', '.join(TEXT_KEY)
+    recall_values = ['date', 'manufacturer_id', 'reason', 'reason_norm', 'recall_category']
+    updates = ', '.join(f"{c} = EXCLUDED.{c}" for c in recall_values)
+    changed = ' OR '.join(f"recalls.{c} IS DISTINCT FROM EXCLUDED.{c}" for c in recall_values)
+
+    with get_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TEMP TABLE recalls_staging (
+                        year smallint, date date, recall_ref text, product_name text, inn_name text,
+                        batch_no text, manufacturer_id integer, manufacturer text, reason text,
+                        reason_norm text, recall_category text
+                    ) ON COMMIT DROP
+                """)
+                # FORCE_NOT_NULL keeps empty key fields as '' instead of NULL.
+                cursor.copy_expert(
+                    f"COPY recalls_staging ({columns}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({text_key}))", buffer)
+
+                # An ID, once stored, keeps its name: a mismatch means the alias table and the
+                # database disagree, which a rename here would only hide.
+                cursor.execute("""
+                    INSERT INTO manufacturers (id, name)
+                    SELECT DISTINCT ON (manufacturer_id) manufacturer_id, manufacturer
+                    FROM recalls_staging WHERE manufacturer_id IS NOT NULL
+                    ON CONFLICT (id) DO NOTHING
+                """)
+                cursor.execute("""
+                    SELECT DISTINCT m.id, m.name, s.manufacturer
+                    FROM recalls_staging s JOIN manufacturers m ON m.id = s.manufacturer_id
+                    WHERE m.name IS DISTINCT FROM s.manufacturer
+                """)
+                for manufacturer_id, stored, staged in cursor.fetchall():
+                    logger.warning(f"Manufacturer {manufacturer_id} is stored as {stored!r} but staged as {staged!r}; "
+                                   f"kept the stored name")
+                cursor.execute("""
+                    INSERT INTO products (product_name, inn_name)
+                    SELECT DISTINCT product_name, inn_name FROM recalls_staging
+                    ON CONFLICT (product_name, inn_name) DO NOTHING
+                """)
+                cursor.execute(recall_summary.STAGE_TOUCHED_CELLS)
+                # DISTINCT ON: a key may appear twice in one load; ON CONFLICT cannot touch a row twice.
+                cursor.execute(f"""
+                    WITH upserted AS (
+                        INSERT INTO recalls (recall_ref, batch_no, product_id, year, {', '.join(recall_values)})
+                        SELECT DISTINCT ON (s.recall_ref, s.batch_no, p.id, s.year)
+                               s.recall_ref, s.batch_no, p.id, s.year, {', '.join('s.' + c for c in recall_values)}
+                        FROM recalls_staging s
+                        JOIN products p ON p.product_name = s.product_name AND p.inn_name = s.inn_name
+                        ORDER BY s.recall_ref, s.batch_no, p.id, s.year
+                        ON CONFLICT (recall_ref, batch_no, product_id, year) DO UPDATE SET {updates}, updated_at = now()
+                        WHERE {changed}
+                        RETURNING (xmax = 0) AS inserted
+                    )
+                    SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+                """)
+                counts['inserted'], counts['updated'] = cursor.fetchone()
+
+                # A recall's batch list is part of its key, so its batches never change once stored.
+                cursor.execute("""
+                    INSERT INTO recall_batches (recall_id, batch_no)
+                    SELECT DISTINCT r.id, upper(trim(b.batch))
+                    FROM recalls_staging s
+                    JOIN products p ON p.product_name = s.product_name AND p.inn_name = s.inn_name
+                    JOIN recalls r ON r.recall_ref = s.recall_ref AND r.batch_no = s.batch_no AND r.product_id = p.id
+                                  AND r.year = s.year
+                    CROSS JOIN LATERAL regexp_split_to_table(s.batch_no, %s) AS b(batch)
+                    WHERE trim(b.batch) <> ''
+                    ON CONFLICT DO NOTHING
+                """, (BATCH_SEPARATORS,))
+                counts['batches'] = cursor.rowcount
+                counts['summary_cells'] = recall_summary.refresh_touched(cursor)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    counts['skipped'] = counts['staged'] - counts['inserted'] - counts['updated']
+    elapsed = time.perf_counter() - start
+    logger.info(f"Upserted recalls: {counts['inserted']} inserted, {counts['updated']} updated, "
+                f"{counts['skipped']} skipped of {counts['staged']} rows, {counts['batches']} new batches, "
+                f"{counts['summary_cells']} summary cells refreshed in {elapsed:.2f}s ({counts['staged'] / elapsed:,.0f} rows/s)")
+    return counts
+
+
+def is_batch_recalled(batch_no: str) -> List[Dict]:
+    """Recalls listing this batch number (indexed lookup on recall_batches)."""
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT f.year, f.date, f.recall_ref, f.product_name, f.manufacturer, f.reason
+                FROM recall_batches b JOIN recalls_flat f ON f.id = b.recall_id
+                WHERE b.batch_no = upper(trim(%s))
+                ORDER BY f.date
+            """, (batch_no,))
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
 
 # --- CLI entry point ---
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Load and insert recall data into PostgreSQL.")
-    parser.add_argument('--file', type=str, required=True, help='Path to the CSV file')
-    parser.add_argument('--table', type=str, default='recalls', help='Target table name (default: recalls)')
+    parser.add_argument('--file', type=str, default=None, help='Import this CSV instead of reading the Parquet store')
+    parser.add_argument('--year', type=int, action='append', help='Only load these years from the store')
+    parser.add_argument('--batch', type=str, default=None, help='Only look up whether this batch number is recalled')
     args = parser.parse_args()
 
-    df = load_and_normalize_csv(args.file)
-    insert_to_db(df, args.table)
+    try:
+        if args.batch:
+            for recall in is_batch_recalled(args.batch):
+                print(recall)
+        else:
+            upsert_recalls(load_and_normalize_csv(args.file) if args.file else load_and_normalize(args.year))
+    except (SQLAlchemyError, psycopg2.Error) as e:
+        logger.error(f"Database load failed: {e}", exc_info=True)
 
-#End. 
\ No newline at end of file
+#End.
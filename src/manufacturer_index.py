@@ -0,0 +1,290 @@
+import argparse
+import csv
+import os
+import re
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+
+from text_normalize import MANUFACTURER_ALIASES
+
+try:
+    import fcntl
+except ImportError:  # Windows: no inter-process lock, so run one resolve step at a time.
+    fcntl = None
+
+# Anchored to the repository root, so running from another directory uses the same table.
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                  'data', 'csv', 'manufacturer_aliases.csv')
+DEFAULT_THRESHOLD = 0.8
+# Trigrams shared by more names than this ("pha", "arm", ...) are not used for blocking.
+DEFAULT_MAX_POSTINGS = 200
+
+INDEX_FIELDS = ['alias', 'manufacturer_id', 'canonical_name', 'method', 'score']
+
+# Leading qualifiers the PPB pages put in the manufacturer column.
+QUALIFIERS = re.compile(
+    r"^(?:stated manufacturer|legal manufacturer|stated as|claimed to be manufactured by|manufactured by)\s*[:;]?\s*"
+)
+LEGAL_FORMS = {
+    'ltd', 'limited', 'pvt', 'private', 'co', 'company', 'corp', 'inc', 'llc', 'llp', 'plc', 'gmbh', 'kg',
+    'ag', 'sa', 'nv', 'srl', 'sdn', 'bhd', 'pty', 'saog', 'k',
+}
+LOCATIONS = {
+    'kenya', 'nairobi', 'india', 'china', 'germany', 'uk', 'usa', 'england', 'malaysia', 'portugal',
+    'nigeria', 'thailand', 'south africa', 'sultanate of oman', 'oman', 'ireland', 'italy', 'france',
+}
+# Words too common among manufacturers to tell two of them apart; ignored when scoring.
+GENERIC_WORDS = {
+    'pharmaceutical', 'pharmaceuticals', 'pharma', 'laboratories', 'laboratory', 'lab', 'labs', 'healthcare',
+    'lifesciences', 'life', 'science', 'sciences', 'remedies', 'industries', 'chemical', 'works', 'international',
+    'enterprises', 'products', 'and', 'the',
+}
+
+
+def resolution_key(name: str) -> str:
+    """
+    Blocking/matching key for a normalized manufacturer name: qualifiers,
+    legal forms and trailing locations removed, "&" spelled "and".
+
+    >>> resolution_key('laboratory & allied ltd, kenya')
+    'laboratory and allied'
+    """
+    name = name or ''
+    for _ in range(2):  # "stated as; manufactured by ..."
+        name = QUALIFIERS.sub('', name)
+    parts = [part.strip(' .;:') for part in name.split(',')]
+    while len(parts) > 1 and (not parts[-1] or parts[-1] in LOCATIONS):
+        parts.pop()
+    name = ' '.join(parts).replace('&', ' and ')
+    name = re.sub(r"\(([^)]*)\)", lambda m: '' if m.group(1) in LOCATIONS or m.group(1) in LEGAL_FORMS else m.group(1), name)
+    tokens = [t for t in re.findall(r'[a-z0-9]+', name) if t not in LEGAL_FORMS]
+    while len(tokens) > 1 and tokens[-1] in LOCATIONS:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def trigrams(key: str) -> Set[str]:
+    """
+    Character trigrams of the distinctive part of a key, spaces removed
+    ("west coast" == "westcoast").
+    """
+    tokens = key.split()
+    core = [t for t in tokens if t not in GENERIC_WORDS and t not in LOCATIONS] or tokens
+    compact = ''.join(core)
+    if len(compact) < 3:
+        return {compact} if compact else set()
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+class ManufacturerIndex:
+    """
+    Resolves normalized manufacturer names to canonical manufacturer IDs.
+
+    Known aliases resolve by lookup. A new name is reduced to its resolution
+    key, and an exact key match joins that entity. Otherwise candidates come
+    from a trigram inverted index (blocking), so each name is only compared
+    with entities sharing trigrams, never with every entity. The best
+    candidate by Dice similarity of trigram sets joins if it reaches the
+    threshold. Otherwise the name starts a new entity, but only when the
+    index assigns IDs (assign_ids=True, see resolve_manufacturers); any other
+    reader leaves it unresolved, so two runs can never hand out the same new
+    ID to different manufacturers.
+
+    The alias table persists as CSV (alias, manufacturer_id, canonical_name,
+    method, score) and is seeded with text_normalize.MANUFACTURER_ALIASES.
+    Entries can be corrected by hand: edit manufacturer_id and set method
+    to 'manual'.
+
+    Args:
+        path (str, optional): CSV file backing the alias table.
+        threshold (float, optional): Minimum Dice similarity for a fuzzy match.
+        max_postings (int, optional): Skip trigrams more common than this while blocking.
+        assign_ids (bool, optional): Give unmatched names new manufacturer IDs. Hold
+            index_lock(path) from loading the table until save().
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, threshold: float = DEFAULT_THRESHOLD,
+                 max_postings: int = DEFAULT_MAX_POSTINGS, assign_ids: bool = False):
+        self.path = path
+        self.threshold = threshold
+        self.max_postings = max_postings
+        self.assign_ids = assign_ids
+        self.aliases: Dict[str, Dict] = {}
+        self.canonical: Dict[int, str] = {}
+        self.key_ids: Dict[str, int] = {}
+        self.key_grams: Dict[str, Set[str]] = {}
+        self.postings: Dict[str, Set[str]] = defaultdict(set)
+        self.dirty = False
+
+        if os.path.exists(path):
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    row['manufacturer_id'] = int(row['manufacturer_id'])
+                    self._add(row)
+        else:
+            self.seed()
+
+    def seed(self) -> None:
+        for alias, canonical in MANUFACTURER_ALIASES.items():
+            entity = self._entity_for_canonical(canonical)
+            self._add({'alias': alias, 'manufacturer_id': entity, 'canonical_name': canonical,
+                       'method': 'seed', 'score': ''})
+        self.dirty = True
+
+    def _entity_for_canonical(self, canonical: str) -> int:
+        for entity, name in self.canonical.items():
+            if name == canonical:
+                return entity
+        return max(self.canonical, default=0) + 1
+
+    def _add(self, row: Dict) -> None:
+        entity = row['manufacturer_id']
+        self.aliases[row['alias']] = row
+        self.canonical.setdefault(entity, row['canonical_name'])
+        key = resolution_key(row['alias'])
+        if key and key not in self.key_ids:
+            self.key_ids[key] = entity
+            self.key_grams[key] = trigrams(key)
+            for gram in self.key_grams[key]:
+                self.postings[gram].add(key)
+
+    def candidates(self, key: str) -> Counter:
+        """Indexed keys sharing at least one (not too common) trigram with key, with the shared count."""
+        shared: Counter = Counter()
+        for gram in trigrams(key):
+            posting = self.postings.get(gram)
+            if posting and len(posting) <= self.max_postings:
+                shared.update(posting)
+        return shared
+
+    def resolve(self, name: str) -> Optional[int]:
+        """
+        Manufacturer ID for a normalized name, adding it to the index if it is new.
+        None for a name matching no known manufacturer unless the index assigns IDs.
+        """
+        if not name:
+            return None
+        if name in self.aliases:
+            return self.aliases[name]['manufacturer_id']
+
+        key = resolution_key(name)
+        entity, method, score = None, 'new', ''
+        if key in self.key_ids:
+            entity, method, score = self.key_ids[key], 'key', 1.0
+        elif key:
+            grams = trigrams(key)
+            best_key, best_score = None, 0.0
+            for other in self.candidates(key):
+                other_grams = self.key_grams[other]
+                dice = 2 * len(grams & other_grams) / (len(grams) + len(other_grams))
+                if dice > best_score:
+                    best_key, best_score = other, dice
+            if best_key is not None and best_score >= self.threshold:
+                entity, method, score = self.key_ids[best_key], 'fuzzy', round(best_score, 3)
+        if entity is None:
+            if not self.assign_ids:
+                return None
+            entity = max(self.canonical, default=0) + 1
+
+        canonical = self.canonical.get(entity, name.strip(' ,.;:'))
+        self._add({'alias': name, 'manufacturer_id': entity, 'canonical_name': canonical,
+                   'method': method, 'score': score})
+        self.dirty = True
+        return entity
+
+    def resolve_many(self, names: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Resolves each distinct name once; only names not yet in the table are matched."""
+        return {name: self.resolve(name) for name in dict.fromkeys(names) if name is not None}
+
+    def canonical_name(self, entity: Optional[int]) -> Optional[str]:
+        return self.canonical.get(entity) if entity is not None else None
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        rows = sorted(self.aliases.values(), key=lambda r: (r['manufacturer_id'], r['alias']))
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({field: row[field] for field in INDEX_FIELDS})
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+
+@contextmanager
+def index_lock(path: str = DEFAULT_INDEX_PATH) -> Iterator[None]:
+    """Exclusive lock on an alias table across processes, for a load-assign-save cycle."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.lock", 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def resolve_table(table: pa.Table, index: Optional[ManufacturerIndex] = None) -> pa.Table:
+    """
+    Adds manufacturer_id and manufacturer_canonical to a table with manufacturer_norm.
+
+    Only names missing from the alias table are matched. The alias table is
+    not written here: new names are added to the CSV only by an explicit
+    index.save(), e.g. from `python src/recall_store.py resolve`. Until then a
+    name matching no known manufacturer keeps a NULL manufacturer_id and its
+    normalized name as manufacturer_canonical.
+    """
+    if 'manufacturer_norm' not in table.column_names:
+        return table
+    index = index or ManufacturerIndex()
+    names: List[Optional[str]] = table.column('manufacturer_norm').to_pylist()
+    resolved = index.resolve_many(names)
+    ids = [resolved.get(name) for name in names]
+    columns = {
+        'manufacturer_id': pa.array(ids, type=pa.int32()),
+        'manufacturer_canonical': pa.array([index.canonical_name(i) if i is not None else name
+                                            for i, name in zip(ids, names)], type=pa.string()),
+    }
+    for name, column in columns.items():
+        if name in table.column_names:
+            table = table.set_column(table.column_names.index(name), name, column)
+        else:
+            table = table.append_column(name, column)
+    return table
+
+
+def resolve_frame(df: pd.DataFrame, index: Optional[ManufacturerIndex] = None) -> pd.DataFrame:
+    """resolve_table for a pandas frame that already has manufacturer_norm."""
+    index = index or ManufacturerIndex()
+    names = df['manufacturer_norm'].astype(object).where(df['manufacturer_norm'].notna(), None)
+    resolved = index.resolve_many(names)
+    df = df.copy()
+    df['manufacturer_id'] = names.map(resolved).astype('Int32')
+    df['manufacturer_canonical'] = df['manufacturer_id'].map(index.canonical).astype('string').fillna(
+        df['manufacturer_norm'].astype('string'))
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the manufacturer clusters in the alias table.")
+    parser.add_argument('--index', type=str, default=DEFAULT_INDEX_PATH, help='Alias table CSV')
+    parser.add_argument('--all', action='store_true', help='Also list single-alias manufacturers')
+    args = parser.parse_args()
+
+    index = ManufacturerIndex(args.index)
+    clusters = defaultdict(list)
+    for alias, row in index.aliases.items():
+        clusters[row['manufacturer_id']].append(alias)
+    for entity, aliases in sorted(clusters.items()):
+        if args.all or len(aliases) > 1:
+            print(f"{entity:>5}  {index.canonical[entity]}")
+            for alias in sorted(aliases):
+                print(f"       - {alias} ({index.aliases[alias]['method']})")
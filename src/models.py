@@ -1,19 +1,109 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Date, ForeignKey, Index, Integer, SmallInteger, String, DateTime, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
-from sqlalchemy import Text 
+from sqlalchemy import Text
 
 Base = declarative_base()
 
+# Extensions the schema needs; init_db creates them before the tables.
+EXTENSIONS = ['pg_trgm']
+
+
+class Manufacturer(Base):
+    __tablename__ = 'manufacturers'
+
+    # Same IDs as data/csv/manufacturer_aliases.csv (manufacturer_index), so
+    # spelling variants already share one row.
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(Text, nullable=False)
+
+
+class Product(Base):
+    __tablename__ = 'products'
+    __table_args__ = (
+        UniqueConstraint('product_name', 'inn_name', name='uq_products_name_inn'),
+        # Trigram indexes serve ILIKE '%...%' and similarity() searches.
+        Index('ix_products_product_name_trgm', 'product_name',
+              postgresql_using='gin', postgresql_ops={'product_name': 'gin_trgm_ops'}),
+        Index('ix_products_inn_name_trgm', 'inn_name',
+              postgresql_using='gin', postgresql_ops={'inn_name': 'gin_trgm_ops'}),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_name = Column(Text, nullable=False, server_default='')
+    inn_name = Column(Text, nullable=False, server_default='')
+
+
 class Recall(Base):
     __tablename__ = 'recalls'
-    
+    __table_args__ = (
+        # Natural key used by load_data.upsert_recalls; '' stands for a missing value. The page
+        # year separates the recalls without a recall_ref (2016-2021).
+        UniqueConstraint('recall_ref', 'batch_no', 'product_id', 'year', name='uq_recalls_natural_key'),
+        Index('ix_recalls_date', 'date'),
+        Index('ix_recalls_year', 'year'),
+        Index('ix_recalls_manufacturer_date', 'manufacturer_id', 'date'),
+        Index('ix_recalls_category_date', 'recall_category', 'date'),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
-    year = Column(Integer)
-    product_name = Column(Text)
-    inn_name = Column(Text)
-    manufacturer = Column(Text)
-    reason = Column(Text) 
-    created_at = Column(DateTime(timezone=True), server_default=func.now()) 
-    
-    
\ No newline at end of file
+    # Year of the page the recall was listed on (0 if unknown); see recall_summary.report_year.
+    year = Column(SmallInteger, nullable=False, server_default='0')
+    date = Column(Date)
+    recall_ref = Column(Text, nullable=False, server_default='')
+    # Batch list as published; exploded into recall_batches.
+    batch_no = Column(Text, nullable=False, server_default='')
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    manufacturer_id = Column(Integer, ForeignKey('manufacturers.id'))
+    reason = Column(Text)
+    # text_normalize.normalize_text(reason): the reason key both dashboard backends group and filter on.
+    reason_norm = Column(Text)
+    recall_category = Column(String(64))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RecallBatch(Base):
+    __tablename__ = 'recall_batches'
+    __table_args__ = (
+        # "Is this batch recalled?" is an equality lookup on the upper-cased batch number.
+        Index('ix_recall_batches_batch_no', 'batch_no'),
+    )
+
+    recall_id = Column(Integer, ForeignKey('recalls.id', ondelete='CASCADE'), primary_key=True)
+    batch_no = Column(Text, primary_key=True)
+
+
+class RecallMonthlySummary(Base):
+    """Recall counts per (year, month, manufacturer, category), kept current by load_data via recall_summary."""
+    __tablename__ = 'recall_monthly_summary'
+
+    year = Column(SmallInteger, primary_key=True)
+    month = Column(SmallInteger, primary_key=True)
+    manufacturer_id = Column(Integer, primary_key=True)  # 0: unknown manufacturer
+    recall_category = Column(String(64), primary_key=True)
+    recall_count = Column(Integer, nullable=False)
+
+
+class RecallReasonSummary(Base):
+    """Recall counts per summary cell and normalized reason (recalls.reason_norm)."""
+    __tablename__ = 'recall_reason_summary'
+
+    year = Column(SmallInteger, primary_key=True)
+    month = Column(SmallInteger, primary_key=True)
+    manufacturer_id = Column(Integer, primary_key=True)
+    recall_category = Column(String(64), primary_key=True)
+    reason = Column(Text, primary_key=True)
+    recall_count = Column(Integer, nullable=False)
+
+
+# Denormalized read view with the columns the flat `recalls` table used to have.
+RECALLS_FLAT_VIEW = """
+CREATE OR REPLACE VIEW recalls_flat AS
+SELECT r.id, r.year, r.date, r.recall_ref, p.product_name, p.inn_name, r.batch_no,
+       m.name AS manufacturer, r.manufacturer_id, r.reason, r.reason_norm, r.recall_category,
+       r.created_at, r.updated_at
+FROM recalls r
+JOIN products p ON p.id = r.product_id
+LEFT JOIN manufacturers m ON m.id = r.manufacturer_id
+"""
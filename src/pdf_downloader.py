@@ -0,0 +1,308 @@
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from fetcher import AsyncFetcher, run_blocking
+from http_cache import atomic_write
+
+DEFAULT_WORKERS = 4
+MANIFEST_NAME = "manifest.json"
+STORE_DIR_NAME = ".store"
+CHUNK_SIZE = 64 * 1024
+
+
+class IncompleteDownload(Exception):
+    """Raised when a response ends before the advertised length."""
+
+
+def file_sha256(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def content_range_start(header: str) -> Optional[int]:
+    """
+    First byte of a "bytes start-end/total" Content-Range, or None if it is missing or malformed.
+
+    >>> content_range_start("bytes 1024-2047/4096")
+    1024
+    """
+    unit, _, spec = header.strip().partition(" ")
+    start = spec.partition("-")[0].strip()
+    return int(start) if unit.lower() == "bytes" and start.isdigit() else None
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Dict]:
+    """Load the url -> {sha256, size, fetched_at, files} manifest, or an empty one."""
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(manifest: Dict[str, Dict], manifest_path: str) -> None:
+    atomic_write(manifest_path, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+
+
+def link_into_place(blob_path: str, dest_path: str) -> None:
+    """
+    Atomically expose a content-store blob under dest_path.
+
+    Uses a hard link so duplicate PDFs share one copy on disk, falling back to
+    a copy where links are not supported.
+    """
+    tmp_path = f"{dest_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(blob_path, tmp_path)
+    except OSError:
+        shutil.copy2(blob_path, tmp_path)
+    os.replace(tmp_path, dest_path)
+
+
+class PdfDownloader:
+    """
+    Parallel, resumable, deduplicating downloader shared by the PDF scrapers.
+
+    Files are streamed into <folder>/.store/partial/ and resumed with an HTTP
+    Range request (guarded by If-Range on the stored ETag or Last-Modified)
+    if the connection drops. Finished files are moved into a
+    content-addressed store (<folder>/.store/<sha256>.pdf) and hard-linked to
+    their visible names, so the same PDF linked from several pages is stored
+    once. A JSON manifest maps every URL to its sha256, size and fetch time;
+    URLs already in the manifest are never requested again.
+
+    Args:
+        download_folder (str): Folder the visible PDFs are written to.
+        workers (int): Number of concurrent downloads.
+        manifest_path (str, optional): Defaults to <download_folder>/manifest.json.
+        offline (bool): Only restore files from the manifest and store.
+        **fetcher_kwargs: Rate limit, retry and timeout settings for fetcher.AsyncFetcher.
+    """
+
+    def __init__(self, download_folder: str, workers: int = DEFAULT_WORKERS,
+                 manifest_path: Optional[str] = None, offline: bool = False, **fetcher_kwargs):
+        self.download_folder = download_folder
+        self.workers = workers
+        self.store_dir = os.path.join(download_folder, STORE_DIR_NAME)
+        self.partial_dir = os.path.join(self.store_dir, "partial")
+        self.manifest_path = manifest_path or os.path.join(download_folder, MANIFEST_NAME)
+        self.offline = offline
+        fetcher_kwargs.pop("cache", None)  # PDFs are tracked by the manifest, not the page cache
+        fetcher_kwargs.setdefault("concurrency", workers)
+        self.fetcher_kwargs = fetcher_kwargs
+        os.makedirs(self.partial_dir, exist_ok=True)
+        self.manifest = load_manifest(self.manifest_path)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.store_dir, f"{sha256}.pdf")
+
+    def partial_path(self, url: str) -> str:
+        return os.path.join(self.partial_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".part")
+
+    def restore(self, url: str, filename: str) -> bool:
+        """Link filename from the store if url is already in the manifest."""
+        entry = self.manifest.get(url)
+        if not entry:
+            return False
+        dest = os.path.join(self.download_folder, filename)
+        blob = self.blob_path(entry["sha256"])
+        if not os.path.exists(blob):
+            return False
+        if not os.path.exists(dest):
+            link_into_place(blob, dest)
+        if filename not in entry["files"]:
+            entry["files"].append(filename)
+        return True
+
+    def load_validators(self, part: str) -> Dict[str, str]:
+        try:
+            with open(part + ".json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def discard_partial(self, part: str) -> None:
+        for path in (part, part + ".json"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def resume_headers(self, part: str, offset: int) -> Optional[Dict[str, str]]:
+        """
+        Range request for the rest of the partial file, guarded by If-Range so
+        a file that changed on the server is sent whole instead of spliced.
+        """
+        if not offset:
+            return None
+        validators = self.load_validators(part)
+        # If-Range needs a strong ETag; fall back to Last-Modified.
+        etag = validators.get("etag")
+        validator = etag if etag and not etag.startswith("W/") else validators.get("last_modified")
+        if not validator:
+            return None  # cannot tell whether the partial is still valid, so start over
+        return {"Range": f"bytes={offset}-", "If-Range": validator}
+
+    async def fetch_to_partial(self, fetcher: AsyncFetcher, url: str) -> str:
+        """Stream url into its partial file, resuming with Range after dropped connections."""
+        part = self.partial_path(url)
+        error = None
+        for attempt in range(fetcher.retries + 1):
+            if attempt:
+                await asyncio.sleep(fetcher.retry_delay(attempt - 1))
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            headers = self.resume_headers(part, offset)
+            try:
+                async with fetcher.stream(url, headers=headers) as response:
+                    if response.status_code == 416:
+                        # Complete only if the partial file is exactly as long as the server's copy.
+                        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                        if total.isdigit() and int(total) == offset:
+                            return part
+                        self.discard_partial(part)
+                        error = IncompleteDownload(f"partial download of {url} no longer matches the server")
+                        continue
+                    response.raise_for_status()
+                    if response.status_code == 206:
+                        # Append only what continues the partial file; anything else starts over.
+                        start = content_range_start(response.headers.get("Content-Range", ""))
+                        if start != offset:
+                            self.discard_partial(part)
+                            error = IncompleteDownload(f"{url} resumed at byte {start}, expected {offset}")
+                            continue
+                        mode = "ab"
+                    else:
+                        mode = "wb"
+                        validators = {"etag": response.headers.get("ETag"),
+                                      "last_modified": response.headers.get("Last-Modified")}
+                        atomic_write(part + ".json", json.dumps(validators).encode("utf-8"))
+                    expected = response.headers.get("Content-Length")
+                    received = 0
+                    with open(part, mode) as f:
+                        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                            f.write(chunk)
+                            received += len(chunk)
+                    if expected is not None and received < int(expected):
+                        raise IncompleteDownload(f"got {received} of {expected} bytes from {url}")
+                return part
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500 and e.response.status_code != 429:
+                    raise
+                error = e
+            except (httpx.TransportError, IncompleteDownload) as e:
+                error = e
+        raise error
+
+    def commit(self, url: str, part: str, filenames: List[str]) -> Dict:
+        """Move a finished partial file into the content store and link every target name."""
+        sha256 = file_sha256(part)
+        blob = self.blob_path(sha256)
+        if os.path.exists(blob):
+            os.remove(part)  # identical content already stored under another URL
+        else:
+            os.replace(part, blob)
+        if os.path.exists(part + ".json"):
+            os.remove(part + ".json")
+        for filename in filenames:
+            link_into_place(blob, os.path.join(self.download_folder, filename))
+        entry = {
+            "sha256": sha256,
+            "size": os.path.getsize(blob),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "files": sorted(filenames),
+        }
+        self.manifest[url] = entry
+        save_manifest(self.manifest, self.manifest_path)
+        return entry
+
+    async def run(self, jobs: Dict[str, List[str]]) -> Dict[str, int]:
+        summary = {"downloaded": 0, "skipped": 0, "failed": 0}
+        queue: asyncio.Queue = asyncio.Queue()
+        for url, filenames in jobs.items():
+            queue.put_nowait((url, filenames))
+
+        async def worker(fetcher: AsyncFetcher):
+            while True:
+                try:
+                    url, filenames = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    print(f"Downloading {url}")
+                    part = await self.fetch_to_partial(fetcher, url)
+                    entry = self.commit(url, part, filenames)
+                    print(f"Downloaded: {', '.join(entry['files'])}")
+                    summary["downloaded"] += 1
+                except Exception as e:
+                    print(f"Error downloading {url}: {e}")
+                    summary["failed"] += 1
+
+        async with AsyncFetcher(**self.fetcher_kwargs) as fetcher:
+            await asyncio.gather(*(worker(fetcher) for _ in range(self.workers)))
+        return summary
+
+    def download(self, items: List[Dict[str, str]]) -> Dict[str, int]:
+        """Blocking download_async; also works from inside a running event loop (e.g. a notebook)."""
+        return run_blocking(self.download_async(items))
+
+    async def download_async(self, items: List[Dict[str, str]]) -> Dict[str, int]:
+        """
+        Download a list of PDFs.
+
+        Args:
+            items (list): Dictionaries with 'url' and 'filename' (relative to download_folder).
+
+        Returns:
+            dict: Counts of downloaded, skipped (already in the manifest) and failed URLs.
+        """
+        jobs: Dict[str, List[str]] = {}
+        skipped = 0
+        for item in items:
+            url, filename = item["url"], item["filename"]
+            if self.restore(url, filename):
+                skipped += 1
+                continue
+            if self.offline:
+                print(f"Offline: {url} has not been downloaded yet")
+                continue
+            jobs.setdefault(url, [])
+            if filename not in jobs[url]:
+                jobs[url].append(filename)
+        save_manifest(self.manifest, self.manifest_path)
+
+        summary = await self.run(jobs) if jobs else {"downloaded": 0, "skipped": 0, "failed": 0}
+        summary["skipped"] = skipped
+        print(f"PDFs downloaded: {summary['downloaded']}, skipped: {summary['skipped']}, "
+              f"failed: {summary['failed']}")
+        return summary
+
+
+def download_files(items: List[Dict[str, str]], download_folder: str, workers: int = DEFAULT_WORKERS,
+                   manifest_path: Optional[str] = None, offline: bool = False, **fetcher_kwargs):
+    """
+    Download PDFs into download_folder with a shared PdfDownloader.
+
+    Args:
+        items (list): Dictionaries with 'url' and 'filename' keys.
+        download_folder (str): Folder the PDFs are written to.
+        workers (int): Number of concurrent downloads.
+        manifest_path (str, optional): Manifest location, defaults to <download_folder>/manifest.json.
+        offline (bool): Only restore files already in the manifest.
+        **fetcher_kwargs: Rate limit, retry and timeout settings for fetcher.AsyncFetcher.
+
+    Returns:
+        dict: Counts of downloaded, skipped and failed URLs.
+    """
+    downloader = PdfDownloader(download_folder, workers=workers, manifest_path=manifest_path,
+                               offline=offline, **fetcher_kwargs)
+    return downloader.download(items)
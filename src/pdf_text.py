@@ -0,0 +1,167 @@
+import argparse
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from http_cache import atomic_write
+from pdf_downloader import file_sha256
+
+DEFAULT_CACHE_DIR = "data/cache/pdf_text"
+# Pages with less text than this from the fast path are re-read with layout analysis.
+MIN_PAGE_CHARS = 20
+# Bump when the extraction logic changes; cached pages of older versions are ignored.
+EXTRACTOR_REVISION = 1
+LAYOUT_PARAMS = {'line_margin': 0.5, 'char_margin': 2.0, 'word_margin': 0.1, 'boxes_flow': 0.5}
+
+
+def extractor_version() -> str:
+    """
+    Identity of the extraction pipeline: revision, library versions and
+    layout parameters. Part of the cache key, so upgrading pdfminer.six or
+    pypdfium2 re-extracts instead of serving stale text.
+    """
+    import pdfminer
+    try:
+        import pypdfium2
+        pdfium = pypdfium2.V_PYPDFIUM2
+    except ImportError:
+        pdfium = None
+    identity = json.dumps([EXTRACTOR_REVISION, pdfminer.__version__, pdfium, LAYOUT_PARAMS, MIN_PAGE_CHARS],
+                          sort_keys=True)
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:12]
+
+
+def fast_pages(path: str) -> List[Optional[str]]:
+    """
+    Text layer of every page via pdfium (fast, no layout analysis). Pages
+    pdfium cannot read come back as None. Without pypdfium2 every page is None
+    and the layout path reads them all.
+    """
+    try:
+        import pypdfium2
+    except ImportError:
+        from pdfminer.pdfpage import PDFPage
+        with open(path, 'rb') as f:
+            return [None] * sum(1 for _ in PDFPage.get_pages(f))
+
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        pages = []
+        for page in pdf:
+            try:
+                textpage = page.get_textpage()
+                pages.append(textpage.get_text_bounded().replace('\r\n', '\n'))
+                textpage.close()
+            except Exception:
+                pages.append(None)
+            finally:
+                page.close()
+        return pages
+    finally:
+        pdf.close()
+
+
+def layout_page(path: str, page_number: int) -> str:
+    """One page through pdfminer.six's layout analysis: slower, but orders multi-column and table text."""
+    from pdfminer.high_level import extract_text
+    from pdfminer.layout import LAParams
+    return extract_text(path, page_numbers=[page_number], laparams=LAParams(**LAYOUT_PARAMS))
+
+
+def extract_pages(path: str) -> Dict:
+    """
+    Page texts of a PDF: the fast path for pages with a usable text layer,
+    the layout-aware fallback for the rest. Scanned pages without a text
+    layer stay (near) empty; there is no OCR.
+
+    Returns:
+        dict: 'pages' (one string per page) and 'methods' ('fast' or 'layout' per page).
+    """
+    pages, methods = [], []
+    for number, text in enumerate(fast_pages(path)):
+        if text is not None and len(text.strip()) >= MIN_PAGE_CHARS:
+            pages.append(text)
+            methods.append('fast')
+            continue
+        try:
+            layout = layout_page(path, number)
+        except Exception:
+            layout = ''
+        # Keep whichever found more text.
+        if len(layout.strip()) >= len((text or '').strip()):
+            pages.append(layout)
+            methods.append('layout')
+        else:
+            pages.append(text)
+            methods.append('fast')
+    return {'pages': pages, 'methods': methods}
+
+
+class PageTextCache:
+    """
+    Extracted page text on disk, one JSON file per (file sha256, extractor
+    version). Content-addressed, so renamed or re-downloaded copies of a PDF
+    share an entry.
+
+    Args:
+        cache_dir (str, optional): Directory holding the per-version subdirectories.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.directory = os.path.join(cache_dir, extractor_version())
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.directory, f"{sha256}.json")
+
+    def get(self, sha256: str) -> Optional[Dict]:
+        try:
+            with open(self.path(sha256), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def put(self, sha256: str, extracted: Dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        atomic_write(self.path(sha256), json.dumps(extracted, ensure_ascii=False).encode('utf-8'))
+
+
+def read_pages(path: str, cache: Optional[PageTextCache] = None, sha256: Optional[str] = None) -> List[str]:
+    """Page texts of a PDF, from the cache when this file content was extracted before."""
+    cache = cache or PageTextCache()
+    sha256 = sha256 or file_sha256(path)
+    extracted = cache.get(sha256)
+    if extracted is None:
+        extracted = extract_pages(path)
+        cache.put(sha256, extracted)
+    return extracted['pages']
+
+
+def load_documents(path: str, cache: Optional[PageTextCache] = None) -> List[Document]:
+    """One Document per page, with the same 'source'/'page' metadata PyPDFLoader sets."""
+    return [Document(page_content=text, metadata={'source': path, 'page': number})
+            for number, text in enumerate(read_pages(path, cache))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract (and cache) the page text of PDFs.")
+    parser.add_argument('paths', nargs='+', help='PDF files or folders')
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help='Page text cache directory')
+    parser.add_argument('--print', action='store_true', help='Print the extracted text')
+    args = parser.parse_args()
+
+    cache = PageTextCache(args.cache_dir)
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files += [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith('.pdf')]
+        else:
+            files.append(path)
+    for path in files:
+        pages = read_pages(path, cache)
+        print(f"{path}: {len(pages)} pages, {sum(len(p) for p in pages):,} characters")
+        if args.print:
+            for number, text in enumerate(pages):
+                print(f"--- page {number + 1} ---\n{text}")
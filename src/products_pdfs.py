@@ -1,10 +1,13 @@
-import requests
 from bs4 import BeautifulSoup
-import time
+import argparse
 import os
 import pandas as pd
 from urllib.parse import urljoin
 
+from fetcher import fetch_all
+from http_cache import DEFAULT_CACHE_DIR, HttpCache
+from pdf_downloader import DEFAULT_WORKERS, download_files
+
 csv_filepath = "product_info.csv"
 
 def get_url(csv_filepath):
@@ -35,7 +38,27 @@ def get_url(csv_filepath):
     return url_list
 
 
-def download_pdfs(url_list, download_folder):
+def parse_pdf_links(content, page_url):
+    """
+    Finds every PDF link on a product page.
+
+    Args:
+        content (bytes): HTML of the product page.
+        page_url (str): URL of the page, used to make relative links absolute.
+
+    Returns:
+        list: Absolute PDF URLs.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+    pdf_links = []
+    for link in soup.find_all('a', href=True):
+        href = link['href']
+        if href.lower().endswith('.pdf'):
+            pdf_links.append(urljoin(page_url, href))  # Make sure the URL is absolute
+    return pdf_links
+
+
+def download_pdfs(url_list, download_folder, workers=DEFAULT_WORKERS, offline=False, **fetcher_kwargs):
     """
     Downloads all PDF files found on the URLs in the provided list.
 
@@ -43,54 +66,40 @@ def download_pdfs(url_list, download_folder):
         url_list (list): A list of dictionaries, where each dictionary contains
                          'url' (the URL to scrape) and 'year'.
         download_folder (str): The folder to save the downloaded PDFs.
-    """
-    if not os.path.exists(download_folder):
-        os.makedirs(download_folder)
+        workers (int, optional): Number of concurrent PDF downloads.
+        offline (bool, optional): Serve pages from the HTTP cache and PDFs from the manifest only.
+        **fetcher_kwargs: Cache, rate limit and retry settings for fetcher.AsyncFetcher.
 
+    Returns:
+        dict: Counts of downloaded, skipped and failed PDFs.
+    """
     for item in url_list:
-        url = item['url']
-        year = item['year']
-        print(f"Scraping data from: {url}")
+        print(f"Scraping data from: {item['url']}")
+    pages = fetch_all([item['url'] for item in url_list], offline=offline, **fetcher_kwargs)
+
+    pdf_items = []
+    for item, page in zip(url_list, pages):
+        if not page.ok:
+            print(f"Error fetching URL {item['url']}: {page.error}")
+            continue
         try:
-            response = requests.get(url)
-            response.raise_for_status()  # Raise an exception for bad status codes
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-            pdf_links = []
-            for link in soup.find_all('a', href=True):
-                href = link['href']
-                if href.lower().endswith('.pdf'):
-                    pdf_links.append(urljoin(url, href))  # Make sure the URL is absolute
-
-            for pdf_url in pdf_links:
-                try:
-                    print(f"Downloading PDF: {pdf_url}")
-                    pdf_response = requests.get(pdf_url, stream=True)
-                    pdf_response.raise_for_status()
-
-                    filename = os.path.join(download_folder, f"{year}_{os.path.basename(pdf_url)}")
-                    with open(filename, 'wb') as pdf_file:
-                        for chunk in pdf_response.iter_content(chunk_size=8192):
-                            pdf_file.write(chunk)
-                    print(f"Saved PDF to: {filename}")
-                    time.sleep(1)  # Be polite and add a delay
-
-                except requests.exceptions.RequestException as e:
-                    print(f"Error downloading {pdf_url}: {e}")
-                except Exception as e:
-                    print(f"An unexpected error occurred while processing {pdf_url}: {e}")
-
-            time.sleep(2)  # Add a delay between processing different URLs
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching URL {url}: {e}")
+            for pdf_url in parse_pdf_links(page.content, item['url']):
+                filename = f"{item['year']}_{os.path.basename(pdf_url)}"
+                pdf_items.append({'url': pdf_url, 'filename': filename})
         except Exception as e:
-            print(f"An unexpected error occurred while processing {url}: {e}")
+            print(f"An unexpected error occurred while processing {item['url']}: {e}")
+
+    return download_files(pdf_items, download_folder, workers=workers, offline=offline, **fetcher_kwargs)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download PDFs linked from recalled product pages.")
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help='HTTP cache directory')
+    parser.add_argument('--offline', action='store_true', help='Serve pages from the HTTP cache and PDFs from the download manifest')
+    args = parser.parse_args()
+
     download_folder = "downloaded_pdfs"
     url_list = get_url(csv_filepath)
     if url_list:  # Only proceed if URLs were successfully retrieved
-        download_pdfs(url_list, download_folder)
+        download_pdfs(url_list, download_folder, cache=HttpCache(args.cache_dir), offline=args.offline)
     else:
-        print("No URLs found in the CSV file. Exiting.")
\ No newline at end of file
+        print("No URLs found in the CSV file. Exiting.")
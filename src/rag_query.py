@@ -1,44 +1,52 @@
 import os
 import requests
+from functools import lru_cache
 from typing import Optional, List, Any 
-from dotenv import load_dotenv
 
 from pydantic import BaseModel 
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores.pgvector import PGVector
 from langchain.chains import RetrievalQA
 from langchain_core.callbacks.manager import CallbackManagerForLLMRun
 from langchain_core.language_models import LLM
 
-# --- Load .env and validate env vars ---
-load_dotenv()
+from embedding_backends import embedding_name, load_embeddings
+from embedding_cache import CachedEmbeddings
+from ingest_pdfs import COLLECTION_NAME as INGEST_COLLECTION_NAME, EMBEDDING_MODEL as INGEST_EMBEDDING_MODEL
+from vector_index import IndexedPGVectorRetriever
 
-PGVECTOR_CONNECTION_STRING = (
-    f"postgresql+psycopg2://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
-    f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-)
+# Nothing below connects or loads a model at import; the getters build
+# each piece on first use and reuse it afterwards.
+# Queries must embed with the model the collection was built with, so both
+# default to what ingest_pdfs writes; RAG_COLLECTION / RAG_EMBEDDING_MODEL
+# point them at another collection.
+EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL", INGEST_EMBEDDING_MODEL)
+COLLECTION_NAME = os.getenv("RAG_COLLECTION", INGEST_COLLECTION_NAME)
 
 
-CONNECTION_STRING = os.getenv("PGVECTOR_CONNECTION_STRING")
-REMOTE_LLM_API_URL = os.getenv("REMOTE_LLM_API_URL")
+def remote_llm_api_url() -> str:
+    url = os.getenv("REMOTE_LLM_API_URL")
+    if not url:
+        raise ValueError("Missing REMOTE_LLM_API_URL in .env")
+    return url
 
-if not CONNECTION_STRING:
-    raise ValueError("Missing PGVECTOR_CONNECTION_STRING in .env")
-
-if not REMOTE_LLM_API_URL:
-    raise ValueError("Missing REMOTE_LLM_API_URL in .env")
 
 # --- Set up the embedding model ---
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+@lru_cache(maxsize=1)
+def get_embedding_model() -> CachedEmbeddings:
+    # Repeated questions are answered from the embedding cache.
+    return CachedEmbeddings(load_embeddings(EMBEDDING_MODEL), embedding_name(EMBEDDING_MODEL))
+
 
 # --- Load retriever ---
-retriever = PGVector(
-    connection_string=CONNECTION_STRING,
-    embedding_function=embedding_model,
-    collection_name="rag_collection"
-).as_retriever(search_kwargs={"k": 5})
+@lru_cache(maxsize=1)
+def get_retriever() -> IndexedPGVectorRetriever:
+    # Queries go through the collection's ANN index (vector_index.py) when
+    # one exists; VECTOR_EF_SEARCH / VECTOR_PROBES tune recall vs latency.
+    # PGVECTOR_CONNECTION_STRING still overrides the shared DB settings.
+    return IndexedPGVectorRetriever(
+        embeddings=get_embedding_model(),
+        collection_name=COLLECTION_NAME,
+        k=5,
+    )
 
 
 # --- Custom Remote LLM class ---
@@ -69,18 +77,18 @@ class RemoteLLM(LLM):
 
 
 # --- Instantiate the remote LLM and QA pipeline ---
-remote_llm = RemoteLLM(api_url=REMOTE_LLM_API_URL)
-
-qa = RetrievalQA.from_chain_type(
-    llm=remote_llm,
-    chain_type="stuff",
-    retriever=retriever,
-    return_source_documents=True
-)
+@lru_cache(maxsize=1)
+def get_qa() -> RetrievalQA:
+    return RetrievalQA.from_chain_type(
+        llm=RemoteLLM(api_url=remote_llm_api_url()),
+        chain_type="stuff",
+        retriever=get_retriever(),
+        return_source_documents=True
+    )
 
 # --- Colab-friendly query interface ---
 def run_query(query: str, print_sources: bool = True):
-    result = qa(query)
+    result = get_qa()(query)
     print("🔍 Query:", query)
     print("✅ Answer:", result['result'])
 
@@ -95,4 +103,6 @@ def run_query(query: str, print_sources: bool = True):
 
         print(f"\n📊 Retrieved {len(result['source_documents'])} documents")
 
+    return result
+
 # --- Run in Colab ---
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List
+
+import pandas as pd
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reason_rules.json')
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Clean a keyword exactly like category_reasons.clean_reasons cleans a reason."""
+    return re.sub(r"[^a-z0-9\s]", '', keyword.lower()).strip()
+
+
+def trie_pattern(words: List[str]) -> str:
+    """
+    Alternation regex for words, factored as a character trie.
+
+    Python's re tries alternatives one by one, so a flat "a|b|c" re-tests
+    shared prefixes at every position; the trie form tests each prefix once.
+    Optional groups are greedy, so the longest word at a position is reported.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie)
+
+
+class ReasonClassifier:
+    """
+    Single-pass, first-rule-wins recall reason classifier.
+
+    All keywords from all rules are compiled into one alternation regex
+    wrapped in a lookahead, so a single scan finds every keyword occurrence,
+    overlapping ones included. Each keyword carries the index of the first
+    rule it satisfies. That includes rules that only match a shorter keyword
+    contained in it, e.g. "white discoloration" also means "discoloration"
+    matched. The lowest index found wins, which reproduces the
+    chained `if any(...)` checks this replaces.
+
+    Args:
+        rules (list): Dictionaries with 'category' and 'keywords', in priority order.
+        default (str): Category for reasons no rule matches.
+
+    Attributes:
+        version (str): Hash of the rule table; changes whenever any rule does.
+    """
+
+    def __init__(self, rules: List[Dict], default: str = 'Other'):
+        self.categories = [rule['category'] for rule in rules]
+        self.default = default
+        canonical = json.dumps({'rules': rules, 'default': default}, sort_keys=True)
+        self.version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+        first_rule: Dict[str, int] = {}
+        for index, rule in enumerate(rules):
+            for keyword in rule['keywords']:
+                keyword = normalize_keyword(keyword)
+                if keyword and keyword not in first_rule:
+                    first_rule[keyword] = index
+
+        self.priority = {
+            keyword: min(index for other, index in first_rule.items() if other in keyword)
+            for keyword in first_rule
+        }
+        # Each position reports its longest keyword; shorter prefixes are
+        # already folded into that keyword's priority.
+        self.pattern = re.compile(f"(?=({trie_pattern(list(self.priority))}))")
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH) -> 'ReasonClassifier':
+        with open(path, 'r', encoding='utf-8') as f:
+            table = json.load(f)
+        return cls(table['rules'], table.get('default', 'Other'))
+
+    def classify(self, reason: str) -> str:
+        """Classify one cleaned reason."""
+        priorities = [self.priority[m] for m in self.pattern.findall(reason or '')]
+        return self.categories[min(priorities)] if priorities else self.default
+
+    def classify_series(self, reasons: pd.Series) -> pd.Series:
+        """Classify a whole column of cleaned reasons without a per-row Python loop."""
+        values = reasons.fillna('').astype(str).reset_index(drop=True)
+        matches = values.str.findall(self.pattern).explode().dropna()
+        best = matches.map(self.priority).groupby(level=0).min()
+        labels = pd.Series(self.categories, dtype=object)
+        categories = best.map(labels).reindex(values.index).fillna(self.default)
+        categories.index = reasons.index
+        return categories
@@ -0,0 +1,198 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import anyio
+from mcp.server.fastmcp import FastMCP
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from rag_query import get_embedding_model, get_qa, get_retriever
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+# Queries running at once; the rest wait for a slot instead of piling onto the CPU and the pool.
+DEFAULT_MAX_CONCURRENCY = 4
+# How long an MCP tool call waits for a service that is still loading.
+DEFAULT_READY_TIMEOUT = 120
+MAX_K = 50
+
+
+def source_of(metadata: Optional[Dict], content: str, distance: Optional[float] = None) -> Dict:
+    metadata = metadata or {}
+    source = {'source': metadata.get('source'), 'page': metadata.get('page'), 'content': content}
+    if distance is not None:
+        source['distance'] = round(float(distance), 4)
+    return source
+
+
+class RecallService:
+    """
+    Long-lived query service over the recall PDF collection.
+
+    warm() loads the embedding model, resolves the collection and builds the
+    QA chain once; queries afterwards only pay for embedding the question,
+    the vector search and (for ask) the LLM call. Blocking work runs in
+    worker threads, at most max_concurrency at a time.
+
+    Args:
+        max_concurrency (int, optional): Queries run at once; defaults to SERVICE_MAX_CONCURRENCY.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = int(max_concurrency or os.getenv('SERVICE_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY))
+        self.limiter = anyio.CapacityLimiter(self.max_concurrency)
+        self.ready = threading.Event()
+        self.status = 'starting'
+        self.error: Optional[str] = None
+        self.started_at = time.time()
+
+    def warm(self) -> None:
+        """Loads everything queries need; sets status to 'ready' or 'failed'."""
+        try:
+            start = time.perf_counter()
+            get_embedding_model().embed_query("warm-up")
+            get_retriever().search("warm-up", k=1)
+            get_qa()
+            self.status = 'ready'
+            logging.info(f"Recall service ready in {time.perf_counter() - start:.1f} s")
+        except Exception as e:
+            self.status, self.error = 'failed', str(e)
+            logging.error(f"Recall service failed to start: {e}")
+        finally:
+            self.ready.set()
+
+    def warm_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm, name='recall-service-warm', daemon=True)
+        thread.start()
+        return thread
+
+    def health(self) -> Dict:
+        return {'status': self.status, 'error': self.error, 'uptime_s': round(time.time() - self.started_at, 1),
+                'max_concurrency': self.max_concurrency, 'in_flight': self.limiter.borrowed_tokens}
+
+    async def wait_ready(self, timeout: float = DEFAULT_READY_TIMEOUT) -> None:
+        if not self.ready.is_set():
+            await anyio.to_thread.run_sync(self.ready.wait, timeout)
+        if self.status != 'ready':
+            raise RuntimeError(f"Recall service is {self.status}" + (f": {self.error}" if self.error else ''))
+
+    def _search(self, query: str, k: int) -> List[Dict]:
+        return [source_of(row['cmetadata'], row['document'], row['distance'])
+                for row in get_retriever().search(query, k=k)]
+
+    def _ask(self, question: str) -> Dict:
+        result = get_qa().invoke({'query': question})
+        return {'answer': result['result'],
+                'sources': [source_of(doc.metadata, doc.page_content) for doc in result['source_documents']]}
+
+    async def search(self, query: str, k: int = 5) -> Dict:
+        start = time.perf_counter()
+        k = max(1, min(int(k), MAX_K))
+        results = await anyio.to_thread.run_sync(self._search, query, k, limiter=self.limiter)
+        return {'query': query, 'results': results, 'latency_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+    async def ask(self, question: str) -> Dict:
+        start = time.perf_counter()
+        answer = await anyio.to_thread.run_sync(self._ask, question, limiter=self.limiter)
+        return {'query': question, **answer, 'latency_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+
+service = RecallService()
+mcp = FastMCP("ppb-recalls", instructions="Search and question Kenyan PPB drug recall and rapid alert letters.")
+
+
+@mcp.tool()
+async def search_recalls(query: str, k: int = 5) -> Dict:
+    """Find the recall and alert letter passages most similar to the query, with source file, page and distance."""
+    await service.wait_ready()
+    return await service.search(query, k)
+
+
+@mcp.tool()
+async def ask(question: str) -> Dict:
+    """Answer a question about drug recalls from the retrieved letters; returns the answer and its sources."""
+    await service.wait_ready()
+    return await service.ask(question)
+
+
+# --- HTTP endpoints ---
+async def query_endpoint(request: Request) -> JSONResponse:
+    """POST {"query": ..., "mode": "ask" | "search", "k": 5}."""
+    if service.status != 'ready':
+        return JSONResponse(service.health(), status_code=503)
+    try:
+        body = await request.json()
+        query = str(body['query']).strip()
+    except (ValueError, KeyError, TypeError):
+        return JSONResponse({'error': 'Expected a JSON body with a "query" field'}, status_code=400)
+    if not query:
+        return JSONResponse({'error': 'Empty query'}, status_code=400)
+    mode = body.get('mode', 'ask')
+    try:
+        k = int(body.get('k', 5))
+    except (TypeError, ValueError):
+        return JSONResponse({'error': '"k" must be an integer'}, status_code=400)
+    try:
+        if mode == 'search':
+            result = await service.search(query, k)
+        elif mode == 'ask':
+            result = await service.ask(query)
+        else:
+            return JSONResponse({'error': f"Unknown mode: {mode}"}, status_code=400)
+    except Exception as e:
+        logging.exception("Query failed")
+        return JSONResponse({'error': str(e)}, status_code=500)
+    return JSONResponse(result)
+
+
+async def live_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse({'status': 'alive'})
+
+
+async def ready_endpoint(request: Request) -> JSONResponse:
+    return JSONResponse(service.health(), status_code=200 if service.status == 'ready' else 503)
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    # Liveness answers at once; readiness flips once the models are loaded.
+    service.warm_in_background()
+    yield
+
+
+def create_app() -> Starlette:
+    """HTTP /query and health endpoints plus the MCP SSE transport (/sse, /messages/)."""
+    return Starlette(
+        routes=[
+            Route('/query', query_endpoint, methods=['POST']),
+            Route('/health/live', live_endpoint),
+            Route('/health/ready', ready_endpoint),
+            *mcp.sse_app().routes,
+        ],
+        lifespan=lifespan,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve recall search and Q&A over MCP and HTTP.")
+    parser.add_argument('--transport', choices=['http', 'stdio'], default='http',
+                        help="'http': /query, health and MCP over SSE; 'stdio': MCP only, for local MCP clients")
+    parser.add_argument('--host', type=str, default=os.getenv('SERVICE_HOST', DEFAULT_HOST))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVICE_PORT', DEFAULT_PORT)))
+    args = parser.parse_args()
+
+    if args.transport == 'stdio':
+        service.warm_in_background()
+        mcp.run('stdio')
+    else:
+        import uvicorn
+        uvicorn.run(create_app(), host=args.host, port=args.port)
@@ -0,0 +1,249 @@
+import argparse
+import logging
+import os
+from typing import Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from manufacturer_index import ManufacturerIndex, index_lock, resolve_table
+from text_normalize import NORMALIZED_COLUMNS, normalize_table
+
+logger = logging.getLogger(__name__)
+
+# Anchored to the repository root, so running from another directory uses the same store.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_STORE_ROOT = os.path.join(DATA_DIR, 'parquet')
+
+SCHEMAS = {
+    'recalls': pa.schema([
+        ('year', pa.int16()),
+        ('date', pa.date32()),
+        ('recall_ref', pa.string()),
+        ('product_name', pa.string()),
+        ('inn_name', pa.string()),
+        ('batch_no', pa.string()),
+        ('manufacturer', pa.string()),
+        ('reason', pa.string()),
+        # Derived at ingest by text_normalize.
+        ('product_name_norm', pa.string()),
+        ('inn_name_norm', pa.string()),
+        ('manufacturer_norm', pa.string()),
+        ('reason_norm', pa.string()),
+        ('clean_reasons', pa.string()),
+        # Resolved at ingest by manufacturer_index.
+        ('manufacturer_id', pa.int32()),
+        ('manufacturer_canonical', pa.string()),
+    ]),
+    'rapid_alerts': pa.schema([
+        ('year', pa.int16()),
+        ('date', pa.date32()),
+        ('title', pa.string()),
+        ('pdf_url', pa.string()),
+        ('product_type', pa.string()),
+        ('source', pa.string()),
+        ('manufacturer', pa.string()),
+        ('manufacturer_norm', pa.string()),
+        ('manufacturer_id', pa.int32()),
+        ('manufacturer_canonical', pa.string()),
+    ]),
+}
+
+PARTITIONING = ds.partitioning(pa.schema([('year', pa.int16())]), flavor='hive')
+
+# CSV inputs that make up the combined recalls dataset.
+RECALL_CSVS = [
+    os.path.join(DATA_DIR, 'csv', 'recalls_2016_2021.csv'),
+    os.path.join(DATA_DIR, 'csv', 'recalls_2022_2025.csv'),
+    os.path.join(DATA_DIR, 'csv', 'recalls_2025_april.csv'),
+]
+
+
+def dataset_path(dataset: str, root: str = DEFAULT_STORE_ROOT) -> str:
+    return os.path.join(root, dataset)
+
+
+def to_table(df: pd.DataFrame, dataset: str = 'recalls', index: Optional[ManufacturerIndex] = None) -> pa.Table:
+    """
+    Coerces a scraped or CSV-loaded frame to the typed schema of a dataset.
+
+    Dates on the PPB site are day-first ("14/12/2022") or spelled out
+    ("12 July 2018"); both are parsed here once so readers get real dates.
+    The normalized text columns are recomputed from the raw ones, and
+    manufacturers are resolved to canonical IDs (without writing the alias
+    table; see resolve_manufacturers).
+    """
+    schema = SCHEMAS[dataset]
+    df = df.copy()
+    for field in schema:
+        if field.name not in df.columns:
+            df[field.name] = None
+    df['date'] = pd.to_datetime(df['date'], dayfirst=True, format='mixed', errors='coerce').dt.date
+    df['year'] = pd.to_numeric(df['year'], errors='coerce').astype('Int16')
+    for field in schema:
+        if pa.types.is_string(field.type):
+            df[field.name] = df[field.name].astype('string').str.strip().replace('', pd.NA)
+    df = df[df['year'].notna()]
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    return resolve_table(normalize_table(table), index)
+
+
+def write_partitions(df: pd.DataFrame, dataset: str = 'recalls', root: str = DEFAULT_STORE_ROOT,
+                     index: Optional[ManufacturerIndex] = None) -> None:
+    """
+    Writes rows to a year-partitioned Parquet dataset.
+
+    Every year present in df replaces that year's partition; other years are
+    left untouched. A scraper that re-reads a whole year page can therefore
+    write its result directly.
+    """
+    if df is None or df.empty:
+        logger.warning(f"No {dataset} rows to write.")
+        return
+    table = to_table(df, dataset, index)
+    ds.write_dataset(
+        table,
+        dataset_path(dataset, root),
+        format='parquet',
+        partitioning=PARTITIONING,
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+    )
+    years = sorted(set(table.column('year').to_pylist()))
+    logger.info(f"Wrote {table.num_rows} {dataset} rows to {dataset_path(dataset, root)} (years {years})")
+
+
+def append_rows(df: pd.DataFrame, dataset: str = 'recalls', root: str = DEFAULT_STORE_ROOT) -> None:
+    """Adds rows to the partitions of their years, keeping what is already stored there."""
+    if df is None or df.empty:
+        return
+    years = pd.to_numeric(df['year'], errors='coerce').dropna().astype(int).unique().tolist()
+    existing = read_recalls(dataset=dataset, root=root, years=years) if os.path.exists(dataset_path(dataset, root)) else None
+    if existing is not None and not existing.empty:
+        df = pd.concat([existing, df], ignore_index=True)
+    write_partitions(df, dataset, root)
+
+
+def read_recalls(columns: Optional[List[str]] = None, years: Optional[Iterable[int]] = None,
+                 manufacturers: Optional[Iterable[str]] = None, dataset: str = 'recalls',
+                 root: str = DEFAULT_STORE_ROOT) -> pd.DataFrame:
+    """
+    Reads a dataset from the Parquet store.
+
+    Args:
+        columns (list, optional): Columns to load; the rest are never read from disk.
+        years (iterable, optional): Only scan these year partitions.
+        manufacturers (iterable, optional): Only return rows for these manufacturers.
+        dataset (str, optional): 'recalls' or 'rapid_alerts'.
+        root (str, optional): Root of the Parquet store.
+
+    Returns:
+        pd.DataFrame: The selected rows, with 'date' as datetime64.
+    """
+    path = dataset_path(dataset, root)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No {dataset} dataset at {path}; run `python src/recall_store.py merge` first.")
+
+    dataset_obj = ds.dataset(path, format='parquet', partitioning=PARTITIONING)
+    expression = None
+    if years is not None:
+        expression = pc.field('year').isin([int(y) for y in years])
+    if manufacturers is not None:
+        predicate = pc.field('manufacturer').isin(list(manufacturers))
+        expression = predicate if expression is None else expression & predicate
+
+    table = dataset_obj.to_table(columns=columns, filter=expression)
+    df = table.to_pandas(date_as_object=False)
+    # The partition key comes back as the last column; restore schema order.
+    ordered = columns or [name for name in SCHEMAS[dataset].names if name in df.columns]
+    return df[ordered]
+
+
+def export_csv(csv_path: str, dataset: str = 'recalls', root: str = DEFAULT_STORE_ROOT, **read_kwargs) -> None:
+    """Exports the raw columns of a dataset (or a filtered slice of it) to CSV."""
+    derived = set(NORMALIZED_COLUMNS) | {'manufacturer_id', 'manufacturer_canonical'}
+    columns = [name for name in SCHEMAS[dataset].names if name not in derived]
+    df = read_recalls(columns=columns, dataset=dataset, root=root, **read_kwargs)
+    df = df.sort_values(['year', 'date'], kind='stable')
+    df.to_csv(csv_path, index=False, date_format='%d/%m/%Y')
+    logger.info(f"Exported {len(df)} {dataset} rows to {csv_path}")
+
+
+def resolve_manufacturers(dataset: str = 'recalls', root: str = DEFAULT_STORE_ROOT) -> int:
+    """
+    Resolves every stored manufacturer against the alias table, rewrites the
+    store with the resulting IDs and saves the alias table. The only place
+    store writes add names to data/csv/manufacturer_aliases.csv, and the only
+    place new manufacturer IDs are handed out: the table is reloaded and saved
+    under index_lock, so concurrent runs never reuse an ID.
+
+    Returns:
+        int: Number of aliases added to the table.
+    """
+    with index_lock():
+        index = ManufacturerIndex(assign_ids=True)
+        known = len(index.aliases)
+        write_partitions(read_recalls(dataset=dataset, root=root), dataset, root, index=index)
+        index.save()
+    added = len(index.aliases) - known
+    logger.info(f"Resolved {dataset} manufacturers: {added} new aliases saved to {index.path}")
+    return added
+
+
+def merge_csvs(csv_paths: List[str] = RECALL_CSVS, dataset: str = 'recalls', root: str = DEFAULT_STORE_ROOT) -> pd.DataFrame:
+    """
+    Merges the per-scraper CSV files into the Parquet store.
+
+    Args:
+        csv_paths (list, optional): CSV files to combine.
+        dataset (str, optional): Target dataset name.
+        root (str, optional): Root of the Parquet store.
+
+    Returns:
+        pd.DataFrame: The merged, de-duplicated rows.
+    """
+    frames = []
+    for path in csv_paths:
+        if not os.path.exists(path):
+            logger.warning(f"Skipping missing file: {path}")
+            continue
+        frames.append(pd.read_csv(path, dtype=str, keep_default_na=False))
+    if not frames:
+        raise FileNotFoundError("None of the input CSV files exist.")
+
+    df = pd.concat(frames, ignore_index=True).drop_duplicates()
+    write_partitions(df, dataset, root)
+    return df
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(asctime)s - %(message)s',
+                        datefmt='%Y-%m-%d %H:%M:%S')
+
+    parser = argparse.ArgumentParser(description="Build and export the year-partitioned Parquet recall store.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    merge_parser = subparsers.add_parser('merge', help='Merge scraper CSVs into the store')
+    merge_parser.add_argument('--dataset', choices=sorted(SCHEMAS), default='recalls')
+    merge_parser.add_argument('--csv', action='append', help='Input CSV (repeatable, default: the recall CSVs)')
+    merge_parser.add_argument('--export', type=str, default=None, help='Also export the merged dataset to this CSV')
+
+    export_parser = subparsers.add_parser('export', help='Export the store to CSV')
+    export_parser.add_argument('--dataset', choices=sorted(SCHEMAS), default='recalls')
+    export_parser.add_argument('--out', type=str, required=True, help='Output CSV path')
+    export_parser.add_argument('--year', type=int, action='append', help='Only export these years')
+
+    resolve_parser = subparsers.add_parser('resolve', help='Resolve manufacturers and save new aliases')
+    resolve_parser.add_argument('--dataset', choices=sorted(SCHEMAS), default='recalls')
+
+    args = parser.parse_args()
+    if args.command == 'merge':
+        merge_csvs(args.csv or RECALL_CSVS, args.dataset)
+        if args.export:
+            export_csv(args.export, args.dataset)
+    elif args.command == 'resolve':
+        resolve_manufacturers(args.dataset)
+    else:
+        export_csv(args.out, args.dataset, years=args.year)
@@ -0,0 +1,206 @@
+import argparse
+from typing import Iterable, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+
+from db import get_connection, get_engine
+
+
+def report_year(alias: str) -> str:
+    """Year of the recall date; the year of the page it was listed on only when the date is missing."""
+    return f"COALESCE(EXTRACT(YEAR FROM {alias}.date)::smallint, {alias}.year, 0)"
+
+
+# One summary cell per (year, month, manufacturer, category). Year and month
+# both come from the date, so a recall listed on the next year's page still
+# lands in its own month. Missing parts map to 0 / 'Other' so every recall
+# lands in exactly one cell.
+def cell_select(alias: str) -> str:
+    return (f"{report_year(alias)}::smallint AS year, "
+            f"COALESCE(EXTRACT(MONTH FROM {alias}.date), 0)::smallint AS month, "
+            f"COALESCE({alias}.manufacturer_id, 0) AS manufacturer_id, "
+            f"COALESCE({alias}.recall_category, 'Other') AS recall_category")
+
+
+# Run by load_data.upsert_recalls after COPY and before the recalls upsert:
+# cells of the staged rows and of the rows they are about to replace.
+STAGE_TOUCHED_CELLS = f"""
+    CREATE TEMP TABLE touched_cells ON COMMIT DROP AS
+    SELECT {cell_select('s')} FROM recalls_staging s
+    UNION
+    SELECT {cell_select('r')}
+    FROM recalls_staging s
+    JOIN products p ON p.product_name = s.product_name AND p.inn_name = s.inn_name
+    JOIN recalls r ON r.recall_ref = s.recall_ref AND r.batch_no = s.batch_no AND r.product_id = p.id
+                  AND r.year = s.year
+"""
+
+ALL_CELLS = f"""
+    CREATE TEMP TABLE touched_cells ON COMMIT DROP AS
+    SELECT DISTINCT {cell_select('r')} FROM recalls r
+"""
+
+# Recompute only the touched cells, reading only the recalls of the touched years.
+REFRESH_SQL = [
+    """
+    DELETE FROM recall_monthly_summary m USING touched_cells t
+    WHERE (m.year, m.month, m.manufacturer_id, m.recall_category)
+        = (t.year, t.month, t.manufacturer_id, t.recall_category)
+    """,
+    """
+    DELETE FROM recall_reason_summary m USING touched_cells t
+    WHERE (m.year, m.month, m.manufacturer_id, m.recall_category)
+        = (t.year, t.month, t.manufacturer_id, t.recall_category)
+    """,
+    f"""
+    INSERT INTO recall_monthly_summary (year, month, manufacturer_id, recall_category, recall_count)
+    SELECT c.year, c.month, c.manufacturer_id, c.recall_category, count(*)
+    FROM (SELECT {cell_select('r')} FROM recalls r
+          WHERE {report_year('r')} IN (SELECT DISTINCT year FROM touched_cells)) c
+    JOIN touched_cells t USING (year, month, manufacturer_id, recall_category)
+    GROUP BY c.year, c.month, c.manufacturer_id, c.recall_category
+    """,
+    f"""
+    INSERT INTO recall_reason_summary (year, month, manufacturer_id, recall_category, reason, recall_count)
+    SELECT c.year, c.month, c.manufacturer_id, c.recall_category, c.reason, count(*)
+    FROM (SELECT {cell_select('r')}, COALESCE(r.reason_norm, '') AS reason FROM recalls r
+          WHERE {report_year('r')} IN (SELECT DISTINCT year FROM touched_cells)) c
+    JOIN touched_cells t USING (year, month, manufacturer_id, recall_category)
+    GROUP BY c.year, c.month, c.manufacturer_id, c.recall_category, c.reason
+    """,
+]
+
+
+def refresh_touched(cursor) -> int:
+    """Recomputes the summary rows of every cell in touched_cells; returns the number of cells."""
+    cursor.execute("SELECT count(*) FROM touched_cells")
+    cells = cursor.fetchone()[0]
+    for statement in REFRESH_SQL:
+        cursor.execute(statement)
+    return cells
+
+
+def rebuild() -> int:
+    """Recomputes every cell, e.g. after changing the category rules."""
+    with get_connection() as connection:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("TRUNCATE recall_monthly_summary, recall_reason_summary")
+                cursor.execute(ALL_CELLS)
+                cells = refresh_touched(cursor)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    return cells
+
+
+# --- Query API: one function per dashboard chart ---
+def _filters(years: Optional[Iterable[int]], manufacturers: Optional[Iterable[str]],
+             categories: Optional[Iterable[str]], alias: str = 's') -> Tuple[str, dict]:
+    """WHERE clause for the shared dashboard filters. None or empty means no filter."""
+    clauses, params = [], {}
+    if years:
+        clauses.append(f"{alias}.year = ANY(:years)")
+        params['years'] = [int(y) for y in years]
+    if manufacturers:
+        clauses.append(f"{alias}.manufacturer_id IN (SELECT id FROM manufacturers WHERE name = ANY(:manufacturers))")
+        params['manufacturers'] = list(manufacturers)
+    if categories:
+        clauses.append(f"{alias}.recall_category = ANY(:categories)")
+        params['categories'] = list(categories)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def _query(sql: str, params: dict) -> pd.DataFrame:
+    with get_engine().connect() as connection:
+        return pd.read_sql(text(sql), connection, params=params)
+
+
+def monthly_counts(years=None, manufacturers=None, categories=None) -> pd.DataFrame:
+    """Recalls per (year, month)."""
+    where, params = _filters(years, manufacturers, categories)
+    return _query(f"""
+        SELECT s.year, s.month, sum(s.recall_count)::int AS recall_count
+        FROM recall_monthly_summary s{where}
+        GROUP BY s.year, s.month ORDER BY s.year, s.month
+    """, params)
+
+
+def recalls_per_year(years=None, manufacturers=None, categories=None) -> pd.DataFrame:
+    where, params = _filters(years, manufacturers, categories)
+    return _query(f"""
+        SELECT s.year, sum(s.recall_count)::int AS recall_count
+        FROM recall_monthly_summary s{where}
+        GROUP BY s.year ORDER BY s.year
+    """, params)
+
+
+def category_distribution(years=None, manufacturers=None, categories=None) -> pd.DataFrame:
+    where, params = _filters(years, manufacturers, categories)
+    return _query(f"""
+        SELECT s.recall_category, sum(s.recall_count)::int AS recall_count
+        FROM recall_monthly_summary s{where}
+        GROUP BY s.recall_category ORDER BY recall_count DESC
+    """, params)
+
+
+def top_reasons(limit: Optional[int] = 10, years=None, manufacturers=None, categories=None) -> pd.DataFrame:
+    """Most frequent (normalized) reasons; limit=None returns the full reason distribution."""
+    where, params = _filters(years, manufacturers, categories)
+    params['limit'] = limit
+    return _query(f"""
+        SELECT s.reason, sum(s.recall_count)::int AS recall_count
+        FROM recall_reason_summary s{where}
+        GROUP BY s.reason ORDER BY recall_count DESC, s.reason
+        LIMIT :limit
+    """, params)
+
+
+def manufacturer_year_heatmap(top_n: int = 10, years=None, categories=None) -> pd.DataFrame:
+    """Recalls per (manufacturer, year) for the top_n manufacturers overall."""
+    where, params = _filters(years, None, categories)
+    params['top_n'] = top_n
+    return _query(f"""
+        WITH counts AS (
+            SELECT s.manufacturer_id, s.year, sum(s.recall_count)::int AS recall_count
+            FROM recall_monthly_summary s{where}
+            GROUP BY s.manufacturer_id, s.year
+        ), top AS (
+            SELECT manufacturer_id FROM counts WHERE manufacturer_id <> 0
+            GROUP BY manufacturer_id ORDER BY sum(recall_count) DESC LIMIT :top_n
+        )
+        SELECT m.name AS manufacturer, c.year, c.recall_count
+        FROM counts c JOIN top USING (manufacturer_id) JOIN manufacturers m ON m.id = c.manufacturer_id
+        ORDER BY m.name, c.year
+    """, params)
+
+
+def filter_options() -> dict:
+    """Distinct years, manufacturers and categories present, for the dashboard selectors."""
+    options = _query("""
+        SELECT DISTINCT s.year, m.name AS manufacturer, s.recall_category
+        FROM recall_monthly_summary s LEFT JOIN manufacturers m ON m.id = s.manufacturer_id
+    """, {})
+    return {column: sorted(options[column].dropna().unique().tolist())
+            for column in ['year', 'manufacturer', 'recall_category']}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain and query the recall summary tables.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild', help='Recompute every summary cell')
+    show_parser = subparsers.add_parser('show', help='Print the chart data')
+    show_parser.add_argument('--year', type=int, action='append', help='Only these years')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild':
+        print(f"Rebuilt {rebuild()} summary cells.")
+    else:
+        for title, frame in [('Monthly counts', monthly_counts(args.year)),
+                             ('Recalls per year', recalls_per_year(args.year)),
+                             ('Top reasons', top_reasons(10, args.year)),
+                             ('Categories', category_distribution(args.year)),
+                             ('Manufacturer x year', manufacturer_year_heatmap(10, args.year))]:
+            print(f"\n{title}\n{frame.to_string(index=False)}")
@@ -1,9 +1,51 @@
-import requests
 from bs4 import BeautifulSoup
-import time
 import csv
+import pandas as pd
 
-def scrape_recalled(base_url_prefix, start_year, end_year):
+from fetcher import fetch_all
+from recall_store import write_partitions
+
+def parse_recalled(content, year):
+    """
+    Parses the recalled products table from a listing page.
+
+    Args:
+        content (bytes): HTML of the listing page.
+        year (int): Year the page belongs to.
+
+    Returns:
+        list: One dictionary per recalled product row.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+
+    recall_data = []
+
+    # "ecalled products table
+    table = soup.find('table')
+    if table:
+        rows = table.find_all('tr')[1:]  # Skip the header row
+        for row in rows:
+            columns = row.find_all('td')
+            if len(columns) >= 3:  # Assuming at least Date, Title, Product Type
+                date = columns[1].get_text(strip=True)
+                product_name = columns[2].get_text(strip=True) if len(columns) > 2 else None
+                inn_name = columns[3].get_text(strip=True) if len(columns) > 3 else None
+                batch_no = columns[4].get_text(strip=True) if len(columns) > 4 else None
+                manufacturer = columns[5].get_text(strip=True) if len(columns) > 5 else None
+                reason = columns[6].get_text(strip=True) if len(columns) > 6 else None
+
+                recall_data.append({
+                    'year': year,
+                    'date': date,
+                    'product_name': product_name,
+                    'inn_name': inn_name,
+                    'batch_no': batch_no,
+                    'manufacturer': manufacturer,
+                    'reason': reason
+                })
+    return recall_data
+
+def scrape_recalled(base_url_prefix, start_year, end_year, **fetcher_kwargs):
     """
     Scrapes recalled data from a range of years.
 
@@ -11,50 +53,22 @@ def scrape_recalled(base_url_prefix, start_year, end_year):
         base_url_prefix (str): https://web.pharmacyboardkenya.org/
         start_year (int): i.e. 2016
         end_year (int): i.e. 2021
+        **fetcher_kwargs: Rate limit, concurrency and retry settings for fetcher.AsyncFetcher.
     
     Returns:
         dict: Dictionary containing the scraped data.
     """
-    all_alerts_data = []
-    for year in range(start_year, end_year + 1):
-        url = f"{base_url_prefix}products-recalled-in-{year}/"
+    years = list(range(start_year, end_year + 1))
+    urls = [f"{base_url_prefix}products-recalled-in-{year}/" for year in years]
+    for url in urls:
         print(f"Scraping data from: {url}")
-        
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
 
-            recall_data = []
-
-            # "ecalled products table
-            table = soup.find('table')
-            if table:
-                rows = table.find_all('tr')[1:]  # Skip the header row
-                for row in rows:
-                    columns = row.find_all('td')
-                    if len(columns) >= 3:  # Assuming at least Date, Title, Product Type
-                        date = columns[1].get_text(strip=True)
-                        product_name = columns[2].get_text(strip=True) if len(columns) > 2 else None
-                        inn_name = columns[3].get_text(strip=True) if len(columns) > 3 else None
-                        batch_no = columns[4].get_text(strip=True) if len(columns) > 4 else None
-                        manufacturer = columns[5].get_text(strip=True) if len(columns) > 5 else None
-                        reason = columns[6].get_text(strip=True) if len(columns) > 6 else None
-
-                        recall_data.append({
-                            'year': year,
-                            'date': date,
-                            'product_name': product_name,
-                            'inn_name': inn_name,
-                            'batch_no': batch_no,
-                            'manufacturer': manufacturer,
-                            'reason': reason
-                        })
-            all_alerts_data.extend(recall_data)
-            time.sleep(1)# server time delay
-        
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching the web page for {year}: {e}")
+    all_alerts_data = []
+    for year, result in zip(years, fetch_all(urls, **fetcher_kwargs)):
+        if not result.ok:
+            print(f"Error fetching the web page for {year}: {result.error}")
+            continue
+        all_alerts_data.extend(parse_recalled(result.content, year))
 
     return {'recalls': all_alerts_data}
 
@@ -87,4 +101,5 @@ if __name__ == "__main__":
     scraped_data = scrape_recalled(base_url_prefix, start_year, end_year)
 
     if scraped_data:
-        save_to_csv(scraped_data)
\ No newline at end of file
+        save_to_csv(scraped_data)
+        write_partitions(pd.DataFrame(scraped_data['recalls']), 'recalls')
\ No newline at end of file
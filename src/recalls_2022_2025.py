@@ -1,74 +1,152 @@
-import requests
-from bs4 import BeautifulSoup
-import time
+from bs4 import BeautifulSoup, SoupStrainer
 import csv
+import pandas as pd
 
-def scrape_recalled(start_year, end_year):
+from fetcher import fetch_all
+from recall_store import write_partitions
+
+BASE_URL_PREFIX = "https://web.pharmacyboardkenya.org/"
+
+# The listing slug changed every year from 2022 onwards.
+RECALL_PAGE_PATHS = {2022: "products-recalled-in-2022/",
+                     2023: "product-recall-2023/",
+                     2024: "Product%20recalled%202024/",
+                     2025: "products-recalled-2025/"}
+# Slugs tried for years not in RECALL_PAGE_PATHS (the spellings used so far),
+# so a new year's page is found without a code change.
+RECALL_PAGE_PATTERNS = ["products-recalled-{year}/", "products-recalled-in-{year}/",
+                        "product-recall-{year}/", "product-recalled-{year}/", "Product%20recalled%20{year}/"]
+
+# Only the recalls table is needed, so skip building the rest of the page.
+TABLE_ONLY = SoupStrainer('table')
+
+def recall_page_url(year, base_url_prefix=BASE_URL_PREFIX):
+    """
+    Returns the recalled products listing URL for a year, or None if the year is unknown.
+    """
+    path = RECALL_PAGE_PATHS.get(year)
+    return f"{base_url_prefix}{path}" if path else None
+
+def candidate_page_urls(year, base_url_prefix=BASE_URL_PREFIX):
+    """
+    URLs that may hold a year's listing: the known one, or else one per slug pattern.
+    """
+    url = recall_page_url(year, base_url_prefix)
+    if url:
+        return [url]
+    return [f"{base_url_prefix}{pattern.format(year=year)}" for pattern in RECALL_PAGE_PATTERNS]
+
+def parse_recall_page(content, year):
+    """
+    Parses recall rows and product page links from one 2022-2025 listing page in a single pass.
+
+    Args:
+        content (bytes): HTML of the listing page.
+        year (int): Year the page belongs to.
+
+    Returns:
+        tuple: (recalls, product_info) lists, or (None, None) if the page has no table.
+    """
+    soup = BeautifulSoup(content, 'html.parser', parse_only=TABLE_ONLY)
+
+    table = soup.find('table')
+    if not table:
+        return None, None
+
+    recall_data = []
+    product_info = []
+    rows = table.find_all('tr')[1:]  # Skip the header row
+    for row in rows:
+        columns = row.find_all('td')
+        if len(columns) >= 3:  # Assuming at least Date, Title, Product Type
+            date = columns[1].get_text(strip=True)
+            recall_ref = columns[2].get_text(strip=True) if len(columns) > 2 else None
+            product_column = columns[3]
+            product_link = product_column.find('a')
+            product_text = product_link.get_text(strip=True) if product_link else product_column.get_text(strip=True)
+            product_url = product_link.get('href') if product_link else None
+            inn_name = columns[4].get_text(strip=True) if len(columns) > 4 else None
+            batch_no = columns[5].get_text(strip=True) if len(columns) > 5 else None
+            manufacturer = columns[6].get_text(strip=True) if len(columns) > 6 else None
+            reason = columns[7].get_text(strip=True) if len(columns) > 7 else None
+
+            recall_data.append({
+                'year': year,
+                'date': date,
+                'recall_ref': recall_ref,
+                'product_name': product_text,
+                'inn_name': inn_name,
+                'batch_no': batch_no,
+                'manufacturer': manufacturer,
+                'reason': reason
+            })
+            product_info.append({
+                'year': year,
+                'product': product_text,
+                'url': product_url
+            })
+    return recall_data, product_info
+
+def extract_recalls_and_products(start_year, end_year, base_url_prefix=BASE_URL_PREFIX, **fetcher_kwargs):
+    """
+    Fetches and parses each 2022-2025 listing page once, returning both recall rows and product links.
+
+    Years without a known slug (e.g. the year after the last one in
+    RECALL_PAGE_PATHS) are looked up under every RECALL_PAGE_PATTERNS slug;
+    the first candidate with a recalls table is used.
+
+    Args:
+        start_year (int): Start year
+        end_year (int): End year
+        base_url_prefix (str, optional): Site root, overridable for replaying recorded pages.
+        **fetcher_kwargs: Cache, rate limit and retry settings for fetcher.AsyncFetcher.
+
+    Returns:
+        dict: {'recalls': [...], 'product_info': [...]}
+    """
+    pages = []
+    for year in range(start_year, end_year + 1):
+        urls = candidate_page_urls(year, base_url_prefix)
+        print(f"Scraping data from: {', '.join(urls)}")
+        pages.append((year, urls))
+
+    recalls_data = []
+    product_info = []
+    results = iter(fetch_all([url for _, urls in pages for url in urls], **fetcher_kwargs))
+    for year, urls in pages:
+        candidates = [(url, next(results)) for url in urls]
+        recalls = None
+        for url, result in candidates:
+            if not result.ok:
+                continue
+            recalls, products = parse_recall_page(result.content, year)
+            if recalls is not None:
+                break
+            print(f"No recalls table found on {url}")
+        if recalls is None:
+            if not any(result.ok for _, result in candidates):
+                print(f"Error fetching the web page for {year}: {candidates[-1][1].error}")
+            continue
+        recalls_data.extend(recalls)
+        product_info.extend(products)
+
+    return {'recalls': recalls_data, 'product_info': product_info}
+
+def scrape_recalled(start_year, end_year, base_url_prefix=BASE_URL_PREFIX, **fetcher_kwargs):
     """
     Scrapes recalled data from a dictionary with urls and and their years.
 
     Args:
         start_year (int): Start year
         end_year (int): End year
+        base_url_prefix (str, optional): Site root, overridable for replaying recorded pages.
+        **fetcher_kwargs: Rate limit, concurrency and retry settings for fetcher.AsyncFetcher.
     
     Returns:
         dict: Dictionary containing the scraped data.
     """
-    recalls_data = []
-
-    years = {2022: "https://web.pharmacyboardkenya.org/products-recalled-in-2022/",
-             2023: "https://web.pharmacyboardkenya.org/product-recall-2023/",
-             2024: "https://web.pharmacyboardkenya.org/Product%20recalled%202024/",
-             2025: "https://web.pharmacyboardkenya.org/products-recalled-2025/"}
-    for year in range(start_year, end_year + 1):
-        url = years.get(year)
-        if not url:
-            print(f"No URL found for year {year}")
-            continue
-        print(f"Scraping data from: {url}")
-        
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            recall_data = []
-
-            # "ecalled products table
-            table = soup.find('table')
-            if table:
-                rows = table.find_all('tr')[1:]  # Skip the header row
-                for row in rows:
-                    columns = row.find_all('td')
-                    if len(columns) >= 3:  # Assuming at least Date, Title, Product Type
-                        date = columns[1].get_text(strip=True)
-                        recall_ref = columns[2].get_text(strip=True) if len(columns) > 2 else None
-                        product_column = columns[3]
-                        product_link = product_column.find('a')
-                        product_text = product_link.get_text(strip=True) if product_link else product_column.get_text(strip=True)
-                        inn_name = columns[4].get_text(strip=True) if len(columns) > 4 else None
-                        batch_no = columns[5].get_text(strip=True) if len(columns) > 5 else None
-                        manufacturer = columns[6].get_text(strip=True) if len(columns) > 6 else None
-                        reason = columns[7].get_text(strip=True) if len(columns) > 7 else None
-                        status = columns[8].get_text(strip=True) if len(columns) > 8 else None
-
-                        recall_data.append({
-                            'year': year,
-                            'date': date,
-                            'recall_ref': recall_ref,
-                            'product_name': product_text,
-                            'inn_name': inn_name,
-                            'batch_no': batch_no,
-                            'manufacturer': manufacturer,
-                            'reason': reason
-                        })
-            recalls_data.extend(recall_data)
-            time.sleep(1)# server time delay
-        
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching the web page for {year}: {e}")
-
-    return {'recalls': recalls_data}
+    data = extract_recalls_and_products(start_year, end_year, base_url_prefix, **fetcher_kwargs)
+    return {'recalls': data['recalls']}
 
 def save_to_csv(data, filename="recalls_2022_2025.csv"):
     """
@@ -93,9 +171,13 @@ def save_to_csv(data, filename="recalls_2022_2025.csv"):
         print(f"Error saving to CSV: {e}")
 
 if __name__ == "__main__":
+    from recalls_2022_2025info import save_to_csv as save_product_info_csv
+
     start_year = 2025
     end_year = 2025
-    scraped_data = scrape_recalled(start_year, end_year)
+    scraped_data = extract_recalls_and_products(start_year, end_year)
 
     if scraped_data:
-        save_to_csv(scraped_data)
\ No newline at end of file
+        save_to_csv(scraped_data)
+        save_product_info_csv(scraped_data)
+        write_partitions(pd.DataFrame(scraped_data['recalls']), 'recalls')
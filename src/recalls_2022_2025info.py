@@ -1,64 +1,27 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import csv
-import time
 
-def extract_product_info(start_year, end_year):
+from http_cache import DEFAULT_CACHE_DIR, HttpCache
+from recalls_2022_2025 import BASE_URL_PREFIX, extract_recalls_and_products
+
+def extract_product_info(start_year, end_year, base_url_prefix=BASE_URL_PREFIX, **fetcher_kwargs):
     """
     Scrapes web pages for a range of years and extracts Product info.
 
+    Thin wrapper over recalls_2022_2025.extract_recalls_and_products; call that
+    directly to get recall rows and product links from one download.
+
     Args:
         start_year (int): The starting year for scraping.
         end_year (int): The ending year for scraping.
+        base_url_prefix (str, optional): Site root, overridable for replaying recorded pages.
+        **fetcher_kwargs: Cache, rate limit and retry settings for fetcher.AsyncFetcher.
 
     Returns:
         list: A list of dictionaries, where each dictionary contains 'title' and 'url' of a Product info.
     """
-    product_info = []
-
-    years = {2022: "https://web.pharmacyboardkenya.org/products-recalled-in-2022/",
-             2023: "https://web.pharmacyboardkenya.org/product-recall-2023/",
-             2024: "https://web.pharmacyboardkenya.org/Product%20recalled%202024/",
-             2025: "https://web.pharmacyboardkenya.org/products-recalled-2025/"
-             }
-
-    for year in range(start_year, end_year + 1):
-        url = years.get(year)
-        if not url:
-            print(f"No URL found for year {year}")
-            continue
-        print(f"Scraping data from: {url}")
-        time.sleep(1)  # Be respectful to the server
-
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            table = soup.find('table')
-            if table:
-                rows = table.find_all('tr')[1:]  # Skip the header row
-                for row in rows:
-                    columns = row.find_all('td')
-                    if len(columns) >= 3:
-                        product_column = columns[3]
-                        product_link = product_column.find('a', href=True)  # Find the link
-                        product_text = product_link.get_text(strip=True) if product_link else product_column.get_text(strip=True)
-                        product_url = product_link['href'] if product_link and 'href' in product_link.attrs else None
-
-                        product_info.append({
-                            'year': year,
-                            'product': product_text,
-                            'url': product_url
-                        })
-            else:
-                print(f"No product info found for {url}")
-            time.sleep(1)  # Be respectful to the server
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching the web page {url}: {e}")
-
-    return {'product_info': product_info}
+    data = extract_recalls_and_products(start_year, end_year, base_url_prefix, **fetcher_kwargs)
+    return {'product_info': data['product_info']}
 
 def save_to_csv(data, filename="product_info.csv"):
     """
@@ -84,7 +47,13 @@ def save_to_csv(data, filename="product_info.csv"):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape product info links for 2022-2025 recalls.")
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help='HTTP cache directory')
+    parser.add_argument('--offline', action='store_true', help='Serve pages only from the HTTP cache')
+    args = parser.parse_args()
+
     start_year = 2022
     end_year = 2025
-    product_info = extract_product_info(start_year, end_year)
-    save_to_csv(product_info)
\ No newline at end of file
+    product_info = extract_product_info(start_year, end_year,
+                                        cache=HttpCache(args.cache_dir), offline=args.offline)
+    save_to_csv(product_info)
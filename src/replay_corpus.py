@@ -0,0 +1,211 @@
+import argparse
+import csv
+import html
+import json
+import os
+import re
+from collections import defaultdict
+from urllib.parse import unquote, urlsplit
+
+from fetcher import fetch_all
+from recalls_2022_2025 import RECALL_PAGE_PATHS
+from scrape_data import rapid_alerts_url
+
+LIVE_PREFIX = "https://web.pharmacyboardkenya.org/"
+DEFAULT_CORPUS_DIR = "data/fixtures/ppb"
+INDEX_NAME = "index.json"
+
+HTML_TYPE = "text/html; charset=utf-8"
+PDF_TYPE = "application/pdf"
+
+RAPID_ALERT_YEARS = range(2018, 2026)
+RECALL_YEARS_2016_2021 = range(2016, 2022)
+
+
+def url_path(url):
+    """Key used by the corpus index: the unquoted path of a URL."""
+    return unquote(urlsplit(url).path) or "/"
+
+
+def page_filename(path):
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', path).strip('-') or 'index'
+    return os.path.join('pages', f"{slug}.html")
+
+
+def safe_filename(title):
+    """Same file naming as download.download_pdfs."""
+    return ''.join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+
+
+def first_token(text):
+    match = re.search(r'[a-z0-9]+', (text or '').lower())
+    return match.group(0) if match else ''
+
+
+def read_csv_rows(path):
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def cell(value):
+    return html.escape(value or '')
+
+
+def listing_page(title, header, rows):
+    """Render a listing page shaped like the PPB WordPress tables (one header row, then <td> rows)."""
+    head = ''.join(f"<th>{cell(h)}</th>" for h in header)
+    body = '\n'.join('<tr>' + ''.join(f"<td>{c}</td>" for c in row) + '</tr>' for row in rows)
+    return (f"<!DOCTYPE html>\n<html><head><title>{cell(title)}</title></head><body>\n"
+            f"<nav><a href=\"{LIVE_PREFIX}\">Pharmacy and Poisons Board</a></nav>\n"
+            f"<h1>{cell(title)}</h1>\n<table>\n<tr>{head}</tr>\n{body}\n</table>\n</body></html>\n")
+
+
+def link(href, text):
+    return f"<a href=\"{html.escape(href)}\">{cell(text)}</a>" if href else cell(text)
+
+
+class CorpusWriter:
+    """Collects pages and PDFs for a corpus directory and writes its index."""
+
+    def __init__(self, corpus_dir):
+        self.corpus_dir = corpus_dir
+        self.entries = {}
+        os.makedirs(os.path.join(corpus_dir, 'pages'), exist_ok=True)
+
+    def add_page(self, url, content):
+        path = url_path(url)
+        filename = page_filename(path)
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        with open(os.path.join(self.corpus_dir, filename), 'wb') as f:
+            f.write(data)
+        self.entries[path] = {'file': filename, 'content_type': HTML_TYPE}
+
+    def add_file(self, url, file_path, content_type=PDF_TYPE):
+        relative = os.path.relpath(file_path, self.corpus_dir)
+        self.entries[url_path(url)] = {'file': relative, 'content_type': content_type}
+
+    def save(self):
+        index = {'live_prefix': LIVE_PREFIX, 'entries': dict(sorted(self.entries.items()))}
+        with open(os.path.join(self.corpus_dir, INDEX_NAME), 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+        print(f"Wrote {len(self.entries)} corpus entries to {self.corpus_dir}")
+
+
+def synthesize(corpus_dir=DEFAULT_CORPUS_DIR, csv_dir='data/csv', data_dir='data'):
+    """
+    Rebuilds the replay corpus from the committed CSV snapshots and PDFs.
+
+    Every URL pattern the scrapers use gets a page: rapid-alert(s)-{year},
+    products-recalled-in-{year}, the 2023-2025 special slugs and the product
+    pages, each linking to the PDFs already stored under data/.
+    """
+    writer = CorpusWriter(corpus_dir)
+
+    # Rapid alerts listing pages, with PDFs from data/rapid_alerts_pdfs.
+    alerts = defaultdict(list)
+    for row in read_csv_rows(os.path.join(csv_dir, 'rapid_alerts.csv')):
+        alerts[int(row['year'])].append(row)
+        pdf_file = os.path.join(data_dir, 'rapid_alerts_pdfs', f"{safe_filename(row['title'])}.pdf")
+        if row['pdf_url'] and os.path.exists(pdf_file):
+            writer.add_file(row['pdf_url'], pdf_file)
+    for year in RAPID_ALERT_YEARS:
+        rows = [[str(i), cell(r['date']), link(r['pdf_url'], r['title']), cell(r['product_type']),
+                 cell(r['source']), cell(r['manufacturer'])] for i, r in enumerate(alerts[year], 1)]
+        writer.add_page(rapid_alerts_url(LIVE_PREFIX, year),
+                        listing_page(f"Rapid Alerts {year}", ['#', 'Date', 'Title', 'Product Type', 'Source', 'Manufacturer'], rows))
+
+    # 2016-2021 recalled products.
+    recalls_old = defaultdict(list)
+    for row in read_csv_rows(os.path.join(csv_dir, 'recalls_2016_2021.csv')):
+        recalls_old[int(row['year'])].append(row)
+    for year in RECALL_YEARS_2016_2021:
+        rows = [[str(i), cell(r['date']), cell(r['product_name']), cell(r['inn_name']), cell(r['batch_no']),
+                 cell(r['manufacturer']), cell(r['reason'])] for i, r in enumerate(recalls_old[year], 1)]
+        writer.add_page(f"{LIVE_PREFIX}products-recalled-in-{year}/",
+                        listing_page(f"Products Recalled in {year}",
+                                     ['#', 'Date', 'Product', 'INN', 'Batch', 'Manufacturer', 'Reason'], rows))
+
+    # 2022-2025 recalled products, their product pages and the PDFs those link to.
+    product_urls = defaultdict(list)
+    for row in read_csv_rows(os.path.join(csv_dir, 'product_info.csv')):
+        product_urls[(int(row['year']), row['product'])].append(row['url'])
+    pdfs_by_year = defaultdict(list)
+    for name in sorted(os.listdir(os.path.join(data_dir, 'recalls_pdf'))):
+        year, _, original = name.partition('_')
+        if year.isdigit():
+            pdfs_by_year[int(year)].append((original, os.path.join(data_dir, 'recalls_pdf', name)))
+
+    recalls_new = defaultdict(list)
+    seen = set()
+    for csv_name in ('recalls_2022_2025.csv', 'recalls_2025_april.csv'):
+        for row in read_csv_rows(os.path.join(csv_dir, csv_name)):
+            key = tuple(row.values())
+            if key not in seen:
+                seen.add(key)
+                recalls_new[int(row['year'])].append(row)
+
+    for year, path in RECALL_PAGE_PATHS.items():
+        rows = []
+        for i, r in enumerate(recalls_new[year], 1):
+            urls = product_urls.get((year, r['product_name'])) or [None]
+            product_url = urls[0]
+            rows.append([str(i), cell(r['date']), cell(r['recall_ref']), link(product_url, r['product_name']),
+                         cell(r['inn_name']), cell(r['batch_no']), cell(r['manufacturer']), cell(r['reason']),
+                         'Recalled'])
+            if product_url and url_path(product_url) not in writer.entries:
+                token = first_token(r['product_name'])
+                pdf_links = []
+                for original, pdf_file in pdfs_by_year[year]:
+                    if token and token in original.lower():
+                        pdf_url = f"{LIVE_PREFIX}wp-content/uploads/{year}/{original}"
+                        writer.add_file(pdf_url, pdf_file)
+                        pdf_links.append(f"<p>{link(pdf_url, 'Download recall letter')}</p>")
+                writer.add_page(product_url,
+                                f"<!DOCTYPE html>\n<html><head><title>{cell(r['product_name'])}</title></head><body>\n"
+                                f"<h1>{cell(r['product_name'])}</h1>\n{''.join(pdf_links)}\n</body></html>\n")
+        writer.add_page(f"{LIVE_PREFIX}{path}",
+                        listing_page(f"Products Recalled {year}",
+                                     ['#', 'Date', 'Recall Ref', 'Product', 'INN', 'Batch', 'Manufacturer',
+                                      'Reason', 'Status'], rows))
+
+    writer.save()
+
+
+def record(corpus_dir=DEFAULT_CORPUS_DIR, csv_dir='data/csv', **fetcher_kwargs):
+    """
+    Records the live listing and product pages into a corpus directory.
+
+    PDFs are not re-downloaded; point the index at files under data/ with
+    synthesize() or add them by hand.
+    """
+    urls = [rapid_alerts_url(LIVE_PREFIX, year) for year in RAPID_ALERT_YEARS]
+    urls += [f"{LIVE_PREFIX}products-recalled-in-{year}/" for year in RECALL_YEARS_2016_2021]
+    urls += [f"{LIVE_PREFIX}{path}" for path in RECALL_PAGE_PATHS.values()]
+    urls += sorted({row['url'] for row in read_csv_rows(os.path.join(csv_dir, 'product_info.csv')) if row['url']})
+    urls = list(dict.fromkeys(urls))
+
+    writer = CorpusWriter(corpus_dir)
+    existing = os.path.join(corpus_dir, INDEX_NAME)
+    if os.path.exists(existing):
+        with open(existing, 'r', encoding='utf-8') as f:
+            writer.entries = json.load(f)['entries']
+
+    for result in fetch_all(urls, **fetcher_kwargs):
+        if result.ok:
+            writer.add_page(result.url, result.content)
+        else:
+            print(f"Error recording {result.url}: {result.error}")
+    writer.save()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline replay corpus of PPB pages and PDFs.")
+    parser.add_argument('command', choices=['synthesize', 'record'],
+                        help='synthesize from data/csv snapshots, or record the live site')
+    parser.add_argument('--corpus-dir', type=str, default=DEFAULT_CORPUS_DIR, help='Corpus output directory')
+    args = parser.parse_args()
+
+    if args.command == 'synthesize':
+        synthesize(args.corpus_dir)
+    else:
+        record(args.corpus_dir)
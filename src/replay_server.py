@@ -0,0 +1,174 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from replay_corpus import DEFAULT_CORPUS_DIR, INDEX_NAME
+
+
+class ReplayStats:
+    """Request and byte counters for a replay server run."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self.injected_errors = 0
+
+    def add(self, field, amount=1):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def snapshot(self):
+        with self.lock:
+            return {'requests': self.requests, 'bytes_sent': self.bytes_sent,
+                    'not_modified': self.not_modified, 'injected_errors': self.injected_errors}
+
+
+class ReplayServer:
+    """
+    Local stand-in for web.pharmacyboardkenya.org that serves a recorded corpus.
+
+    Links to the live site inside HTML pages are rewritten to the server's own
+    address so scrapers follow them locally. The server answers ETag
+    revalidation and Range requests like a real web server, and can inject
+    latency and errors.
+
+    Args:
+        corpus_dir (str): Directory with index.json and the recorded files.
+        host (str): Interface to bind.
+        port (int): Port to bind, 0 picks a free one.
+        latency (float): Seconds to wait before answering each request.
+        error_rate (float): Probability of answering with error_status instead.
+        error_status (int): Status code used for injected errors.
+        seed (int, optional): Seed for the error injection RNG.
+    """
+
+    def __init__(self, corpus_dir=DEFAULT_CORPUS_DIR, host='127.0.0.1', port=0, latency=0.0,
+                 error_rate=0.0, error_status=503, seed=None):
+        with open(os.path.join(corpus_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.corpus_dir = corpus_dir
+        self.live_prefix = index['live_prefix']
+        self.entries = index['entries']
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.stats = ReplayStats()
+        self.bodies = {}
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def body_for(self, path):
+        """Load (and cache) the body for a path, rewriting live links in HTML."""
+        if path not in self.bodies:
+            entry = self.entries[path]
+            with open(os.path.join(self.corpus_dir, entry['file']), 'rb') as f:
+                body = f.read()
+            if entry['content_type'].startswith('text/html'):
+                body = body.replace(self.live_prefix.encode('utf-8'), self.base_url.encode('utf-8'))
+            self.bodies[path] = (body, f"\"{hashlib.sha256(body).hexdigest()[:32]}\"", entry['content_type'])
+        return self.bodies[path]
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send_body(self, status, body, headers):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+                    server.stats.add('bytes_sent', len(body))
+
+            def do_GET(self):
+                server.stats.add('requests')
+                if server.latency:
+                    time.sleep(server.latency)
+                if server.error_rate and server.random.random() < server.error_rate:
+                    server.stats.add('injected_errors')
+                    return self.send_body(server.error_status, b'injected error', {'Content-Type': 'text/plain'})
+
+                path = unquote(urlsplit(self.path).path)
+                if path not in server.entries:
+                    return self.send_body(404, b'not found', {'Content-Type': 'text/plain'})
+
+                body, etag, content_type = server.body_for(path)
+                headers = {'Content-Type': content_type, 'ETag': etag, 'Accept-Ranges': 'bytes'}
+                if self.headers.get('If-None-Match') == etag:
+                    server.stats.add('not_modified')
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                range_header = self.headers.get('Range')
+                if range_header and range_header.startswith('bytes='):
+                    start = int(range_header[6:].split('-')[0] or 0)
+                    if start >= len(body):
+                        return self.send_body(416, b'', {'Content-Range': f"bytes */{len(body)}"})
+                    headers['Content-Range'] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+                    return self.send_body(206, body[start:], headers)
+                self.send_body(200, body, headers)
+
+            do_HEAD = do_GET
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the recorded PPB corpus locally.")
+    parser.add_argument('--corpus-dir', type=str, default=DEFAULT_CORPUS_DIR, help='Corpus directory')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds of latency per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with an error')
+    parser.add_argument('--error-status', type=int, default=503, help='Status code for injected errors')
+    args = parser.parse_args()
+
+    server = ReplayServer(args.corpus_dir, port=args.port, latency=args.latency,
+                          error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Serving {len(server.entries)} recorded URLs at {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -1,9 +1,63 @@
-import requests
 from bs4 import BeautifulSoup
-import time
+import argparse
 import csv
+import pandas as pd
 
-def scrape_rapid_alerts(base_url_prefix, start_year, end_year):
+from fetcher import fetch_all
+from http_cache import DEFAULT_CACHE_DIR, HttpCache
+from recall_store import write_partitions
+
+def rapid_alerts_url(base_url_prefix, year):
+    """
+    Builds the rapid alerts listing URL for a year (the slug changed between 2021 and 2024).
+    """
+    if 2021 <= year <= 2024:
+        return f"{base_url_prefix}rapid-alert-{year}/"
+    return f"{base_url_prefix}rapid-alerts-{year}/"
+
+def parse_rapid_alerts(content, year):
+    """
+    Parses the rapid alerts table from a listing page.
+
+    Args:
+        content (bytes): HTML of the listing page.
+        year (int): Year the page belongs to.
+
+    Returns:
+        list: One dictionary per alert row.
+    """
+    soup = BeautifulSoup(content, 'html.parser')
+
+    rapid_alerts_data = []
+
+    # "rapid-alerts-table"
+    table = soup.find('table')
+    if table:
+        rows = table.find_all('tr')[1:]  # Skip the header row
+        for row in rows:
+            columns = row.find_all('td')
+            if len(columns) >= 3:  # Assuming at least Date, Title, Product Type
+                date = columns[1].get_text(strip=True)
+                title_column = columns[2]
+                title_link = title_column.find('a')
+                title_text = title_link.get_text(strip=True) if title_link else title_column.get_text(strip=True)
+                pdf_url = title_link['href'] if title_link and 'href' in title_link.attrs else None
+                product_type = columns[3].get_text(strip=True) if len(columns) > 3 else None
+                source = columns[4].get_text(strip=True) if len(columns) > 4 else None
+                manufacturer = columns[5].get_text(strip=True) if len(columns) > 5 else None
+
+                rapid_alerts_data.append({
+                    'year': year,
+                    'date': date,
+                    'title': title_text,
+                    'pdf_url': pdf_url,
+                    'product_type': product_type,
+                    'source': source,
+                    'manufacturer': manufacturer
+                })
+    return rapid_alerts_data
+
+def scrape_rapid_alerts(base_url_prefix, start_year, end_year, **fetcher_kwargs):
     """
     Scrapes rapid alerts data from a range of years.
 
@@ -11,54 +65,22 @@ def scrape_rapid_alerts(base_url_prefix, start_year, end_year):
         base_url_prefix (str): https://web.pharmacyboardkenya.org/
         start_year (int): i.e. 2018
         end_year (int): i.e. 2025
+        **fetcher_kwargs: Rate limit, concurrency and retry settings for fetcher.AsyncFetcher.
     
     Returns:
         dict: Dictionary containing the scraped data.
     """
-    all_alerts_data = []
-    for year in range(start_year, end_year + 1):
-        if 2021 <= year <= 2024:
-            url = f"{base_url_prefix}rapid-alert-{year}/"
-        else:
-            url = f"{base_url_prefix}rapid-alerts-{year}/"
+    years = list(range(start_year, end_year + 1))
+    urls = [rapid_alerts_url(base_url_prefix, year) for year in years]
+    for url in urls:
         print(f"Scraping data from: {url}")
-        try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            rapid_alerts_data = []
-
-            # "rapid-alerts-table"
-            table = soup.find('table')
-            if table:
-                rows = table.find_all('tr')[1:]  # Skip the header row
-                for row in rows:
-                    columns = row.find_all('td')
-                    if len(columns) >= 3:  # Assuming at least Date, Title, Product Type
-                        date = columns[1].get_text(strip=True)
-                        title_column = columns[2]
-                        title_link = title_column.find('a')
-                        title_text = title_link.get_text(strip=True) if title_link else title_column.get_text(strip=True)
-                        pdf_url = title_link['href'] if title_link and 'href' in title_link.attrs else None
-                        product_type = columns[3].get_text(strip=True) if len(columns) > 3 else None
-                        source = columns[4].get_text(strip=True) if len(columns) > 4 else None
-                        manufacturer = columns[5].get_text(strip=True) if len(columns) > 5 else None
-
-                        rapid_alerts_data.append({
-                            'year': year,
-                            'date': date,
-                            'title': title_text,
-                            'pdf_url': pdf_url,
-                            'product_type': product_type,
-                            'source': source,
-                            'manufacturer': manufacturer
-                        })
-            all_alerts_data.extend(rapid_alerts_data)
-            time.sleep(1) # small delay on server
-
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching the web page for {year}: {e}")
+
+    all_alerts_data = []
+    for year, result in zip(years, fetch_all(urls, **fetcher_kwargs)):
+        if not result.ok:
+            print(f"Error fetching the web page for {year}: {result.error}")
+            continue
+        all_alerts_data.extend(parse_rapid_alerts(result.content, year))
 
     return {'rapid_alerts': all_alerts_data}
 
@@ -85,10 +107,17 @@ def save_to_csv(data, filename="rapid_alerts.csv"):
         print(f"Error saving to CSV: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape PPB rapid alerts.")
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR, help='HTTP cache directory')
+    parser.add_argument('--offline', action='store_true', help='Serve pages only from the HTTP cache')
+    args = parser.parse_args()
+
     base_url_prefix = "https://web.pharmacyboardkenya.org/"
     start_year = 2018
     end_year = 2025
-    scraped_data = scrape_rapid_alerts(base_url_prefix, start_year, end_year)
+    scraped_data = scrape_rapid_alerts(base_url_prefix, start_year, end_year,
+                                       cache=HttpCache(args.cache_dir), offline=args.offline)
 
     if scraped_data:
-        save_to_csv(scraped_data)
\ No newline at end of file
+        save_to_csv(scraped_data)
+        write_partitions(pd.DataFrame(scraped_data['rapid_alerts']), 'rapid_alerts')
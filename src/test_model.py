@@ -1,11 +1,19 @@
+import os
+
 import requests
 
-API_URL = "https://e583acbf92df.ngrok-free.app/query"
+# Start the service first: python src/recall_service.py
+API_URL = os.getenv("RECALL_SERVICE_URL", "http://127.0.0.1:8000").rstrip("/") + "/query"
 
 test_input = {
     "query": "What are the main reasons for drug recalls?"
 }
 
-response = requests.post(API_URL, json=test_input)
+response = requests.post(API_URL, json=test_input, timeout=120)
+response.raise_for_status()
+result = response.json()
 
-print("Model Response:\n", response.json()["response"])
+print("Model Response:\n", result["answer"])
+print(f"\nSources ({result['latency_ms']} ms):")
+for source in result["sources"]:
+    print(f"  - {source['source']} (page {source['page']})")
@@ -0,0 +1,77 @@
+from typing import Dict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Spellings of the same manufacturer seen on the PPB pages, after normalize_text.
+MANUFACTURER_ALIASES: Dict[str, str] = {
+    "dawa life sciences": "dawa ltd",
+    "dawa limited": "dawa ltd",
+    "dawa ltd": "dawa ltd",
+    "dawa pharmaceuticals": "dawa ltd",
+    "dawa pharmaceuticals ltd": "dawa ltd",
+}
+
+# Python's \s, spelled out for RE2 (whose \s is ASCII-only and omits \v).
+WHITESPACE = r"\t\n\x{0b}\f\r\x{1c}-\x{20}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}"
+
+
+def normalize_text(values: pa.Array) -> pa.Array:
+    """Lowercase, collapse runs of whitespace to one space and trim."""
+    values = pc.utf8_lower(values)
+    values = pc.replace_substring_regex(values, pattern=f"[{WHITESPACE}]+", replacement=' ')
+    return pc.utf8_trim_whitespace(values)
+
+
+def normalize_manufacturer(values: pa.Array) -> pa.Array:
+    """normalize_text, then fold known aliases onto one canonical name."""
+    values = normalize_text(values)
+    aliases = pa.array(list(MANUFACTURER_ALIASES))
+    canonical = pa.array(list(MANUFACTURER_ALIASES.values()))
+    mapped = pc.take(canonical, pc.index_in(values, value_set=aliases))
+    return pc.coalesce(mapped, values)
+
+
+def clean_reason(values: pa.Array) -> pa.Array:
+    """
+    Vectorized category_reasons.clean_reasons: lowercase, keep only [a-z0-9]
+    and whitespace, trim. Missing reasons become ''.
+    """
+    values = pc.utf8_lower(pc.fill_null(values, ''))
+    values = pc.replace_substring_regex(values, pattern=f"[^a-z0-9{WHITESPACE}]", replacement='')
+    return pc.utf8_trim_whitespace(values)
+
+
+# Derived column -> (source column, kernel). Computed once at ingest by
+# recall_store.to_table, so readers never redo it.
+NORMALIZED_COLUMNS = {
+    'product_name_norm': ('product_name', normalize_text),
+    'inn_name_norm': ('inn_name', normalize_text),
+    'manufacturer_norm': ('manufacturer', normalize_manufacturer),
+    'reason_norm': ('reason', normalize_text),
+    'clean_reasons': ('reason', clean_reason),
+}
+
+
+def normalize_table(table: pa.Table) -> pa.Table:
+    """Adds (or recomputes) every derived column whose source column is in the table."""
+    for name, (source, kernel) in NORMALIZED_COLUMNS.items():
+        if source not in table.column_names:
+            continue
+        column = kernel(table.column(source))
+        if name in table.column_names:
+            table = table.set_column(table.column_names.index(name), name, column)
+        else:
+            table = table.append_column(name, column)
+    return table
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """normalize_table for a pandas frame, e.g. one read straight from a CSV."""
+    df = df.copy()
+    for name, (source, kernel) in NORMALIZED_COLUMNS.items():
+        if source in df.columns:
+            values = pa.array(df[source].astype('string'), type=pa.string(), from_pandas=True)
+            df[name] = pd.Series(kernel(values).to_pandas(), index=df.index, dtype='string')
+    return df
@@ -0,0 +1,139 @@
+import io
+import json
+import struct
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+
+# (custom_id, document, metadata, embedding), as written by ingest_pdfs.
+ChunkRow = Tuple[str, str, Dict, Sequence[float]]
+# Embedding-table columns the writer fills; any other column keeps its default.
+ROW_FIELDS = ['uuid', 'id', 'collection_id', 'embedding', 'document', 'cmetadata', 'custom_id']
+
+
+def encode_uuid(value) -> bytes:
+    return (value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))).bytes
+
+
+def encode_text(value) -> bytes:
+    return str(value).encode('utf-8')
+
+
+def encode_json(value) -> bytes:
+    return json.dumps(value).encode('utf-8')
+
+
+def encode_jsonb(value) -> bytes:
+    return b'\x01' + encode_json(value)  # jsonb binary format version 1
+
+
+def encode_vector(value) -> bytes:
+    # pgvector's binary format: int16 dimensions, int16 unused, float4 values.
+    return struct.pack(f'>hh{len(value)}f', len(value), 0, *value)
+
+
+ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    'uuid': encode_uuid,
+    'varchar': encode_text,
+    'text': encode_text,
+    'bpchar': encode_text,
+    'json': encode_json,
+    'jsonb': encode_jsonb,
+    'vector': encode_vector,
+}
+
+
+def table_columns(cursor, table: str) -> Dict[str, Dict]:
+    """Column name -> {'type': udt_name, 'default': column_default} for a table in the search path."""
+    cursor.execute("""
+        SELECT column_name, udt_name, column_default
+        FROM information_schema.columns
+        WHERE table_name = %s AND table_schema = ANY(current_schemas(false))
+        ORDER BY ordinal_position
+    """, (table,))
+    return {name: {'type': udt, 'default': default} for name, udt, default in cursor.fetchall()}
+
+
+class EmbeddingCopyWriter:
+    """
+    Writes chunk embeddings into the langchain PGVector tables with binary
+    COPY instead of ORM inserts.
+
+    The embedding table's columns are read from information_schema, so rows
+    match whichever langchain schema created the table: the uuid primary key
+    (filled client-side, as PGVector does) or a varchar id holding the chunk
+    ID, json or jsonb metadata. Rows are the same as PGVector.add_embeddings
+    would write, so PGVector and vector_index's retriever read them as usual.
+
+    Args:
+        connection: A psycopg2 connection (e.g. from db.get_connection()).
+        collection_name (str): Existing langchain collection to write into.
+    """
+
+    def __init__(self, connection, collection_name: str):
+        self.connection = connection
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s", (collection_name,))
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"Collection {collection_name} does not exist")
+            self.collection_id = row[0]
+            columns = table_columns(cursor, EMBEDDING_TABLE)
+        self.columns = {name: column for name, column in columns.items() if name in ROW_FIELDS}
+        unsupported = {name: c['type'] for name, c in self.columns.items() if c['type'] not in ENCODERS}
+        if unsupported or 'embedding' not in self.columns:
+            raise ValueError(f"Cannot COPY into {EMBEDDING_TABLE}: unexpected columns {unsupported or columns}")
+
+    def _values(self, row: ChunkRow) -> Dict[str, Any]:
+        custom_id, document, metadata, embedding = row
+        return {
+            'uuid': uuid.uuid4(),
+            'id': custom_id,
+            'collection_id': self.collection_id,
+            'embedding': embedding,
+            'document': document,
+            'cmetadata': metadata,
+            'custom_id': custom_id,
+        }
+
+    def encode(self, rows: Iterable[ChunkRow]) -> Tuple[List[str], bytes]:
+        """Column list and PGCOPY binary payload for rows."""
+        names = list(self.columns)
+        buffer = io.BytesIO()
+        buffer.write(PGCOPY_HEADER)
+        field_count = struct.pack('>h', len(names))
+        for row in rows:
+            values = self._values(row)
+            buffer.write(field_count)
+            for name in names:
+                value = values.get(name)
+                if value is None:
+                    buffer.write(struct.pack('>i', -1))
+                    continue
+                data = ENCODERS[self.columns[name]['type']](value)
+                buffer.write(struct.pack('>i', len(data)))
+                buffer.write(data)
+        buffer.write(PGCOPY_TRAILER)
+        return names, buffer.getvalue()
+
+    def write(self, rows: List[ChunkRow]) -> int:
+        """COPYs rows and commits them as one transaction; returns the number of rows."""
+        if not rows:
+            return 0
+        names, payload = self.encode(rows)
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {EMBEDDING_TABLE} ({', '.join(names)}) FROM STDIN WITH (FORMAT binary)",
+                    io.BytesIO(payload),
+                )
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+        return len(rows)
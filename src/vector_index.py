@@ -0,0 +1,328 @@
+import argparse
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import PrivateAttr
+from sqlalchemy import text
+
+from db import get_engine, pool_options
+
+# Operator class and distance operator per langchain DistanceStrategy value.
+OPERATORS = {
+    'cosine': ('vector_cosine_ops', '<=>'),
+    'l2': ('vector_l2_ops', '<->'),
+    'inner': ('vector_ip_ops', '<#>'),
+}
+DEFAULT_HNSW_M = 16
+DEFAULT_HNSW_EF_CONSTRUCTION = 64
+DEFAULT_EF_SEARCH = 40
+DEFAULT_PROBES = 10
+# pgvector indexes at most this many dimensions of type vector.
+MAX_INDEX_DIMENSIONS = 2000
+
+
+@lru_cache(maxsize=1)
+def vector_engine():
+    """Engine for the vector tables: the shared pool unless PGVECTOR_CONNECTION_STRING points elsewhere."""
+    url = os.getenv("PGVECTOR_CONNECTION_STRING")
+    if not url:
+        return get_engine()
+    from sqlalchemy import create_engine
+    return create_engine(url, **pool_options())
+
+
+def index_name(collection_name: str, method: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '_', collection_name.lower()).strip('_')
+    return f"ix_lpe_{slug}_{method}"[:63]
+
+
+def ingest_distance() -> str:
+    """The distance strategy ingest_pdfs writes collections with."""
+    # Imported here: ingest_pdfs pulls in the PDF parsers and langchain's PGVector.
+    from ingest_pdfs import DISTANCE_STRATEGY
+    return DISTANCE_STRATEGY.value
+
+
+def collection_info(connection, collection_name: str) -> Optional[Dict]:
+    """
+    Collection UUID, embedding dimension, row count and distance strategy, or
+    None if the collection does not exist. Collections created before ingest
+    recorded its strategy in their metadata get ingest's current one.
+    """
+    row = connection.execute(text("""
+        SELECT c.uuid, c.cmetadata ->> 'distance_strategy' AS distance,
+               (SELECT vector_dims(e.embedding) FROM langchain_pg_embedding e
+                WHERE e.collection_id = c.uuid LIMIT 1) AS dim,
+               (SELECT count(*) FROM langchain_pg_embedding e WHERE e.collection_id = c.uuid) AS rows
+        FROM langchain_pg_collection c WHERE c.name = :name
+    """), {'name': collection_name}).mappings().first()
+    if not row:
+        return None
+    info = dict(row)
+    if info['distance'] not in OPERATORS:
+        info['distance'] = ingest_distance()
+    return info
+
+
+def pgvector_version(connection) -> tuple:
+    version = connection.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+    return tuple(int(part) for part in re.findall(r'\d+', version or '0'))
+
+
+def choose_method(connection) -> str:
+    """HNSW where pgvector supports it (0.5+); IVFFlat otherwise."""
+    return 'hnsw' if pgvector_version(connection) >= (0, 5) else 'ivfflat'
+
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector's guidance: rows / 1000 up to 1M rows, sqrt(rows) above."""
+    return max(10, rows // 1000 if rows <= 1_000_000 else int(rows ** 0.5))
+
+
+def embedding_expression(dim: int) -> str:
+    # langchain_pg_embedding.embedding has no declared dimension, which
+    # pgvector indexes require; the indexes are on this cast, and queries
+    # must use the same expression to use them.
+    return f"(embedding::vector({int(dim)}))"
+
+
+def build_index(collection_name: str, method: str = 'auto', m: int = DEFAULT_HNSW_M,
+                ef_construction: int = DEFAULT_HNSW_EF_CONSTRUCTION, lists: Optional[int] = None,
+                rebuild: bool = False, maintenance_work_mem: Optional[str] = None) -> Dict:
+    """
+    Builds a partial ANN index over one collection's embeddings, with the
+    operator class of the distance strategy the collection was ingested with.
+
+    The index is created CONCURRENTLY, so ingest can keep writing. IVFFlat
+    clusters are trained on the rows present at build time; rebuild after
+    the collection has grown substantially. HNSW stays current as rows are
+    added.
+
+    Returns:
+        dict: Index name, method, distance, dimension, rows and build seconds ('skipped' if it already exists).
+    """
+    engine = vector_engine()
+    with engine.connect() as connection:
+        info = collection_info(connection, collection_name)
+        if not info or not info['dim']:
+            raise ValueError(f"Collection {collection_name} does not exist or has no embeddings")
+        if info['dim'] > MAX_INDEX_DIMENSIONS:
+            raise ValueError(f"pgvector cannot index {info['dim']}-dimensional vectors (max {MAX_INDEX_DIMENSIONS})")
+        if method == 'auto':
+            method = choose_method(connection)
+    opclass, _ = OPERATORS[info['distance']]
+
+    name = index_name(collection_name, method)
+    if method == 'hnsw':
+        options = f"WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+    else:
+        options = f"WITH (lists = {int(lists or ivfflat_lists(info['rows']))})"
+    # The collection UUID is inlined, not bound: the planner only uses a
+    # partial index whose predicate it can match against the query literally.
+    create = (f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON langchain_pg_embedding "
+              f"USING {method} ({embedding_expression(info['dim'])} {opclass}) {options} "
+              f"WHERE collection_id = '{info['uuid']}'")
+
+    result = {'index': name, 'method': method, 'distance': info['distance'], 'dim': info['dim'], 'rows': info['rows']}
+    # CONCURRENTLY cannot run inside a transaction block.
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        exists = connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {'name': name}).scalar()
+        if exists and not rebuild:
+            return dict(result, seconds=None, skipped=True)
+        if maintenance_work_mem:
+            connection.execute(text("SELECT set_config('maintenance_work_mem', :value, false)"),
+                               {'value': maintenance_work_mem})
+        start = time.perf_counter()
+        try:
+            if exists:
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            connection.execute(text(create))
+        finally:
+            # The setting is per session; do not hand it back to the pool.
+            if maintenance_work_mem:
+                connection.execute(text("RESET maintenance_work_mem"))
+        result['seconds'] = time.perf_counter() - start
+    return dict(result, skipped=False)
+
+
+def drop_indexes(collection_name: str) -> List[str]:
+    names = [index_name(collection_name, method) for method in ('hnsw', 'ivfflat')]
+    with vector_engine().connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for name in names:
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    return names
+
+
+def index_status() -> List[Dict]:
+    with vector_engine().connect() as connection:
+        rows = connection.execute(text("""
+            SELECT indexname, pg_size_pretty(pg_relation_size(to_regclass(indexname))) AS size, indexdef
+            FROM pg_indexes WHERE tablename = 'langchain_pg_embedding' AND indexname LIKE 'ix_lpe_%'
+            ORDER BY indexname
+        """)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def search_settings(ef_search: Optional[int] = None, probes: Optional[int] = None) -> Dict[str, int]:
+    """Query-time knobs: hnsw.ef_search and ivfflat.probes, from arguments or VECTOR_EF_SEARCH / VECTOR_PROBES."""
+    if ef_search is None:
+        ef_search = os.getenv('VECTOR_EF_SEARCH', DEFAULT_EF_SEARCH)
+    if probes is None:
+        probes = os.getenv('VECTOR_PROBES', DEFAULT_PROBES)
+    return {'hnsw.ef_search': int(ef_search), 'ivfflat.probes': int(probes)}
+
+
+def nearest(connection, collection_uuid, dim: int, vector, k: int, distance: str,
+            settings: Optional[Dict[str, int]] = None, exact: bool = False) -> List[Dict]:
+    """k nearest rows of one collection; runs in the caller's transaction (settings are SET LOCAL)."""
+    _, operator = OPERATORS[distance]
+    for name, value in (settings or search_settings()).items():
+        connection.execute(text("SELECT set_config(:name, :value, true)"), {'name': name, 'value': str(value)})
+    if exact:
+        connection.execute(text("SET LOCAL enable_indexscan = off"))
+    rows = connection.execute(text(f"""
+        SELECT e.custom_id, e.document, e.cmetadata,
+               {embedding_expression(dim)} {operator} CAST(:vector AS vector({int(dim)})) AS distance
+        FROM langchain_pg_embedding e
+        WHERE e.collection_id = '{collection_uuid}'
+        ORDER BY distance
+        LIMIT :k
+    """), {'vector': '[' + ','.join(map(str, vector)) + ']', 'k': k}).mappings().all()
+    return [dict(row) for row in rows]
+
+
+class IndexedPGVectorRetriever(BaseRetriever):
+    """
+    Retriever over a langchain PGVector collection that queries through the
+    partial ANN index built by this module, with hnsw.ef_search and
+    ivfflat.probes set per query. Without an index it falls back to an
+    exact scan with the same results as PGVector.
+
+    Higher ef_search / probes trade latency for recall.
+    """
+
+    embeddings: Any
+    collection_name: str
+    k: int = 5
+    ef_search: Optional[int] = None
+    probes: Optional[int] = None
+    _info: Optional[Dict] = PrivateAttr(default=None)
+
+    def _collection(self, connection) -> Optional[Dict]:
+        # Looked up once the collection has embeddings, then reused until a search comes back empty.
+        if self._info is None:
+            info = collection_info(connection, self.collection_name)
+            if not info or not info['dim']:
+                return None
+            self._info = info
+        return self._info
+
+    def search(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        """Nearest chunks with their custom_id, document, cmetadata and distance."""
+        vector = self.embeddings.embed_query(query)
+        settings = search_settings(self.ef_search, self.probes)
+        with vector_engine().begin() as connection:
+            info = self._collection(connection)
+            if info is None:
+                return []
+            rows = nearest(connection, info['uuid'], info['dim'], vector, k or self.k, info['distance'], settings)
+            if rows:
+                return rows
+            # No rows: the collection may have been dropped and re-created under
+            # a new UUID (pre_delete_collection, a full re-ingest). Look it up again.
+            self._info = None
+            fresh = self._collection(connection)
+            if fresh is None or fresh['uuid'] == info['uuid']:
+                return []
+            return nearest(connection, fresh['uuid'], fresh['dim'], vector, k or self.k, fresh['distance'], settings)
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [Document(page_content=row['document'], metadata=row['cmetadata'] or {}) for row in self.search(query)]
+
+
+def benchmark(collection_name: str, queries: int = 100, k: int = 5, ef_search: Optional[int] = None,
+              probes: Optional[int] = None) -> Dict:
+    """
+    Query latency through the index and recall@k against an exact scan,
+    using stored embeddings as query vectors.
+    """
+    settings = search_settings(ef_search, probes)
+    with vector_engine().connect() as connection:
+        info = collection_info(connection, collection_name)
+        if not info or not info['dim']:
+            raise ValueError(f"Collection {collection_name} does not exist or has no embeddings")
+        samples = connection.execute(text(f"""
+            SELECT embedding::text FROM langchain_pg_embedding
+            WHERE collection_id = '{info['uuid']}' ORDER BY random() LIMIT :n
+        """), {'n': queries}).scalars().all()
+    vectors = [[float(x) for x in sample.strip('[]').split(',')] for sample in samples]
+
+    latencies, recalls = [], []
+    for vector in vectors:
+        with vector_engine().begin() as connection:
+            start = time.perf_counter()
+            approximate = nearest(connection, info['uuid'], info['dim'], vector, k, info['distance'], settings)
+            latencies.append((time.perf_counter() - start) * 1000)
+        with vector_engine().begin() as connection:
+            exact = nearest(connection, info['uuid'], info['dim'], vector, k, info['distance'], settings, exact=True)
+        expected = {row['custom_id'] for row in exact}
+        recalls.append(len(expected & {row['custom_id'] for row in approximate}) / max(len(expected), 1))
+    return {
+        'rows': info['rows'], 'queries': len(vectors), **settings,
+        'p50_ms': float(np.percentile(latencies, 50)) if latencies else None,
+        'p99_ms': float(np.percentile(latencies, 99)) if latencies else None,
+        f'recall@{k}': float(np.mean(recalls)) if recalls else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage ANN indexes on the pgvector collections.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build (or rebuild) a collection index')
+    build_parser.add_argument('collection', type=str)
+    build_parser.add_argument('--method', choices=['auto', 'hnsw', 'ivfflat'], default='auto')
+    build_parser.add_argument('--m', type=int, default=DEFAULT_HNSW_M, help='HNSW links per node')
+    build_parser.add_argument('--ef-construction', type=int, default=DEFAULT_HNSW_EF_CONSTRUCTION)
+    build_parser.add_argument('--lists', type=int, default=None, help='IVFFlat lists (default from row count)')
+    build_parser.add_argument('--rebuild', action='store_true', help='Drop and recreate an existing index')
+    build_parser.add_argument('--maintenance-work-mem', type=str, default=None, help="e.g. '1GB' for faster builds")
+
+    drop_parser = subparsers.add_parser('drop', help="Drop a collection's indexes")
+    drop_parser.add_argument('collection', type=str)
+
+    subparsers.add_parser('status', help='List the collection indexes')
+
+    bench_parser = subparsers.add_parser('bench', help='Measure query latency and recall')
+    bench_parser.add_argument('collection', type=str)
+    bench_parser.add_argument('--queries', type=int, default=100)
+    bench_parser.add_argument('--k', type=int, default=5)
+    bench_parser.add_argument('--ef-search', type=int, default=None)
+    bench_parser.add_argument('--probes', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        result = build_index(args.collection, args.method, args.m, args.ef_construction,
+                             args.lists, args.rebuild, args.maintenance_work_mem)
+        if result['skipped']:
+            print(f"{result['index']} already exists; use --rebuild to recreate it.")
+        else:
+            print(f"Built {result['index']} ({result['method']}, {result['distance']}, {result['dim']} dims, "
+                  f"{result['rows']:,} rows) in {result['seconds']:.1f} s")
+    elif args.command == 'drop':
+        print(f"Dropped {', '.join(drop_indexes(args.collection))}")
+    elif args.command == 'status':
+        for row in index_status():
+            print(f"{row['indexname']:<45} {row['size']:>10}  {row['indexdef']}")
+    else:
+        result = benchmark(args.collection, args.queries, args.k, args.ef_search, args.probes)
+        print('  '.join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in result.items()))